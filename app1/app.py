@@ -37,10 +37,10 @@ def get_prefectures():
 
 def get_projects():
     return run_query("""
-        SELECT p.id, p.nom_projet, p.domaine, p.montant_usd, p.date_debut, p.date_fin, 
+        SELECT p.id, p.nom_projet, p.domaine_id, p.montant_usd, p.date_debut, p.date_fin, 
                p.bailleur, d.name as domaine_nom
-        FROM public.projet p
-        LEFT JOIN public.dim_domaine d ON p.domaine = CAST(d.id AS TEXT)
+        FROM public.dim_projet p
+        LEFT JOIN public.dim_domaine d ON p.domaine_id = d.id
         ORDER BY p.nom_projet;
     """)
 
@@ -73,11 +73,11 @@ if selected_tab == "Aperçu":
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        total_projects = run_query("SELECT COUNT(*) FROM public.projet;")[0][0]
+        total_projects = run_query("SELECT COUNT(*) FROM public.dim_projet;")[0][0]
         st.metric("Total des Projets", total_projects)
     
     with col2:
-        total_budget = run_query("SELECT SUM(montant_usd) FROM public.projet;")[0][0]
+        total_budget = run_query("SELECT SUM(montant_usd) FROM public.dim_projet;")[0][0]
         st.metric("Budget Total (USD)", f"${total_budget:,.2f}")
     
     with col3:
@@ -88,8 +88,8 @@ if selected_tab == "Aperçu":
     st.subheader("Projets par Domaine")
     projects_by_domain = run_query("""
         SELECT d.name, COUNT(p.id) 
-        FROM public.projet p
-        LEFT JOIN public.dim_domaine d ON p.domaine = CAST(d.id AS TEXT)
+        FROM public.dim_projet p
+        LEFT JOIN public.dim_domaine d ON p.domaine_id = d.id
         GROUP BY d.name
         ORDER BY COUNT(p.id) DESC;
     """)
@@ -104,7 +104,7 @@ if selected_tab == "Aperçu":
     st.subheader("Budget par Bailleur")
     budget_by_donor = run_query("""
         SELECT bailleur, SUM(montant_usd) as budget_total
-        FROM public.projet
+        FROM public.dim_projet
         GROUP BY bailleur
         ORDER BY budget_total DESC;
     """)
@@ -251,13 +251,10 @@ elif selected_tab == "Cartographie":
     if prefectures_data:
         df_prefectures = pd.DataFrame(prefectures_data, columns=['ID', 'Nom', 'Latitude', 'Longitude'])
         
-        # Compter les projets par préfecture (approximation)
+        # Nombre de projets par préfecture (agrégat de projet_localisation)
         projects_by_prefecture = run_query("""
-            SELECT commune.prefecture_id, COUNT(projet.id)
-            FROM public.projet
-            JOIN public.fact_structure structure ON projet.id = structure.id
-            JOIN public.dim_commune commune ON structure.commune_id = commune.id
-            GROUP BY commune.prefecture_id;
+            SELECT prefecture_id, nombre_projets
+            FROM public.agg_projets_prefecture;
         """)
         
         project_counts = {pref_id: count for pref_id, count in projects_by_prefecture}
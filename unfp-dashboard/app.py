@@ -1,6 +1,11 @@
 import streamlit as st
-import base64
-import os
+from datetime import datetime
+from utils.assets import background_css
+from utils.admission import admission_metrics
+from utils.database import check_offline_bundle, database_status, local_backend_enabled, offline_bundle
+from utils.warmup import start_cache_warmer, get_warmup_report
+from utils.reports import report_index_url
+from utils.lite import LITE_PARAM, lite_mode
 
 # Configuration de la page
 st.set_page_config(
@@ -10,36 +15,22 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Fonction pour encoder l'image en base64
-def get_base64_of_image(image_path):
-    if os.path.exists(image_path):
-        with open(image_path, "rb") as img_file:
-            return base64.b64encode(img_file.read()).decode()
-    return None
-
-# Définir les chemins vers les images de fond
-BACKGROUND_IMAGE_1 = "./assets/images/unfpa_background.png"
-BACKGROUND_IMAGE_2 = "./assets/images/unfpa_fond.png"
-
-# Encoder les images en base64
-bg_image_1_base64 = get_base64_of_image(BACKGROUND_IMAGE_1)
-bg_image_2_base64 = get_base64_of_image(BACKGROUND_IMAGE_2)
-
-# Utiliser l'image disponible ou une image de secours
-if bg_image_1_base64:
-    background_image = f"data:image/png;base64,{bg_image_1_base64}"
-elif bg_image_2_base64:
-    background_image = f"data:image/png;base64,{bg_image_2_base64}"
-else:
-    # Image de secours depuis une URL si les images locales ne sont pas trouvées
-    background_image = "https://raw.githubusercontent.com/streamlit/example-app-background/main/unfpa_guinee_bg.png"
+# Mode hors ligne : le paquet configuré doit exister avant toute lecture
+check_offline_bundle()
+
+# Préchauffage des requêtes et des couches géographiques en arrière-plan
+start_cache_warmer()
 
-# Style CSS personnalisé avec image de fond
-st.markdown(f"""
+# Style CSS personnalisé avec image de fond, servie par le service statique de
+# Streamlit (voir scripts/build_assets.py) ; omis en mode allégé, qui garde le
+# thème par défaut sans image à télécharger
+if not lite_mode():
+    background_image = background_css("unfpa_background.png", "unfpa_fond.png")
+    st.markdown(f"""
 <style>
     /* Fond de la page principale */
     .stApp {{
-        background: url("{background_image}");
+        background: {background_image};
         background-size: cover;
         background-position: center;
         background-attachment: fixed;
@@ -161,7 +152,7 @@ st.markdown(f"""
         }}
     }}
 </style>
-""", unsafe_allow_html=True)
+    """, unsafe_allow_html=True)
 
 # Page d'accueil
 st.markdown('<h1 class="main-header">📊 Tableau de Bord UNFPA</h1>', unsafe_allow_html=True)
@@ -243,10 +234,18 @@ with col7:
     """, unsafe_allow_html=True)
 
 with col8:
-    st.markdown("""
+    # Rapports statiques générés par scripts/build_reports.py ; sans serveur de
+    # téléchargement, le lien est simplement omis
+    try:
+        reports_url = report_index_url()
+    except Exception:
+        reports_url = None
+    reports_link = f'<p><a href="{reports_url}" target="_blank">Rapports par préfecture et par région</a></p>' if reports_url else ""
+    st.markdown(f"""
     <div class="info-card">
         <h3 style="color: #1f77b4; margin-bottom: 10px;">📱 Rapports Mobiles</h3>
         <p style="color: #555;">Accédez aux données depuis votre appareil mobile</p>
+        {reports_link}
     </div>
     """, unsafe_allow_html=True)
 
@@ -307,15 +306,68 @@ st.sidebar.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Ajouter un logo UNFPA dans la sidebar (optionnel)
+# État du préchauffage du cache
+warmup_report = get_warmup_report()
+if warmup_report:
+    st.sidebar.caption(
+        f"Cache préchauffé le {warmup_report['date']:%d/%m/%Y %H:%M} "
+        f"en {warmup_report['duree']:.1f} s"
+    )
+
+# État des serveurs PostgreSQL, affiché lorsque des réplicas sont configurés
+servers = database_status()
+if len(servers) > 1:
+    st.sidebar.caption("Serveurs : " + ", ".join(
+        f"{server['name']} {'✓' if server['healthy'] else '✗'}"
+        + (f" (retard {server['lag']:.0f} s)" if server['replica'] and server['healthy'] else "")
+        for server in servers
+    ))
+
+# Mode DuckDB ou hors ligne : date de la copie locale servie
+if local_backend_enabled():
+    from utils.duckdb_backend import snapshot_version
+    version = snapshot_version()
+    source = "paquet hors ligne" if offline_bundle() else "copie locale"
+    st.sidebar.caption(
+        f"Données : {source} du {datetime.strptime(version, '%Y%m%d%H%M%S'):%d/%m/%Y %H:%M}"
+        if version else "Données : copie locale en préparation, lecture sur PostgreSQL"
+    )
+
+# Bascule entre l'affichage complet et le mode allégé (connexions lentes)
+if lite_mode():
+    st.sidebar.caption(f"Mode allégé : graphiques en images, tableaux paginés. [Affichage complet](?{LITE_PARAM}=0)")
+else:
+    st.sidebar.caption(f"Connexion lente ? [Passer en mode allégé](?{LITE_PARAM}=1)")
+
+# File d'admission des requêtes : profondeur et temps d'attente par classe
+with st.sidebar.expander("Charge de la base"):
+    st.dataframe(
+        admission_metrics(),
+        column_config={
+            "classe": "Classe",
+            "en_cours": "En cours",
+            "en_attente": "En attente",
+            "admises": "Admises",
+            "abandons": "Abandons",
+            "attente_moyenne": st.column_config.NumberColumn("Attente moy. (s)", format="%.2f"),
+            "attente_max": st.column_config.NumberColumn("Attente max (s)", format="%.2f"),
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+
+# Ajouter un logo UNFPA dans la sidebar (optionnel, remplacé par du texte en mode allégé)
 st.sidebar.markdown("---")
-try:
-    st.sidebar.image("./assets/images/unfpa_logo.png", 
-                     use_column_width=True)
-except:
-    st.sidebar.markdown("""
-    <div style="text-align: center; padding: 10px;">
-        <h4 style="color: white;">UNFPA</h4>
-        <p style="color: white;">Fonds des Nations Unies pour la population</p>
-    </div>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+if lite_mode():
+    st.sidebar.caption("UNFPA - Fonds des Nations Unies pour la population")
+else:
+    try:
+        st.sidebar.image("./assets/images/unfpa_logo.png", 
+                         use_column_width=True)
+    except:
+        st.sidebar.markdown("""
+        <div style="text-align: center; padding: 10px;">
+            <h4 style="color: white;">UNFPA</h4>
+            <p style="color: white;">Fonds des Nations Unies pour la population</p>
+        </div>
+        """, unsafe_allow_html=True)
\ No newline at end of file
@@ -3,6 +3,9 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from utils.database import *
+from utils.tables import paginated_table
+from utils.figures import cached_figure
+from utils.lite import show_chart
 
 # Configuration de la page
 st.set_page_config(page_title="Projets UNFP", page_icon="🚀", layout="wide")
@@ -48,12 +51,42 @@ with col3:
     avg_budget = filtered_projects['montant_usd'].mean()
     st.metric("Budget moyen", f"${avg_budget:,.2f}")
 
+# Recherche plein texte : la saisie ne relance que ce fragment
+@st.fragment
+def recherche_projets():
+    st.subheader("Rechercher dans les Projets")
+    query = st.text_input(
+        "Mots-clés (intitulé, bailleur, résultats)",
+        placeholder='ex. "santé maternelle" -Conakry',
+        key="recherche_projets"
+    )
+    if not query:
+        return
+
+    results = search_projects(query)
+    if results.empty:
+        st.info("Aucun projet ne correspond à cette recherche.")
+        return
+
+    st.caption(f"{len(results)} projet(s) trouvé(s)")
+    for row in results.itertuples():
+        st.markdown(f"**{row.nom_projet}** — {row.domaine_nom or 'Sans domaine'} · {row.bailleur} · ${row.montant_usd:,.2f}")
+        if row.extrait:
+            st.caption(row.extrait)
+
+recherche_projets()
+
 # Tableau des projets
 st.subheader("Liste des Projets")
-st.dataframe(
-    filtered_projects[['nom_projet', 'domaine_nom', 'bailleur', 'montant_usd', 'date_debut', 'date_fin']],
-    use_container_width=True,
-    height=400
+paginated_table(
+    TABLE_QUERIES["projets"],
+    ['nom_projet', 'domaine_nom', 'bailleur', 'montant_usd', 'date_debut', 'date_fin'],
+    key="projets",
+    filters={
+        'domaine_nom': selected_domain if selected_domain != "Tous" else None,
+        'bailleur': selected_donor if selected_donor != "Tous" else None,
+    },
+    search_columns=['nom_projet', 'domaine_nom', 'bailleur']
 )
 
 # Visualisations
@@ -66,9 +99,9 @@ with col1:
         'montant_usd': 'sum'
     }).reset_index()
     
-    fig = px.pie(domain_stats, values='id', names='domaine_nom', 
+    fig = cached_figure("pie", domain_stats, values='id', names='domaine_nom', 
                 title="Répartition des projets par domaine")
-    st.plotly_chart(fig, use_container_width=True)
+    show_chart(fig)
 
 with col2:
     # Répartition par bailleur
@@ -77,42 +110,49 @@ with col2:
         'montant_usd': 'sum'
     }).reset_index()
     
-    fig = px.bar(donor_stats, x='bailleur', y='montant_usd', 
+    fig = cached_figure("bar", donor_stats, x='bailleur', y='montant_usd', 
                 title="Budget par bailleur",
                 labels={'bailleur': 'Bailleur', 'montant_usd': 'Budget (USD)'})
-    st.plotly_chart(fig, use_container_width=True)
+    show_chart(fig)
 
-# Détails d'un projet sélectionné
-st.subheader("Détails du Projet")
-selected_project = st.selectbox(
-    "Sélectionner un projet pour voir les détails",
-    options=filtered_projects['nom_projet'].tolist()
-)
+# Détails d'un projet sélectionné : la sélection ne relance que ce fragment
+@st.fragment
+def details_projet(projects):
+    st.subheader("Détails du Projet")
+    selected_project = st.selectbox(
+        "Sélectionner un projet pour voir les détails",
+        options=projects['id'].tolist(),
+        format_func=dict(zip(projects['id'], projects['nom_projet'])).get
+    )
+
+    if selected_project is None:
+        return
+
+    project_details = projects[projects['id'] == selected_project].iloc[0]
 
-if selected_project:
-    project_details = filtered_projects[filtered_projects['nom_projet'] == selected_project].iloc[0]
-    
     col1, col2 = st.columns(2)
-    
+
     with col1:
         st.write("**Nom du projet:**", project_details['nom_projet'])
         st.write("**Domaine:**", project_details['domaine_nom'])
         st.write("**Bailleur:**", project_details['bailleur'])
         st.write("**Budget:**", f"${project_details['montant_usd']:,.2f}")
-    
+
     with col2:
         st.write("**Date de début:**", project_details['date_debut'])
         st.write("**Date de fin:**", project_details['date_fin'])
         st.write("**Intitulé:**", project_details['intitule'])
-    
+
     # Résultats attendus et atteints
     if project_details['resultats_attendus'] or project_details['resultats_atteints']:
         st.subheader("Résultats")
-        
+
         if project_details['resultats_attendus']:
             st.write("**Résultats attendus:**")
             st.info(project_details['resultats_attendus'])
-        
+
         if project_details['resultats_atteints']:
             st.write("**Résultats atteints:**")
-            st.success(project_details['resultats_atteints'])
\ No newline at end of file
+            st.success(project_details['resultats_atteints'])
+
+details_projet(filtered_projects)
@@ -3,6 +3,9 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from utils.database import *
+from utils.tables import paginated_table
+from utils.figures import cached_figure
+from utils.lite import show_chart, show_table
 
 # Configuration de la page
 st.set_page_config(page_title="Partenaires UNFP", page_icon="🤝", layout="wide")
@@ -51,10 +54,12 @@ if selected_domain != "Tous":
 
 # Tableau des partenaires
 st.subheader("Liste des Partenaires")
-st.dataframe(
-    filtered_partners[['partenaire_name', 'domaine_nom', 'region_couverte', 'montant_2025', 'taux_execution']],
-    use_container_width=True,
-    height=400
+paginated_table(
+    TABLE_QUERIES["partenaires"],
+    ['partenaire_name', 'domaine_nom', 'region_couverte', 'montant_2025', 'taux_execution'],
+    key="partenaires",
+    filters={'domaine_nom': selected_domain if selected_domain != "Tous" else None},
+    search_columns=['partenaire_name', 'domaine_nom', 'region_couverte']
 )
 
 # Visualisations
@@ -62,10 +67,10 @@ col1 = st.columns(1)[0]
 
 with col1:
     # Engagement par partenaire
-    fig = px.bar(filtered_partners, x='partenaire_name', y='montant_2025', 
+    fig = cached_figure("bar", filtered_partners, x='partenaire_name', y='montant_2025', 
                 title="Engagement financier par partenaire",
                 labels={'partenaire_name': 'Partenaire', 'montant_2025': 'Montant 2025 (USD)'})
-    st.plotly_chart(fig, use_container_width=True)
+    show_chart(fig)
 
 col1 = st.columns(1)[0] 
 with col1:
@@ -75,7 +80,7 @@ with col1:
     )
   
     # Construction du graphique
-    fig = px.scatter(
+    fig = cached_figure("scatter",
         filtered_partners,
         x="montant_2025",
         y="taux_execution",
@@ -87,49 +92,56 @@ with col1:
             "taux_execution": "Taux d'exécution (%)"
         }
     )
-    st.plotly_chart(fig, use_container_width=True)
+    show_chart(fig)
 
 col1, col2 = st.columns(2)
 
 with col1:
-    fig = px.pie(domain_stats, values='nombre_projets', names='domaine_nom', 
+    fig = cached_figure("pie", domain_stats, values='nombre_projets', names='domaine_nom', 
                 title="Répartition des partenaires par domaine")
-    st.plotly_chart(fig, use_container_width=True)
+    show_chart(fig)
 
 with col2:
-    fig = px.bar(domain_stats, x='domaine_nom', y='budget_total', 
+    fig = cached_figure("bar", domain_stats, x='domaine_nom', y='budget_total', 
                 title="Engagement financier par domaine",
                 labels={'domaine_nom': 'Domaine', 'montant_2025': 'Engagement total (USD)'})
-    st.plotly_chart(fig, use_container_width=True)
+    show_chart(fig)
+
+# Détails d'un partenaire sélectionné : la sélection ne relance que ce fragment
+@st.fragment
+def details_partenaire(partners):
+    st.subheader("Détails du Partenaire")
+    selected_partner = st.selectbox(
+        "Sélectionner un partenaire pour voir les détails",
+        options=partners['id'].tolist(),
+        format_func=dict(zip(partners['id'], partners['partenaire_name'])).get
+    )
 
-# Détails d'un partenaire sélectionné
-st.subheader("Détails du Partenaire")
-selected_partner = st.selectbox(
-    "Sélectionner un partenaire pour voir les détails",
-    options=filtered_partners['partenaire_name'].tolist()
-)
+    if selected_partner is None:
+        return
+
+    partner_details = partners[partners['id'] == selected_partner].iloc[0]
 
-if selected_partner:
-    partner_details = filtered_partners[filtered_partners['partenaire_name'] == selected_partner].iloc[0]
-    
     col1, col2 = st.columns(2)
-    
+
     with col1:
         st.write("**Nom du partenaire:**", partner_details['partenaire_name'])
         st.write("**Domaine:**", partner_details['domaine_nom'])
         st.write("**Région couverte:**", partner_details['region_couverte'])
-    
+
     with col2:
         st.write("**Engagement 2025:**", f"${partner_details['montant_2025']:,.2f}")
         st.write("**Taux d'exécution:**", f"{partner_details['taux_execution']:.2f}%")
-    
-    # Projets associés à ce partenaire (approximation basée sur le nom)
-    df_projects = get_projects()
-    related_projects = df_projects[df_projects['bailleur'].str.contains(selected_partner, case=False, na=False)]
-    
+
+    # Projets associés à ce partenaire (table partenaire_projet), mis en cache par partenaire
+    related_projects = get_partner_projects(selected_partner)
+
     if not related_projects.empty:
         st.subheader("Projets associés")
-        st.dataframe(
+        show_table(
             related_projects[['nom_projet', 'domaine_nom', 'montant_usd', 'date_debut', 'date_fin']],
+            key="projets_partenaire",
             use_container_width=True
-        )
\ No newline at end of file
+        )
+
+details_partenaire(filtered_partners)
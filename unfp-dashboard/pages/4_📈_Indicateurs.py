@@ -3,6 +3,9 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from utils.database import *
+from utils.tables import filtered_query, paginated_table
+from utils.exports import export_panel
+from utils.lite import show_chart
 
 # Configuration de la page
 st.set_page_config(page_title="Indicateurs UNFP", page_icon="📈", layout="wide")
@@ -78,14 +81,14 @@ if selected_indicator == "Tous" and selected_year == "Toutes":
         fig = px.bar(indicator_stats, x='indicator_name', y='value', 
                     title="Nombre de mesures par indicateur",
                     labels={'indicator_name': 'Indicateur', 'value': 'Nombre de mesures'})
-        st.plotly_chart(fig, use_container_width=True)
+        show_chart(fig)
     
     with col2:
         fig = px.scatter(indicator_stats, x='value', y='prefecture_name',
                         size='annee', color='indicator_name',
                         title="Couverture des indicateurs",
                         labels={'value': 'Mesures', 'prefecture_name': 'Préfectures couvertes'})
-        st.plotly_chart(fig, use_container_width=True)
+        show_chart(fig)
 
 else:
     # Analyse détaillée d'un indicateur spécifique
@@ -103,7 +106,7 @@ else:
             fig = px.line(yearly_avg, x='annee', y='value',
                          title=f"Évolution de {selected_indicator}",
                          labels={'annee': 'Année', 'value': 'Valeur moyenne'})
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart(fig)
         
         with col2:
             # Distribution par préfecture (pour la dernière année)
@@ -114,7 +117,7 @@ else:
                 fig = px.bar(latest_data, x='prefecture_name', y='value',
                             title=f"{selected_indicator} par préfecture ({latest_year})",
                             labels={'prefecture_name': 'Préfecture', 'value': 'Valeur'})
-                st.plotly_chart(fig, use_container_width=True)
+                show_chart(fig)
         
         # Carte choroplèthe (si des données géographiques sont disponibles)
         st.subheader("Visualisation Géographique")
@@ -143,23 +146,27 @@ else:
             )
             fig.update_layout(mapbox_style="open-street-map")
             fig.update_layout(margin={"r":0,"t":30,"l":0,"b":0})
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart(fig)
         else:
             st.info("Données géographiques insuffisantes pour afficher la carte.")
 
 # Tableau des données
 st.subheader("Données des Indicateurs")
-st.dataframe(
-    filtered_indicators[['indicator_name', 'value', 'annee', 'prefecture_name']],
-    use_container_width=True,
-    height=400
+indicator_filters = {
+    'indicator_name': selected_indicator if selected_indicator != "Tous" else None,
+    'annee': selected_year if selected_year != "Toutes" else None,
+    'prefecture_name': selected_prefecture if selected_prefecture != "Toutes" else None,
+}
+paginated_table(
+    TABLE_QUERIES["indicateurs"],
+    ['indicator_name', 'value', 'annee', 'prefecture_name'],
+    key="indicateurs",
+    filters=indicator_filters,
+    search_columns=['indicator_name', 'prefecture_name']
 )
 
-# Téléchargement des données
-csv = filtered_indicators.to_csv(index=False)
-st.download_button(
-    label="Télécharger les données en CSV",
-    data=csv,
-    file_name="indicateurs_unfp.csv",
-    mime="text/csv"
-)
\ No newline at end of file
+# Téléchargement des données (export diffusé depuis la base, en arrière-plan ;
+# indisponible en mode hors ligne, sans serveur PostgreSQL)
+if offline_bundle() is None:
+    export_query, export_params = filtered_query(TABLE_QUERIES["indicateurs"], indicator_filters)
+    export_panel(export_query, export_params, filename="indicateurs_unfp", key="indicateurs_export")
\ No newline at end of file
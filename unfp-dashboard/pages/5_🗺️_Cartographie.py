@@ -3,6 +3,9 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from utils.database import *
+from utils.tables import paginated_table
+from utils.clustering import ZOOM_LEVELS, cluster_pyramid, clusters_in_viewport, viewport_bounds
+from utils.lite import show_chart
 
 # Configuration de la page
 st.set_page_config(page_title="Cartographie UNFP", page_icon="🗺️", layout="wide")
@@ -18,6 +21,40 @@ if df_prefectures.empty:
     st.warning("Aucune donnée géographique disponible.")
     st.stop()
 
+def carte_regroupee(df_locations, title, label_col, weight_col=None, weight_label=None):
+    """Carte des points agrégés selon le zoom : au plus quelques centaines de marqueurs envoyés au navigateur"""
+    zoom = st.sidebar.slider("Niveau de zoom", min_value=ZOOM_LEVELS[0], max_value=ZOOM_LEVELS[-1], value=6)
+    center_name = st.sidebar.selectbox("Centrer sur", ["Guinée"] + df_prefectures['name'].tolist())
+    if center_name == "Guinée":
+        center_lat, center_lon = 10.4, -10.9
+    else:
+        center = df_prefectures[df_prefectures['name'] == center_name].iloc[0]
+        center_lat, center_lon = float(center['latitude']), float(center['longitude'])
+
+    pyramid = cluster_pyramid(df_locations, weight_col=weight_col, label_col=label_col)
+    markers = clusters_in_viewport(pyramid, zoom, viewport_bounds(center_lat, center_lon, zoom))
+
+    hover_data = {"count": True, "latitude": False, "longitude": False, "weight": weight_col is not None}
+    fig = px.scatter_mapbox(
+        markers,
+        lat="latitude",
+        lon="longitude",
+        size="count",
+        color="count",
+        hover_name="label",
+        hover_data=hover_data,
+        labels={"weight": weight_label} if weight_label else None,
+        size_max=40,
+        zoom=zoom,
+        center={"lat": center_lat, "lon": center_lon},
+        height=800,
+        title=title
+    )
+    fig.update_layout(mapbox_style="open-street-map")
+    fig.update_layout(margin={"r":0,"t":30,"l":0,"b":0})
+    show_chart(fig)
+    return markers
+
 # Menu de sélection de la couche cartographique
 st.sidebar.header("Couches Cartographiques")
 map_layer = st.sidebar.radio(
@@ -27,47 +64,65 @@ map_layer = st.sidebar.radio(
 
 # Données pour la carte
 if map_layer == "Projets":
-    st.header("Répartition Géographique des Projets")
+    project_view = st.sidebar.radio(
+        "Affichage des projets:",
+        ["Par préfecture", "Points regroupés"]
+    )
+
+    if project_view == "Points regroupés":
+        st.header("Projets Regroupés selon le Zoom")
+
+        # Une localisation de projet (projet_localisation) par point
+        df_locations = get_project_locations()
+
+        if df_locations.empty:
+            st.warning("Aucun projet localisé disponible.")
+        else:
+            markers = carte_regroupee(df_locations, "Projets regroupés selon le niveau de zoom",
+                                      label_col="nom_projet", weight_col="montant_usd", weight_label="Budget (USD)")
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Localisations de projets", len(df_locations))
+            with col2:
+                st.metric("Marqueurs affichés", len(markers))
+
+    else:
+        st.header("Répartition Géographique des Projets")
     
-    # Compter les projets par préfecture (approximation)
-    projects_by_prefecture = run_query("""
-        SELECT commune.prefecture_id, COUNT(projet.id) as project_count
-        FROM public.projet
-        JOIN public.fact_structure structure ON projet.id = structure.id
-        JOIN public.dim_commune commune ON structure.commune_id = commune.id
-        GROUP BY commune.prefecture_id;
-    """)
+        # Nombre de projets par préfecture (agrégat de projet_localisation)
+        projects_by_prefecture = run_named_query("projets_par_prefecture")
     
-    if projects_by_prefecture[0]:
-        project_counts = {pref_id: count for pref_id, count in projects_by_prefecture[0]}
-        df_prefectures['project_count'] = df_prefectures['id'].map(project_counts).fillna(0)
+        if projects_by_prefecture[0]:
+            project_counts = {pref_id: count for pref_id, count in projects_by_prefecture[0]}
+            df_prefectures['project_count'] = df_prefectures['id'].map(project_counts).fillna(0)
         
-        # Carte des projets
-        fig = px.scatter_mapbox(
-            df_prefectures,
-            lat="latitude",
-            lon="longitude",
-            size="project_count",
-            color="project_count",
-            hover_name="name",
-            hover_data={"project_count": True},
-            size_max=30,
-            zoom=5,
-            height=600,
-            title="Nombre de projets par préfecture"
-        )
-        fig.update_layout(mapbox_style="open-street-map")
-        fig.update_layout(margin={"r":0,"t":30,"l":0,"b":0})
-        st.plotly_chart(fig, use_container_width=True)
+            # Carte des projets
+            fig = px.scatter_mapbox(
+                df_prefectures,
+                lat="latitude",
+                lon="longitude",
+                size="project_count",
+                color="project_count",
+                hover_name="name",
+                hover_data={"project_count": True},
+                size_max=30,
+                zoom=5,
+                height=600,
+                title="Nombre de projets par préfecture"
+            )
+            fig.update_layout(mapbox_style="open-street-map")
+            fig.update_layout(margin={"r":0,"t":30,"l":0,"b":0})
+            show_chart(fig)
         
-        # Statistiques
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("Préfectures couvertes", f"{len(df_prefectures[df_prefectures['project_count'] > 0])}/{len(df_prefectures)}")
-        with col2:
-            st.metric("Projets totaux", df_prefectures['project_count'].sum())
-        with col3:
-            st.metric("Moyenne par préfecture", f"{df_prefectures['project_count'].mean():.1f}")
+            # Statistiques
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Préfectures couvertes", f"{len(df_prefectures[df_prefectures['project_count'] > 0])}/{len(df_prefectures)}")
+            with col2:
+                st.metric("Projets totaux", df_prefectures['project_count'].sum())
+            with col3:
+                st.metric("Moyenne par préfecture", f"{df_prefectures['project_count'].mean():.1f}")
 
 elif map_layer == "Indicateurs":
     st.header("Visualisation des Indicateurs par Préfecture")
@@ -112,58 +167,76 @@ elif map_layer == "Indicateurs":
         )
         fig.update_layout(mapbox_style="open-street-map")
         fig.update_layout(margin={"r":0,"t":30,"l":0,"b":0})
-        st.plotly_chart(fig, use_container_width=True)
+        show_chart(fig)
     else:
         st.warning("Aucune donnée d'indicateur disponible pour la sélection actuelle.")
 
 elif map_layer == "Structures":
-    st.header("Répartition des Structures par Préfecture")
+    structure_view = st.sidebar.radio(
+        "Affichage des structures:",
+        ["Par préfecture", "Points regroupés"]
+    )
+
+    if structure_view == "Points regroupés":
+        st.header("Structures Regroupées selon le Zoom")
+
+        df_locations = get_structure_locations()
+
+        if df_locations.empty:
+            st.warning("Aucune structure localisée disponible.")
+        else:
+            markers = carte_regroupee(df_locations, "Structures regroupées selon le niveau de zoom", label_col="org_name")
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Structures localisées", len(df_locations))
+            with col2:
+                st.metric("Marqueurs affichés", len(markers))
+
+    else:
+        st.header("Répartition des Structures par Préfecture")
     
-    # Compter les structures par préfecture
-    structures_by_prefecture = run_query("""
-        SELECT commune.prefecture_id, COUNT(fact_structure.id) as structure_count
-        FROM public.fact_structure
-        JOIN public.dim_commune commune ON fact_structure.commune_id = commune.id
-        GROUP BY commune.prefecture_id;
-    """)
+        # Compter les structures par préfecture
+        structures_by_prefecture = run_named_query("structures_par_prefecture")
     
-    if structures_by_prefecture[0]:
-        structure_counts = {pref_id: count for pref_id, count in structures_by_prefecture[0]}
-        df_prefectures['structure_count'] = df_prefectures['id'].map(structure_counts).fillna(0)
+        if structures_by_prefecture[0]:
+            structure_counts = {pref_id: count for pref_id, count in structures_by_prefecture[0]}
+            df_prefectures['structure_count'] = df_prefectures['id'].map(structure_counts).fillna(0)
         
-        # Carte des structures
-        fig = px.scatter_mapbox(
-            df_prefectures,
-            lat="latitude",
-            lon="longitude",
-            size="structure_count",
-            color="structure_count",
-            hover_name="name",
-            hover_data={"structure_count": True},
-            size_max=40,
-            zoom=6,
-            height=800,
-            title="Nombre de structures par préfecture"
-        )
-        fig.update_layout(mapbox_style="open-street-map")
-        fig.update_layout(margin={"r":0,"t":5,"l":0,"b":0})
-        st.plotly_chart(fig, use_container_width=True)
+            # Carte des structures
+            fig = px.scatter_mapbox(
+                df_prefectures,
+                lat="latitude",
+                lon="longitude",
+                size="structure_count",
+                color="structure_count",
+                hover_name="name",
+                hover_data={"structure_count": True},
+                size_max=40,
+                zoom=6,
+                height=800,
+                title="Nombre de structures par préfecture"
+            )
+            fig.update_layout(mapbox_style="open-street-map")
+            fig.update_layout(margin={"r":0,"t":5,"l":0,"b":0})
+            show_chart(fig)
         
-        # Statistiques
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("Préfectures avec structures", f"{len(df_prefectures[df_prefectures['structure_count'] > 0])}/{len(df_prefectures)}")
-        with col2:
-            st.metric("Structures totales", df_prefectures['structure_count'].sum())
-        with col3:
-            st.metric("Moyenne par préfecture", f"{df_prefectures['structure_count'].mean():.1f}")
+            # Statistiques
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Préfectures avec structures", f"{len(df_prefectures[df_prefectures['structure_count'] > 0])}/{len(df_prefectures)}")
+            with col2:
+                st.metric("Structures totales", df_prefectures['structure_count'].sum())
+            with col3:
+                st.metric("Moyenne par préfecture", f"{df_prefectures['structure_count'].mean():.1f}")
 
 # Tableau des données géographiques
 st.subheader("Données Géographiques des Préfectures")
-st.dataframe(
-    df_prefectures[['name', 'latitude', 'longitude']],
-    use_container_width=True,
-    height=400
+paginated_table(
+    TABLE_QUERIES["prefectures"],
+    ['name', 'latitude', 'longitude'],
+    key="prefectures",
+    search_columns=['name']
 )
 
 # Informations supplémentaires
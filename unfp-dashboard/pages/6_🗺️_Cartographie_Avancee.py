@@ -1,37 +1,18 @@
 import streamlit as st
 import pandas as pd
-import geopandas as gpd
-import matplotlib.pyplot as plt
 import plotly.express as px
 import plotly.graph_objects as go
-from urllib.request import urlopen
-import json
-import tempfile
-import os
+from utils.components import lazy_tabs
 from utils.database import get_projects
-
-
-# === Données simulées ===
-df_stats = pd.DataFrame({
-    "N_PREFECTU": ["CONAKRY", "KINDIA", "BOFFA", "DUBREKA", "MACENTA"],
-    "budget_total": [1_000_000, 2_500_000, 1_200_000, 900_000, 3_300_000],
-    "nombre_projets": [8, 15, 5, 3, 8]
-})
-
-# === Chargement et traitement du shapefile ===
-gdf = gpd.read_file("data/shapefiles/GN_LIMITE_PREFECTURES.shp").to_crs(epsg=4326)
-gdf["N_PREFECTU"] = gdf["N_PREFECTU"].str.upper()
-gdf = gdf.merge(df_stats, on="N_PREFECTU", how="left")
-gdf["lon"] = gdf.geometry.centroid.x
-gdf["lat"] = gdf.geometry.centroid.y
-
-gdf = gpd.read_file("C:/Users/Laby Damaro CAMARA/UNFPA_GUINEE/unfp-dashboard/data/shapefiles/GN_LIMITE_PREFECTURES.shp")
-
-
+from utils.exports import dataframe_to_xlsx
+from utils.geospatial import load_prefecture_boundaries, prefecture_geojson
+from utils.lite import show_chart, show_table
 
 
 # === Génération de la carte interactive ===
 def generer_carte(z_col):
+    # Shapefile chargé à la première carte affichée, puis mis en cache pour tout le processus
+    gdf = load_prefecture_boundaries()
     gdf_merged = gdf.merge(df, left_on='N_REGION', right_on='region')
     total = gdf_merged[z_col].sum()
     pourcentages = gdf_merged[z_col] / total * 100
@@ -42,8 +23,9 @@ def generer_carte(z_col):
     ]
 
     fig = go.Figure(go.Choroplethmapbox(
-        geojson=gdf_merged.__geo_interface__,
-        locations=gdf_merged.index,
+        geojson=prefecture_geojson(),
+        locations=gdf_merged["N_PREFECTU"],
+        featureidkey="properties.N_PREFECTU",
         z=gdf_merged[z_col].fillna(0),
         colorscale="YlGnBu" if z_col == "nombre_projets" else "YlOrRd",
         marker_opacity=0.8,
@@ -114,10 +96,8 @@ vis_type = st.sidebar.radio(
     ["Carte Choroplèthe", "Carte à Points", "Graphique à Barres"]
 )
 
-# Section principale
-tab1, tab2, tab3 = st.tabs(["Carte", "Données", "Statistiques"])
-
-with tab1:
+# Section principale : seule la vue sélectionnée est calculée (voir lazy_tabs)
+def vue_carte():
     if vis_type == "Carte Choroplèthe":
 
         # Texte descriptif
@@ -135,17 +115,12 @@ with tab1:
                 
 
         #st.header("Répartition Géographique")
-        
-        # Fusionner avec vos données
-        gdf_merged = gdf.merge(df, left_on='N_REGION', right_on='region')
-
-
 
         fig = generer_carte("nombre_projets")
         
       
         
-        st.plotly_chart(fig, use_container_width=True)
+        show_chart(fig)
         
     elif vis_type == "Carte à Points":
         st.subheader("Carte à Points des Projets par Région")
@@ -179,7 +154,7 @@ with tab1:
         )
         
         fig.update_layout(height=600, margin={"r":0,"t":30,"l":0,"b":0})
-        st.plotly_chart(fig, use_container_width=True)
+        show_chart(fig)
         
     else:
         st.subheader("Graphique à Barres des Projets par Région")
@@ -199,14 +174,15 @@ with tab1:
             title="Nombre de projets par région"
         )
         
-        st.plotly_chart(fig, use_container_width=True)
+        show_chart(fig)
 
-with tab2:
+def vue_donnees():
     st.subheader("Données des Projets par Région")
     
     # Afficher les données sous forme de tableau
-    st.dataframe(
+    show_table(
         df,
+        key="regions",
         column_config={
             "region": "Région",
             "nombre_projets": "Nombre de projets",
@@ -229,10 +205,14 @@ with tab2:
         )
     
     with col2:
-        # Pour Excel, on utiliserait df.to_excel() avec un buffer
-        st.info("Export Excel disponible sur demande")
+        st.download_button(
+            label="📥 Télécharger en Excel",
+            data=dataframe_to_xlsx(df),
+            file_name="projets_par_region.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
 
-with tab3:
+def vue_statistiques():
     st.subheader("Statistiques des Projets")
     
     # Calculer quelques statistiques
@@ -267,7 +247,13 @@ with tab3:
         title="Répartition en pourcentage des projets par région"
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    show_chart(fig)
+
+lazy_tabs({
+    "Carte": vue_carte,
+    "Données": vue_donnees,
+    "Statistiques": vue_statistiques,
+}, key="cartographie_vue")
 
 # Section d'information
 st.sidebar.markdown("---")
@@ -2,8 +2,11 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import numpy as np
+from datetime import datetime
+from utils.components import lazy_tabs
+from utils.database import DASHBOARD_QUERIES, get_named_frame, offline_bundle
+from utils.exports import export_panel
+from utils.lite import show_chart, show_table
 
 # Configuration de la page
 st.set_page_config(
@@ -63,49 +66,27 @@ Cette plateforme présente un tableau de bord complet de la mobilisation des res
 Visualisez les engagements financiers, les écarts de financement et les performances des partenaires.
 """)
 
-# Données de démonstration (à remplacer par vos vraies données)
-@st.cache_data
-def load_resource_data():
-    # Données des bailleurs de fonds
-    donors_data = {
-        'Bailleur': ['UE', 'USAID', 'Banque Mondiale', 'Gouvernement Guinéen', 'Canada', 'Suède', 'Japon', 'UNICEF', 'OMS', 'Fonds Mondial'],
-        'Engagement_2024': [2500000, 1800000, 2200000, 1500000, 950000, 850000, 750000, 600000, 550000, 500000],
-        'Deboursement_2024': [1950000, 1500000, 1800000, 1200000, 800000, 700000, 600000, 500000, 450000, 400000],
-        'Type': ['International', 'International', 'International', 'National', 'International', 'International', 'International', 'UN', 'UN', 'International']
-    }
-    
-    # Données des projets par domaine
-    projects_data = {
-        'Domaine': ['Santé reproductive', 'Égalité des genres', 'Population et développement', 'Jeunesse', 'Urgences'],
-        'Budget_total': [3500000, 2200000, 1800000, 1200000, 900000],
-        'Finance_acquise': [2800000, 1800000, 1500000, 900000, 600000],
-        'Pourcentage_finance': [80, 82, 83, 75, 67]
-    }
-    
-    # Données temporelles
-    dates = pd.date_range(start='2023-01-01', end='2024-06-01', freq='M')
-    time_data = {
-        'Mois': dates,
-        'Engagements': np.random.randint(200000, 500000, len(dates)).cumsum(),
-        'Deboursements': np.random.randint(150000, 450000, len(dates)).cumsum()
-    }
-    
-    return pd.DataFrame(donors_data), pd.DataFrame(projects_data), pd.DataFrame(time_data)
+# Chargement des agrégats précalculés en base (sql/002_mobilisation_ressources.sql) ;
+# les vues des onglets chargent leurs propres données à la demande
+projects_df = get_named_frame("mobilisation_domaines")
+
+if projects_df.empty:
+    st.warning("Aucune donnée de mobilisation des ressources disponible.")
+    st.stop()
 
-# Chargement des données
-donors_df, projects_df, time_df = load_resource_data()
+annee = projects_df['annee'].iloc[0]
 
 # Métriques clés
-st.subheader("📊 Indicateurs Clés de Mobilisation des Ressources")
+st.subheader(f"📊 Indicateurs Clés de Mobilisation des Ressources ({annee})")
 
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    total_budget = projects_df['Budget_total'].sum()
+    total_budget = projects_df['budget_total'].sum()
     st.metric("Budget Total", f"{total_budget:,.0f} USD")
     
 with col2:
-    total_funding = projects_df['Finance_acquise'].sum()
+    total_funding = projects_df['finance_acquise'].sum()
     st.metric("Financement Acquise", f"{total_funding:,.0f} USD")
     
 with col3:
@@ -113,7 +94,7 @@ with col3:
     st.metric("Déficit de Financement", f"{funding_gap:,.0f} USD")
     
 with col4:
-    funding_rate = (total_funding / total_budget) * 100
+    funding_rate = (total_funding / total_budget) * 100 if total_budget else 0
     st.metric("Taux de Financement", f"{funding_rate:.1f}%")
 
 # Barre de progression du financement
@@ -125,138 +106,142 @@ progress_html = f"""
 """
 st.markdown(progress_html, unsafe_allow_html=True)
 
-# Onglets pour différentes vues
-tab1, tab2, tab3, tab4 = st.tabs(["Bailleurs de Fonds", "Projets par Domaine", "Évolution Temporelle", "Analyse des Gaps"])
-
-with tab1:
+# Vues des onglets : seule la vue sélectionnée est calculée (voir lazy_tabs)
+def vue_bailleurs():
     st.subheader("🤝 Bailleurs de Fonds et Partenaires")
-    
-    # Graphique des engagements par bailleur
-    fig = px.bar(donors_df, x='Bailleur', y='Engagement_2024', 
-                 color='Type', title="Engagements des Bailleurs en 2024 (USD)",
-                 labels={'Engagement_2024': 'Montant Engagé (USD)', 'Bailleur': 'Bailleur de Fonds'})
-    st.plotly_chart(fig, use_container_width=True)
-    
-    # Taux de décaissement par bailleur
-    donors_df['Taux_Deboursement'] = (donors_df['Deboursement_2024'] / donors_df['Engagement_2024']) * 100
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        fig = px.bar(donors_df, x='Bailleur', y='Taux_Deboursement', 
-                     title="Taux de Déboursement par Bailleur (%)",
-                     labels={'Taux_Deboursement': 'Taux de Déboursement (%)', 'Bailleur': 'Bailleur de Fonds'})
-        st.plotly_chart(fig, use_container_width=True)
-    
-    with col2:
-        fig = px.pie(donors_df, values='Engagement_2024', names='Bailleur', 
-                     title="Répartition des Engagements par Bailleur")
-        st.plotly_chart(fig, use_container_width=True)
-    
-    # Tableau détaillé des bailleurs
-    st.subheader("Tableau Détaillé des Bailleurs")
-    donors_display = donors_df.copy()
-    donors_display['Engagement_2024'] = donors_display['Engagement_2024'].apply(lambda x: f"{x:,.0f} USD")
-    donors_display['Deboursement_2024'] = donors_display['Deboursement_2024'].apply(lambda x: f"{x:,.0f} USD")
-    donors_display['Taux_Deboursement'] = donors_display['Taux_Deboursement'].apply(lambda x: f"{x:.1f}%")
-    
-    st.dataframe(donors_display, use_container_width=True)
 
-with tab2:
+    donors_df = get_named_frame("mobilisation_bailleurs")
+
+    if donors_df.empty:
+        st.info("Aucun engagement de bailleur enregistré.")
+    else:
+        # Graphique des engagements par bailleur
+        fig = px.bar(donors_df, x='bailleur', y='engagement', 
+                     color='type', title=f"Engagements des Bailleurs en {donors_df['annee'].iloc[0]} (USD)",
+                     labels={'engagement': 'Montant Engagé (USD)', 'bailleur': 'Bailleur de Fonds'})
+        show_chart(fig)
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Taux de décaissement calculé en base
+            fig = px.bar(donors_df, x='bailleur', y='taux_decaissement', 
+                         title="Taux de Déboursement par Bailleur (%)",
+                         labels={'taux_decaissement': 'Taux de Déboursement (%)', 'bailleur': 'Bailleur de Fonds'})
+            show_chart(fig)
+        
+        with col2:
+            fig = px.pie(donors_df, values='engagement', names='bailleur', 
+                         title="Répartition des Engagements par Bailleur")
+            show_chart(fig)
+        
+        # Tableau détaillé des bailleurs
+        st.subheader("Tableau Détaillé des Bailleurs")
+        donors_display = donors_df[['bailleur', 'type', 'engagement', 'decaissement', 'taux_decaissement']].copy()
+        donors_display['engagement'] = donors_display['engagement'].apply(lambda x: f"{x:,.0f} USD")
+        donors_display['decaissement'] = donors_display['decaissement'].apply(lambda x: f"{x:,.0f} USD")
+        donors_display['taux_decaissement'] = donors_display['taux_decaissement'].apply(lambda x: f"{x:.1f}%" if pd.notna(x) else "-")
+        donors_display.columns = ['Bailleur', 'Type', 'Engagement', 'Déboursement', 'Taux de Déboursement']
+        
+        show_table(donors_display, key="bailleurs", use_container_width=True)
+
+def vue_domaines():
     st.subheader("📋 Financement par Domaine d'Intervention")
     
     # Graphique des budgets par domaine
-    fig = px.bar(projects_df, x='Domaine', y='Budget_total', 
+    fig = px.bar(projects_df, x='domaine', y='budget_total', 
                  title="Budget Total par Domaine (USD)",
-                 labels={'Budget_total': 'Budget Total (USD)', 'Domaine': 'Domaine d Intervention'})
-    st.plotly_chart(fig, use_container_width=True)
+                 labels={'budget_total': 'Budget Total (USD)', 'domaine': 'Domaine d Intervention'})
+    show_chart(fig)
     
     # Diagramme en entonnoir du financement
-    fig = px.funnel(projects_df, x='Budget_total', y='Domaine', 
+    fig = px.funnel(projects_df, x='budget_total', y='domaine', 
                     title='Budget Total par Domaine',
-                    labels={'Budget_total': 'Budget Total (USD)', 'Domaine': 'Domaine d Intervention'})
-    st.plotly_chart(fig, use_container_width=True)
+                    labels={'budget_total': 'Budget Total (USD)', 'domaine': 'Domaine d Intervention'})
+    show_chart(fig)
     
     # Financement acquis vs budget
-    projects_melted = projects_df.melt(id_vars=['Domaine'], 
-                                      value_vars=['Budget_total', 'Finance_acquise'],
+    projects_melted = projects_df.melt(id_vars=['domaine'], 
+                                      value_vars=['budget_total', 'finance_acquise'],
                                       var_name='Type', value_name='Montant')
     
-    fig = px.bar(projects_melted, x='Domaine', y='Montant', color='Type',
+    fig = px.bar(projects_melted, x='domaine', y='Montant', color='Type',
                  barmode='group', title='Budget vs Financement Acquis par Domaine',
-                 labels={'Montant': 'Montant (USD)', 'Domaine': 'Domaine d Intervention'})
-    st.plotly_chart(fig, use_container_width=True)
+                 labels={'Montant': 'Montant (USD)', 'domaine': 'Domaine d Intervention'})
+    show_chart(fig)
     
     # Tableau des projets
     st.subheader("Détail du Financement par Domaine")
-    projects_display = projects_df.copy()
-    projects_display['Budget_total'] = projects_display['Budget_total'].apply(lambda x: f"{x:,.0f} USD")
-    projects_display['Finance_acquise'] = projects_display['Finance_acquise'].apply(lambda x: f"{x:,.0f} USD")
-    projects_display['Pourcentage_finance'] = projects_display['Pourcentage_finance'].apply(lambda x: f"{x:.1f}%")
+    projects_display = projects_df[['domaine', 'budget_total', 'finance_acquise', 'pourcentage_finance']].copy()
+    projects_display['budget_total'] = projects_display['budget_total'].apply(lambda x: f"{x:,.0f} USD")
+    projects_display['finance_acquise'] = projects_display['finance_acquise'].apply(lambda x: f"{x:,.0f} USD")
+    projects_display['pourcentage_finance'] = projects_display['pourcentage_finance'].apply(lambda x: f"{x:.1f}%" if pd.notna(x) else "-")
+    projects_display.columns = ['Domaine', 'Budget Total', 'Financement Acquis', 'Pourcentage Financé']
     
-    st.dataframe(projects_display, use_container_width=True)
+    show_table(projects_display, key="domaines", use_container_width=True)
 
-with tab3:
+def vue_temporelle():
     st.subheader("📈 Évolution Temporelle des Ressources")
-    
-    # Graphique d'évolution des engagements et décaissements
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=time_df['Mois'], y=time_df['Engagements'], 
-                             mode='lines+markers', name='Engagements', line=dict(color='blue')))
-    fig.add_trace(go.Scatter(x=time_df['Mois'], y=time_df['Deboursements'], 
-                             mode='lines+markers', name='Décaissements', line=dict(color='green')))
-    
-    fig.update_layout(title='Évolution des Engagements et Décaissements au fil du temps',
-                      xaxis_title='Mois',
-                      yaxis_title='Montant (USD)',
-                      legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
-    
-    st.plotly_chart(fig, use_container_width=True)
-    
-    # Graphique à barres empilées mensuelles
-    time_df['Mois_str'] = time_df['Mois'].dt.strftime('%Y-%m')
-    time_df['Engagements_Mensuels'] = time_df['Engagements'].diff().fillna(time_df['Engagements'])
-    time_df['Deboursements_Mensuels'] = time_df['Deboursements'].diff().fillna(time_df['Deboursements'])
-    
-    fig = go.Figure()
-    fig.add_trace(go.Bar(x=time_df['Mois_str'], y=time_df['Engagements_Mensuels'], 
-                         name='Engagements Mensuels', marker_color='blue'))
-    fig.add_trace(go.Bar(x=time_df['Mois_str'], y=time_df['Deboursements_Mensuels'], 
-                         name='Décaissements Mensuels', marker_color='green'))
-    
-    fig.update_layout(title='Engagements et Décaissements Mensuels',
-                      xaxis_title='Mois',
-                      yaxis_title='Montant (USD)',
-                      barmode='group')
-    
-    st.plotly_chart(fig, use_container_width=True)
 
-with tab4:
+    # Cumuls mensuels calculés en base par fonctions de fenêtrage
+    time_df = get_named_frame("mobilisation_mensuelle")
+
+    if time_df.empty:
+        st.info("Aucun mouvement financier enregistré.")
+    else:
+        # Graphique d'évolution des engagements et décaissements
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=time_df['mois'], y=time_df['engagements_cumules'], 
+                                 mode='lines+markers', name='Engagements', line=dict(color='blue')))
+        fig.add_trace(go.Scatter(x=time_df['mois'], y=time_df['decaissements_cumules'], 
+                                 mode='lines+markers', name='Décaissements', line=dict(color='green')))
+        
+        fig.update_layout(title='Évolution des Engagements et Décaissements au fil du temps',
+                          xaxis_title='Mois',
+                          yaxis_title='Montant (USD)',
+                          legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+        
+        show_chart(fig)
+        
+        # Graphique à barres empilées mensuelles
+        time_df['mois_str'] = pd.to_datetime(time_df['mois']).dt.strftime('%Y-%m')
+        
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=time_df['mois_str'], y=time_df['engagements'], 
+                             name='Engagements Mensuels', marker_color='blue'))
+        fig.add_trace(go.Bar(x=time_df['mois_str'], y=time_df['decaissements'], 
+                             name='Décaissements Mensuels', marker_color='green'))
+        
+        fig.update_layout(title='Engagements et Décaissements Mensuels',
+                          xaxis_title='Mois',
+                          yaxis_title='Montant (USD)',
+                          barmode='group')
+        
+        show_chart(fig)
+
+def vue_gaps():
     st.subheader("🔍 Analyse des Gaps de Financement")
     
-    # Calcul des gaps par domaine
-    projects_df['Gap'] = projects_df['Budget_total'] - projects_df['Finance_acquise']
-    
-    # Graphique des gaps de financement
-    fig = px.bar(projects_df, x='Domaine', y='Gap', 
+    # Gaps par domaine calculés en base
+    fig = px.bar(projects_df, x='domaine', y='gap', 
                  title="Gap de Financement par Domaine (USD)",
-                 labels={'Gap': 'Déficit de Financement (USD)', 'Domaine': 'Domaine d Intervention'})
-    st.plotly_chart(fig, use_container_width=True)
+                 labels={'gap': 'Déficit de Financement (USD)', 'domaine': 'Domaine d Intervention'})
+    show_chart(fig)
     
     # Carte thermique des priorités de financement
-    projects_df['Priorite'] = projects_df['Gap'] / projects_df['Budget_total'] * 100
+    projects_df['Priorite'] = projects_df['gap'] / projects_df['budget_total'] * 100
     fig = px.imshow([projects_df['Priorite'].values], 
                     labels=dict(x="Domaines", y="Priorité", color="Niveau de Priorité"),
-                    x=projects_df['Domaine'].values,
+                    x=projects_df['domaine'].values,
                     color_continuous_scale='Reds',
                     title="Priorité de Financement par Domaine")
-    st.plotly_chart(fig, use_container_width=True)
+    show_chart(fig)
     
     # Recommendations
     st.subheader("Recommandations Stratégiques")
     
     for idx, row in projects_df.iterrows():
-        with st.expander(f"Recommandations pour {row['Domaine']} (Déficit: {row['Gap']:,.0f} USD)"):
+        with st.expander(f"Recommandations pour {row['domaine']} (Déficit: {row['gap']:,.0f} USD)"):
             st.markdown(f"""
             **Niveau de priorité:** {'Élevé' if row['Priorite'] > 30 else 'Moyen' if row['Priorite'] > 15 else 'Faible'}
             
@@ -266,9 +251,16 @@ with tab4:
             - Développer des propositions de projet ciblées
             - Explorer les financements innovants (privé, fondations)
             
-            **Objectif:** Réduire le gap de {row['Gap']:,.0f} USD
+            **Objectif:** Réduire le gap de {row['gap']:,.0f} USD
             """)
 
+lazy_tabs({
+    "Bailleurs de Fonds": vue_bailleurs,
+    "Projets par Domaine": vue_domaines,
+    "Évolution Temporelle": vue_temporelle,
+    "Analyse des Gaps": vue_gaps,
+}, key="mobilisation_vue")
+
 # Section de projections et objectifs
 st.markdown("---")
 st.subheader("🎯 Projections et Objectifs 2024-2025")
@@ -299,43 +291,30 @@ with col2:
     
     fig.update_layout(barmode='group', title='Objectifs de Performance 2024-2025',
                       yaxis_title='Valeur (%) / Jours')
-    st.plotly_chart(fig, use_container_width=True)
+    show_chart(fig)
 
-# Section de téléchargement et export
-st.markdown("---")
-st.subheader("📤 Export des Données")
+# Section de téléchargement et export (pas d'export en mode hors ligne :
+# le paquet DuckDB n'a pas de serveur PostgreSQL derrière lui)
+if offline_bundle() is None:
+    st.markdown("---")
+    st.subheader("📤 Export des Données")
 
-col1, col2, col3 = st.columns(3)
+    col1, col2, col3 = st.columns(3)
 
-with col1:
-    if st.button("📊 Exporter données bailleurs"):
-        csv = donors_df.to_csv(index=False)
-        st.download_button(
-            label="Télécharger CSV",
-            data=csv,
-            file_name="unfpa_bailleurs_ressources.csv",
-            mime="text/csv"
-        )
+    with col1:
+        st.markdown("**📊 Données bailleurs**")
+        export_panel(DASHBOARD_QUERIES["mobilisation_bailleurs"], None,
+                     filename="unfpa_bailleurs_ressources", key="export_bailleurs")
 
-with col2:
-    if st.button("📋 Exporter données projets"):
-        csv = projects_df.to_csv(index=False)
-        st.download_button(
-            label="Télécharger CSV",
-            data=csv,
-            file_name="unfpa_projets_financement.csv",
-            mime="text/csv"
-        )
+    with col2:
+        st.markdown("**📋 Données projets**")
+        export_panel(DASHBOARD_QUERIES["mobilisation_domaines"], None,
+                     filename="unfpa_projets_financement", key="export_domaines")
 
-with col3:
-    if st.button("📈 Exporter données temporelles"):
-        csv = time_df.to_csv(index=False)
-        st.download_button(
-            label="Télécharger CSV",
-            data=csv,
-            file_name="unfpa_evolution_ressources.csv",
-            mime="text/csv"
-        )
+    with col3:
+        st.markdown("**📈 Données temporelles**")
+        export_panel(DASHBOARD_QUERIES["mobilisation_mensuelle"], None,
+                     filename="unfpa_evolution_ressources", key="export_mensuel")
 
 # Pied de page
 st.markdown("---")
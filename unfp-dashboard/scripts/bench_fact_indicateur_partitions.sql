@@ -0,0 +1,71 @@
+-- Compare les plans d'une requête filtrée sur une année :
+-- fact_indicateur non partitionnée et partitionnée par année
+-- (sql/007_fact_indicateur_partitions.sql).
+--
+-- Les données sont synthétiques (tables temporaires, 10 millions
+-- d'indicateurs sur 2015–2025) : le script ne modifie pas la base.
+-- Attendu : le plan partitionné ne parcourt que bench_indicateur_2023.
+--
+-- Usage :
+--     psql -d unfpa -f scripts/bench_fact_indicateur_partitions.sql
+
+\timing on
+
+BEGIN;
+
+CREATE TEMP TABLE bench_indicateur_plat AS
+SELECT id::bigint AS id,
+       (1 + id % 34)::smallint AS prefecture_id,
+       'Indicateur ' || (id % 200) AS indicator_name,
+       (random() * 100)::numeric(6,2)::text AS value,
+       (2015 + id % 11)::smallint AS annee
+FROM generate_series(1, 10000000) id;
+CREATE INDEX ON bench_indicateur_plat (prefecture_id, indicator_name);
+CREATE INDEX ON bench_indicateur_plat (annee);
+
+CREATE TEMP TABLE bench_indicateur (
+    id bigint NOT NULL,
+    prefecture_id smallint,
+    indicator_name text NOT NULL,
+    value text,
+    annee smallint NOT NULL
+) PARTITION BY RANGE (annee);
+
+SELECT format('CREATE TEMP TABLE bench_indicateur_%s PARTITION OF bench_indicateur FOR VALUES FROM (%s) TO (%s)',
+              annee, annee, annee + 1)
+FROM generate_series(2015, 2025) annee
+\gexec
+
+INSERT INTO bench_indicateur SELECT * FROM bench_indicateur_plat;
+CREATE INDEX ON bench_indicateur (prefecture_id, indicator_name);
+CREATE INDEX ON bench_indicateur USING brin (id);
+
+ANALYZE bench_indicateur_plat, bench_indicateur;
+
+\echo '--- Indicateurs 2023 par préfecture, table non partitionnée'
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT prefecture_id, indicator_name, COUNT(*)
+FROM bench_indicateur_plat
+WHERE annee = 2023
+GROUP BY prefecture_id, indicator_name;
+
+\echo '--- Indicateurs 2023 par préfecture, table partitionnée'
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT prefecture_id, indicator_name, COUNT(*)
+FROM bench_indicateur
+WHERE annee = 2023
+GROUP BY prefecture_id, indicator_name;
+
+\echo '--- Une préfecture en 2023, table non partitionnée'
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT indicator_name, value
+FROM bench_indicateur_plat
+WHERE annee = 2023 AND prefecture_id = 12;
+
+\echo '--- Une préfecture en 2023, table partitionnée'
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT indicator_name, value
+FROM bench_indicateur
+WHERE annee = 2023 AND prefecture_id = 12;
+
+ROLLBACK;
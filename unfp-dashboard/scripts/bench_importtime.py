@@ -0,0 +1,69 @@
+"""Mesure le coût des imports de chaque page avec `python -X importtime`.
+
+Pour chaque page (et app.py), les instructions d'import du module sont
+extraites puis exécutées seules dans un interpréteur neuf : on obtient le
+temps cumulé des imports de premier niveau et la mémoire résidente maximale,
+sans exécuter le code Streamlit de la page.
+
+Usage (depuis unfp-dashboard/) :
+    python scripts/bench_importtime.py [--repeat 3]
+"""
+import argparse
+import ast
+import glob
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def page_imports(path):
+    """Retourne le code des imports de premier niveau d'un script"""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source)
+    lines = [ast.get_source_segment(source, node) for node in tree.body
+             if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(lines)
+
+def measure(code):
+    """Exécute les imports dans un nouveau processus ; retourne (ms, RSS en Mo)"""
+    probe = code + "\nimport resource\nprint(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=APP_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        # Seuls les modules de premier niveau (non indentés) sont additionnés
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative_us)
+    rss_mb = int(proc.stdout.strip().splitlines()[-1]) / 1024
+    return total_us / 1000, rss_mb
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="nombre de mesures par page (on garde la meilleure)")
+    args = parser.parse_args()
+
+    scripts = [os.path.join(APP_DIR, "app.py")] + sorted(glob.glob(os.path.join(APP_DIR, "pages", "*.py")))
+    print(f"{'Page':<45} {'imports (ms)':>13} {'RSS (Mo)':>10}")
+    for path in scripts:
+        name = os.path.relpath(path, APP_DIR)
+        try:
+            runs = [measure(page_imports(path)) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{name:<45} erreur: {e}")
+            continue
+        best_ms = min(ms for ms, _ in runs)
+        best_rss = min(rss for _, rss in runs)
+        print(f"{name:<45} {best_ms:>13.1f} {best_rss:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Mesure le volume envoyé au navigateur par chaque page, en mode complet et allégé.
+
+Chaque page (et app.py) est exécutée une fois par mode avec le testeur de
+Streamlit (streamlit.testing), sur la base configurée dans
+.streamlit/secrets.toml. Le volume compté est celui des messages transmis au
+navigateur (éléments, figures plotly sérialisées, tableaux Arrow) et des
+fichiers servis par Streamlit pour la page (images de st.image). Les images
+statiques (fond de page, voir scripts/build_assets.py) et le code JavaScript
+de l'interface, mis en cache par le navigateur, ne sont pas comptés.
+
+Le mode allégé doit rester sous PAGE_PAYLOAD_BUDGET (utils/lite.py).
+
+Usage (depuis unfp-dashboard/) :
+    python scripts/bench_payload.py [--timeout 60]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+os.chdir(APP_DIR)
+
+from streamlit.runtime.media_file_manager import MediaFileManager  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner  # noqa: E402
+
+from utils.lite import LITE_PARAM, PAGE_PAYLOAD_BUDGET  # noqa: E402
+
+# Octets comptés pendant l'exécution en cours
+_payload = {"messages": 0, "media": 0}
+
+def _count_messages(run):
+    """Enveloppe LocalScriptRunner.run pour additionner la taille des messages transmis"""
+    def wrapper(self, *args, **kwargs):
+        tree = run(self, *args, **kwargs)
+        _payload["messages"] += sum(msg.ByteSize() for msg in self.forward_msgs())
+        return tree
+    return wrapper
+
+def _count_media(add):
+    """Enveloppe MediaFileManager.add pour additionner la taille des fichiers servis"""
+    def wrapper(self, path_or_data, *args, **kwargs):
+        if isinstance(path_or_data, bytes):
+            _payload["media"] += len(path_or_data)
+        elif os.path.exists(path_or_data):
+            _payload["media"] += os.path.getsize(path_or_data)
+        return add(self, path_or_data, *args, **kwargs)
+    return wrapper
+
+def measure(path, lite, timeout):
+    """Exécute une page ; retourne (octets des messages, octets des fichiers, secondes, erreurs)"""
+    _payload.update(messages=0, media=0)
+    at = AppTest.from_file(path, default_timeout=timeout)
+    at.query_params[LITE_PARAM] = "1" if lite else "0"
+    started = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - started
+    errors = len(at.exception) + len(at.error)
+    return _payload["messages"], _payload["media"], elapsed, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--timeout", type=float, default=60, help="durée maximale d'exécution d'une page (s)")
+    args = parser.parse_args()
+
+    LocalScriptRunner.run = _count_messages(LocalScriptRunner.run)
+    MediaFileManager.add = _count_media(MediaFileManager.add)
+
+    scripts = [os.path.join(APP_DIR, "app.py")] + sorted(glob.glob(os.path.join(APP_DIR, "pages", "*.py")))
+    print(f"Budget du mode allégé : {PAGE_PAYLOAD_BUDGET / 1024:.0f} Ko par page\n")
+    print(f"{'Page':<45} {'complet (Ko)':>13} {'allégé (Ko)':>12} {'dont images':>12} {'rendu (s)':>10}")
+    over_budget = []
+    for path in scripts:
+        name = os.path.relpath(path, APP_DIR)
+        full_messages, full_media, _, full_errors = measure(path, False, args.timeout)
+        messages, media, elapsed, errors = measure(path, True, args.timeout)
+        lite_total = messages + media
+        if lite_total > PAGE_PAYLOAD_BUDGET:
+            over_budget.append(name)
+        flag = "  (erreurs à l'exécution)" if full_errors or errors else ""
+        print(f"{name:<45} {(full_messages + full_media) / 1024:>13.0f} {lite_total / 1024:>12.0f} "
+              f"{media / 1024:>12.0f} {elapsed:>10.1f}{flag}")
+
+    if over_budget:
+        print(f"\nHors budget en mode allégé : {', '.join(over_budget)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
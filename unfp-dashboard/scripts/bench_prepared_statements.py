@@ -0,0 +1,106 @@
+"""Mesure le gain des instructions préparées sur les requêtes fréquentes.
+
+Pour chaque requête de PREPARED_QUERIES, la même boucle est exécutée en
+texte (planifiée à chaque appel) puis via PREPARE/EXECUTE, par plusieurs
+clients simultanés : on obtient le débit (requêtes/s), la latence moyenne,
+et le temps de planification moyen relevé par EXPLAIN (ANALYZE, SUMMARY).
+
+Usage (depuis unfp-dashboard/) :
+    python scripts/bench_prepared_statements.py [--iterations 2000] [--clients 4]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import psycopg2
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+os.chdir(APP_DIR)
+
+from utils.database import DASHBOARD_QUERIES, PREPARED_QUERIES, _connection_params, _positional  # noqa: E402
+
+# Au-delà de cinq exécutions, PostgreSQL peut retenir un plan générique
+WARMUP = 6
+
+def connect():
+    conn = psycopg2.connect(**_connection_params())
+    conn.autocommit = True
+    return conn
+
+def statement(name, prepared):
+    """Texte exécuté à chaque itération"""
+    return f"EXECUTE bench_{name};" if prepared else DASHBOARD_QUERIES[name]
+
+def prepare(cur, name):
+    cur.execute(f"PREPARE bench_{name} AS {_positional(DASHBOARD_QUERIES[name])};")
+
+def client(name, prepared, iterations, barrier, durations):
+    """Boucle d'un client ; ajoute sa durée totale à durations"""
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            if prepared:
+                prepare(cur, name)
+            sql = statement(name, prepared)
+            for _ in range(WARMUP):
+                cur.execute(sql)
+                cur.fetchall()
+            barrier.wait()
+            started = time.perf_counter()
+            for _ in range(iterations):
+                cur.execute(sql)
+                cur.fetchall()
+            durations.append(time.perf_counter() - started)
+    finally:
+        conn.close()
+
+def throughput(name, prepared, iterations, clients):
+    """Retourne (requêtes/s, latence moyenne en ms)"""
+    barrier = threading.Barrier(clients)
+    durations = []
+    threads = [threading.Thread(target=client, args=(name, prepared, iterations, barrier, durations))
+               for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return clients * iterations / max(durations), 1000 * sum(durations) / (clients * iterations)
+
+def planning_ms(name, prepared, samples=20):
+    """Temps de planification moyen (ms) relevé par EXPLAIN"""
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            if prepared:
+                prepare(cur, name)
+            sql = statement(name, prepared).strip().rstrip(";")
+            for _ in range(WARMUP):
+                cur.execute(sql)
+                cur.fetchall()
+            total = 0.0
+            for _ in range(samples):
+                cur.execute(f"EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) {sql}")
+                total += cur.fetchone()[0][0]["Planning Time"]
+            return total / samples
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000, help="exécutions par client")
+    parser.add_argument("--clients", type=int, default=4, help="clients simultanés")
+    args = parser.parse_args()
+
+    print(f"{'Requête':<28} {'mode':<9} {'req/s':>9} {'latence (ms)':>13} {'planif. (ms)':>13}")
+    for name in PREPARED_QUERIES:
+        for prepared in (False, True):
+            qps, latency = throughput(name, prepared, args.iterations, args.clients)
+            plan = planning_ms(name, prepared)
+            mode = "préparée" if prepared else "texte"
+            print(f"{name:<28} {mode:<9} {qps:>9.0f} {latency:>13.3f} {plan:>13.3f}")
+
+if __name__ == "__main__":
+    main()
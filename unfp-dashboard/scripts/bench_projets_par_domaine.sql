@@ -0,0 +1,59 @@
+-- Compare les plans de la répartition des projets par domaine :
+-- ancienne forme (projet.domaine en texte, jointure CAST(d.id AS TEXT))
+-- et forme canonique (dim_projet.domaine_id entier, indexé).
+--
+-- Les données sont synthétiques (tables temporaires, 500 000 projets) :
+-- le script ne modifie pas la base.
+--
+-- Usage :
+--     psql -d unfpa -f scripts/bench_projets_par_domaine.sql
+
+\timing on
+
+BEGIN;
+
+CREATE TEMP TABLE bench_domaine AS
+SELECT id::smallint AS id, 'Domaine ' || id AS name
+FROM generate_series(1, 40) id;
+ALTER TABLE bench_domaine ADD PRIMARY KEY (id);
+
+CREATE TEMP TABLE bench_projet_texte AS
+SELECT id, (1 + id % 40)::text AS domaine, (random() * 1e6)::numeric(15,2) AS montant_usd
+FROM generate_series(1, 500000) id;
+
+CREATE TEMP TABLE bench_projet_canonique AS
+SELECT id, domaine::integer AS domaine_id, montant_usd
+FROM bench_projet_texte;
+CREATE INDEX ON bench_projet_canonique (domaine_id);
+
+ANALYZE bench_domaine, bench_projet_texte, bench_projet_canonique;
+
+\echo '--- Répartition complète, ancienne forme'
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT d.name, COUNT(p.id)
+FROM bench_projet_texte p
+LEFT JOIN bench_domaine d ON p.domaine = CAST(d.id AS TEXT)
+GROUP BY d.name;
+
+\echo '--- Répartition complète, forme canonique'
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT d.name, COUNT(p.id)
+FROM bench_projet_canonique p
+LEFT JOIN bench_domaine d ON p.domaine_id = d.id
+GROUP BY d.name;
+
+\echo '--- Un domaine, ancienne forme'
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT COUNT(p.id), SUM(p.montant_usd)
+FROM bench_projet_texte p
+JOIN bench_domaine d ON p.domaine = CAST(d.id AS TEXT)
+WHERE d.name = 'Domaine 7';
+
+\echo '--- Un domaine, forme canonique'
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT COUNT(p.id), SUM(p.montant_usd)
+FROM bench_projet_canonique p
+JOIN bench_domaine d ON p.domaine_id = d.id
+WHERE d.name = 'Domaine 7';
+
+ROLLBACK;
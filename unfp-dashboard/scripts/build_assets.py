@@ -0,0 +1,76 @@
+"""Prépare les images de fond pour le service statique de Streamlit.
+
+Chaque PNG de assets/images est redimensionné, converti en WebP et écrit
+dans static/ sous un nom contenant l'empreinte de son contenu ; le fichier
+static/manifest.json associe le nom d'origine au fichier produit. Les pages
+référencent ensuite l'image par URL (voir utils/assets.py) au lieu de
+l'inclure en base64 dans chaque réponse.
+
+AVIF n'est pas produit : le service statique de Streamlit ne le déclare pas
+comme type sûr et le servirait en text/plain.
+
+Usage (depuis unfp-dashboard/) :
+    python scripts/build_assets.py [--max-width 1920] [--quality 80]
+"""
+import argparse
+import base64
+import glob
+import hashlib
+import io
+import json
+import os
+
+from PIL import Image
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DIR = os.path.join(APP_DIR, "assets", "images")
+STATIC_DIR = os.path.join(APP_DIR, "static")
+MANIFEST_PATH = os.path.join(STATIC_DIR, "manifest.json")
+
+def optimize(path, max_width, quality):
+    """Redimensionne et encode une image en WebP ; retourne les octets produits"""
+    with Image.open(path) as img:
+        img = img.convert("RGB")
+        if img.width > max_width:
+            img = img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+        buffer = io.BytesIO()
+        img.save(buffer, format="WEBP", quality=quality, method=6)
+    return buffer.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-width", type=int, default=1920)
+    parser.add_argument("--quality", type=int, default=80)
+    args = parser.parse_args()
+
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    manifest = {}
+    print(f"{'Image':<25} {'inline base64':>14} {'WebP':>10}")
+    for path in sorted(glob.glob(os.path.join(SOURCE_DIR, "*.png"))):
+        name = os.path.basename(path)
+        data = optimize(path, args.max_width, args.quality)
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        filename = f"{os.path.splitext(name)[0]}.{digest}.webp"
+        with open(os.path.join(STATIC_DIR, filename), "wb") as f:
+            f.write(data)
+        manifest[name] = {"file": filename, "hash": digest, "bytes": len(data)}
+
+        with open(path, "rb") as f:
+            inline_bytes = len(base64.b64encode(f.read()))
+        print(f"{name:<25} {inline_bytes / 1024:>11.0f} Ko {len(data) / 1024:>7.0f} Ko")
+
+    # Supprimer les versions précédentes devenues orphelines
+    produced = {entry["file"] for entry in manifest.values()}
+    for path in glob.glob(os.path.join(STATIC_DIR, "*.webp")):
+        if os.path.basename(path) not in produced:
+            os.remove(path)
+
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    print("Charge utile par exécution de page : "
+          "l'image inline était renvoyée à chaque rerun, l'URL statique ne coûte "
+          "que quelques dizaines d'octets (image téléchargée une fois puis mise en cache).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Génère les rapports statiques (HTML et PDF) par préfecture et par région.
+
+Les données sont lues une fois, puis chaque rapport est rendu dans un pool
+de processus (un par cœur par défaut). Seuls les rapports dont les entrées
+ont changé depuis la génération précédente (empreinte enregistrée dans
+data/rapports/manifest.json) sont refaits ; --force les refait tous.
+Les rapports sont servis par le serveur de téléchargement du tableau de
+bord, sous /rapports/index.html.
+
+Usage (depuis unfp-dashboard/) :
+    python scripts/build_reports.py [--workers 4] [--force]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+os.chdir(APP_DIR)
+
+from utils.reports import (  # noqa: E402
+    MANIFEST_PATH, REPORT_DIR, input_digest, load_report_jobs, render_report, write_index
+)
+
+def load_manifest():
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+def is_current(job, digest, manifest):
+    """Vrai si le rapport existe et a été rendu à partir des mêmes entrées"""
+    return (manifest.get(job["slug"]) == digest
+            and all(os.path.exists(os.path.join(REPORT_DIR, f"{job['slug']}.{ext}")) for ext in ("html", "pdf")))
+
+def write_plotly_js():
+    """Copie unique de plotly.js partagée par les rapports HTML"""
+    import plotly.offline
+
+    path = os.path.join(REPORT_DIR, "plotly.min.js")
+    if not os.path.exists(path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(plotly.offline.get_plotlyjs())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processus de rendu")
+    parser.add_argument("--force", action="store_true", help="refaire tous les rapports")
+    args = parser.parse_args()
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    write_plotly_js()
+
+    started = time.perf_counter()
+    jobs = load_report_jobs()
+    loaded = time.perf_counter() - started
+    manifest = {} if args.force else load_manifest()
+    digests = {job["slug"]: input_digest(job) for job in jobs}
+    pending = [job for job in jobs if not is_current(job, digests[job["slug"]], manifest)]
+    print(f"{len(jobs)} rapports, {len(pending)} à refaire (données lues en {loaded:.1f} s)")
+
+    render_started = time.perf_counter()
+    render_time = 0.0
+    failed = 0
+    # spawn : les processus ne reçoivent pas les threads (écoute du cache, pools) du parent
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(render_report, job): job["slug"] for job in pending}
+        for future in as_completed(futures):
+            slug = futures[future]
+            try:
+                _, seconds = future.result()
+            except Exception as e:
+                failed += 1
+                manifest.pop(slug, None)
+                print(f"  {slug:<36} erreur: {e}")
+                continue
+            render_time += seconds
+            manifest[slug] = digests[slug]
+            print(f"  {slug:<36} {seconds:>6.2f} s")
+    wall = time.perf_counter() - render_started
+
+    # Rapports disparus (préfecture renommée ou supprimée)
+    manifest = {slug: digest for slug, digest in manifest.items() if slug in digests}
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    write_index(jobs)
+
+    rendered = len(pending) - failed
+    print(f"Rendus : {rendered}, inchangés : {len(jobs) - len(pending)}, erreurs : {failed}")
+    if rendered:
+        print(f"Rendu en {wall:.1f} s : {rendered / wall:.2f} rapports/s, "
+              f"{render_time / rendered:.2f} s par rapport, "
+              f"parallélisme effectif {render_time / wall:.1f} (sur {args.workers} processus)")
+
+if __name__ == "__main__":
+    main()
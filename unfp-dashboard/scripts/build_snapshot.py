@@ -0,0 +1,97 @@
+"""Construit le paquet hors ligne des bureaux de terrain.
+
+Le paquet est une base DuckDB en un seul fichier : les tables de l'entrepôt
+lues par les pages (dimensions, faits, agrégats, tables de liaison), les
+limites des préfectures et des régions simplifiées en GeoJSON, et la date de
+construction. DuckDB compresse les colonnes et ne lit du fichier que les
+blocs nécessaires : l'ouverture est immédiate, quelle que soit sa taille.
+
+Pour servir l'application depuis le paquet, sans PostgreSQL, déclarer dans
+.streamlit/secrets.toml :
+    [offline]
+    bundle = "data/unfpa_hors_ligne.duckdb"
+
+Usage (depuis unfp-dashboard/) :
+    python scripts/build_snapshot.py [--output data/unfpa_hors_ligne.duckdb] [--tolerance 0.002]
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import duckdb
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+os.chdir(APP_DIR)
+
+from utils.database import DASHBOARD_QUERIES  # noqa: E402
+from utils.duckdb_backend import SNAPSHOT_DIR, take_snapshot  # noqa: E402
+from utils.geospatial import load_prefecture_boundaries, load_region_boundaries  # noqa: E402
+
+DEFAULT_OUTPUT = os.path.join("data", "unfpa_hors_ligne.duckdb")
+
+def add_tables(conn, directory):
+    """Copie chaque fichier Parquet de la copie dans une table public.<table>"""
+    for name in sorted(os.listdir(directory)):
+        table, ext = os.path.splitext(name)
+        if ext == ".parquet":
+            path = os.path.join(directory, name).replace("'", "''")
+            conn.execute(f"CREATE TABLE public.{table} AS SELECT * FROM read_parquet('{path}');")
+            rows = conn.execute(f"SELECT COUNT(*) FROM public.{table};").fetchone()[0]
+            print(f"  {table:<32} {rows:>9} lignes")
+
+def add_layers(conn, tolerance):
+    """Limites simplifiées (tolérance en degrés), une ligne GeoJSON par couche"""
+    conn.execute("CREATE TABLE public.bundle_couches (couche VARCHAR PRIMARY KEY, geojson VARCHAR);")
+    for name, gdf in (("prefectures", load_prefecture_boundaries()), ("regions", load_region_boundaries())):
+        simplified = gdf.copy()
+        simplified["geometry"] = gdf.geometry.simplify(tolerance, preserve_topology=True)
+        geojson = simplified.to_json(drop_id=True)
+        conn.execute("INSERT INTO public.bundle_couches VALUES (?, ?);", [name, geojson])
+        print(f"  couche {name:<25} {len(geojson) / 1024:>9.0f} Ko")
+
+def check_cold_start(path):
+    """Ouvre le paquet comme l'application et chronomètre les requêtes des pages"""
+    started = time.perf_counter()
+    conn = duckdb.connect(path, read_only=True)
+    for query in DASHBOARD_QUERIES.values():
+        conn.execute(query).fetchall()
+    conn.close()
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="fichier du paquet")
+    parser.add_argument("--tolerance", type=float, default=0.002,
+                        help="tolérance de simplification des limites, en degrés")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    print("Copie des tables depuis PostgreSQL")
+    version = take_snapshot()
+    building = f"{args.output}.tmp"
+    if os.path.exists(building):
+        os.remove(building)
+
+    conn = duckdb.connect(building)
+    try:
+        conn.execute("CREATE SCHEMA public;")
+        add_tables(conn, os.path.join(SNAPSHOT_DIR, version))
+        add_layers(conn, args.tolerance)
+        conn.execute("CREATE TABLE public.bundle_info AS SELECT ? AS construit_le, ? AS copie;",
+                     [datetime.now().isoformat(timespec="seconds"), version])
+        conn.execute("CHECKPOINT;")
+    finally:
+        conn.close()
+    # Le paquet précédent n'est remplacé qu'une fois le nouveau complet
+    shutil.move(building, args.output)
+
+    size_mb = os.path.getsize(args.output) / 1024 / 1024
+    print(f"Paquet {args.output} : {size_mb:.1f} Mo en {time.perf_counter() - started:.1f} s")
+    print(f"Requêtes des pages sur le paquet à froid : {check_cold_start(args.output) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Charge un fichier CSV d'indicateurs dans fact_indicateur.
+
+Les partitions annuelles manquantes sont créées avant le chargement, puis
+les lignes sont copiées (COPY) dans une table temporaire et insérées dans
+fact_indicateur en une seule transaction ; le trigger de notification
+invalide alors le cache du tableau de bord.
+
+Le CSV contient au moins les colonnes indicator_name, value, annee et
+prefecture_id (par exemple l'export de la page Indicateurs).
+
+Usage (depuis unfp-dashboard/) :
+    python scripts/load_indicateurs.py indicateurs.csv
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+
+import psycopg2
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+os.chdir(APP_DIR)
+
+from utils.database import _connection_params, ensure_indicator_partition  # noqa: E402
+
+COLUMNS = ["indicator_name", "value", "annee", "prefecture_id"]
+
+def read_rows(path):
+    """Lignes du CSV réduites aux colonnes chargées, et années rencontrées"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    years = set()
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            years.add(int(row["annee"]))
+            writer.writerow([row[column] for column in COLUMNS])
+    buffer.seek(0)
+    return buffer, sorted(years)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="fichier CSV à charger")
+    args = parser.parse_args()
+
+    rows, years = read_rows(args.path)
+    for year in years:
+        print(f"Partition {ensure_indicator_partition(year)} prête")
+
+    conn = psycopg2.connect(**_connection_params())
+    try:
+        with conn, conn.cursor() as cur:
+            cur.execute("""
+                CREATE TEMP TABLE indicateurs_a_charger (
+                    indicator_name text, value text, annee smallint, prefecture_id smallint
+                ) ON COMMIT DROP;
+            """)
+            cur.copy_expert(
+                f"COPY indicateurs_a_charger ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", rows
+            )
+            cur.execute("""
+                INSERT INTO public.fact_indicateur (indicator_name, value, annee, prefecture_id)
+                SELECT indicator_name, value, annee, prefecture_id FROM indicateurs_a_charger;
+            """)
+            print(f"{cur.rowcount} indicateurs chargés ({', '.join(map(str, years))})")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+-- Invalidation immédiate du cache du tableau de bord.
+-- Chaque modification d'une table de l'entrepôt publie le nom de la table
+-- sur le canal "unfpa_cache" ; utils/database.py écoute ce canal et
+-- n'invalide que les entrées du cache qui lisent cette table.
+
+CREATE OR REPLACE FUNCTION public.notify_cache_invalidation()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('unfpa_cache', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$;
+
+DO $$
+DECLARE
+    t text;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'dim_commune', 'dim_domaine', 'dim_partenaire', 'dim_prefecture',
+        'dim_projet', 'dim_region', 'dim_thematique',
+        'fact_indicateur', 'fact_planning', 'fact_structure', 'projet'
+    ]
+    LOOP
+        -- Un trigger par instruction : un chargement massif ne publie qu'une notification
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON public.%I', t || '_notify_cache', t);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.%I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION public.notify_cache_invalidation()',
+            t || '_notify_cache', t
+        );
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,200 @@
+-- Mobilisation des ressources : engagements et décaissements des bailleurs,
+-- budgets par domaine, et tables d'agrégats précalculées lues par la page
+-- 7_💰_mobilisation_ressources.py (une requête par onglet).
+--
+-- Après chaque chargement : SELECT public.refresh_mobilisation_rollups();
+
+CREATE TABLE IF NOT EXISTS public.dim_bailleur (
+    id smallserial PRIMARY KEY,
+    name text NOT NULL UNIQUE,
+    type text NOT NULL CHECK (type IN ('International', 'National', 'UN'))
+);
+
+CREATE TABLE IF NOT EXISTS public.fact_engagement (
+    id bigserial PRIMARY KEY,
+    bailleur_id smallint NOT NULL REFERENCES public.dim_bailleur (id),
+    domaine_id smallint REFERENCES public.dim_domaine (id),
+    date_engagement date NOT NULL,
+    montant_usd numeric(15,2) NOT NULL CHECK (montant_usd >= 0)
+);
+
+CREATE TABLE IF NOT EXISTS public.fact_decaissement (
+    id bigserial PRIMARY KEY,
+    bailleur_id smallint NOT NULL REFERENCES public.dim_bailleur (id),
+    domaine_id smallint REFERENCES public.dim_domaine (id),
+    date_decaissement date NOT NULL,
+    montant_usd numeric(15,2) NOT NULL CHECK (montant_usd >= 0)
+);
+
+CREATE TABLE IF NOT EXISTS public.fact_budget_domaine (
+    domaine_id smallint NOT NULL REFERENCES public.dim_domaine (id),
+    annee smallint NOT NULL,
+    budget_usd numeric(15,2) NOT NULL,
+    PRIMARY KEY (domaine_id, annee)
+);
+
+CREATE INDEX IF NOT EXISTS fact_engagement_bailleur_date_idx ON public.fact_engagement (bailleur_id, date_engagement);
+CREATE INDEX IF NOT EXISTS fact_engagement_domaine_date_idx ON public.fact_engagement (domaine_id, date_engagement);
+CREATE INDEX IF NOT EXISTS fact_decaissement_bailleur_date_idx ON public.fact_decaissement (bailleur_id, date_decaissement);
+CREATE INDEX IF NOT EXISTS fact_decaissement_domaine_date_idx ON public.fact_decaissement (domaine_id, date_decaissement);
+
+-- Agrégats précalculés
+
+CREATE TABLE IF NOT EXISTS public.agg_mobilisation_mensuelle (
+    mois date PRIMARY KEY,
+    trimestre date NOT NULL,
+    engagements numeric(15,2) NOT NULL,
+    decaissements numeric(15,2) NOT NULL,
+    engagements_cumules numeric(15,2) NOT NULL,
+    decaissements_cumules numeric(15,2) NOT NULL,
+    engagements_trimestre_cumules numeric(15,2) NOT NULL,
+    decaissements_trimestre_cumules numeric(15,2) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS public.agg_mobilisation_bailleur (
+    annee smallint NOT NULL,
+    bailleur_id smallint NOT NULL,
+    bailleur text NOT NULL,
+    type text NOT NULL,
+    engagement numeric(15,2) NOT NULL,
+    decaissement numeric(15,2) NOT NULL,
+    taux_decaissement numeric,
+    part_engagements numeric,
+    PRIMARY KEY (annee, bailleur_id)
+);
+
+CREATE TABLE IF NOT EXISTS public.agg_mobilisation_domaine (
+    annee smallint NOT NULL,
+    domaine_id smallint NOT NULL,
+    domaine text NOT NULL,
+    budget_total numeric(15,2) NOT NULL,
+    finance_acquise numeric(15,2) NOT NULL,
+    gap numeric(15,2) NOT NULL,
+    pourcentage_finance numeric,
+    rang_gap integer NOT NULL,
+    PRIMARY KEY (annee, domaine_id)
+);
+
+CREATE OR REPLACE FUNCTION public.refresh_mobilisation_rollups()
+RETURNS void
+LANGUAGE sql
+AS $$
+    TRUNCATE public.agg_mobilisation_mensuelle,
+             public.agg_mobilisation_bailleur,
+             public.agg_mobilisation_domaine;
+
+    -- Série mensuelle continue, cumuls sur toute la période et par trimestre
+    INSERT INTO public.agg_mobilisation_mensuelle
+    WITH bornes AS (
+        SELECT MIN(d) AS debut, MAX(d) AS fin
+        FROM (
+            SELECT date_engagement AS d FROM public.fact_engagement
+            UNION ALL
+            SELECT date_decaissement FROM public.fact_decaissement
+        ) dates
+    ),
+    mois AS (
+        SELECT generate_series(date_trunc('month', debut), date_trunc('month', fin), interval '1 month')::date AS mois
+        FROM bornes
+        WHERE debut IS NOT NULL
+    ),
+    engag AS (
+        SELECT date_trunc('month', date_engagement)::date AS mois, SUM(montant_usd) AS montant
+        FROM public.fact_engagement
+        GROUP BY 1
+    ),
+    decais AS (
+        SELECT date_trunc('month', date_decaissement)::date AS mois, SUM(montant_usd) AS montant
+        FROM public.fact_decaissement
+        GROUP BY 1
+    ),
+    mensuel AS (
+        SELECT m.mois,
+               date_trunc('quarter', m.mois)::date AS trimestre,
+               COALESCE(engag.montant, 0) AS engagements,
+               COALESCE(decais.montant, 0) AS decaissements
+        FROM mois m
+        LEFT JOIN engag USING (mois)
+        LEFT JOIN decais USING (mois)
+    )
+    SELECT mois, trimestre, engagements, decaissements,
+           SUM(engagements) OVER cumul,
+           SUM(decaissements) OVER cumul,
+           SUM(engagements) OVER cumul_trimestre,
+           SUM(decaissements) OVER cumul_trimestre
+    FROM mensuel
+    WINDOW cumul AS (ORDER BY mois),
+           cumul_trimestre AS (PARTITION BY trimestre ORDER BY mois);
+
+    -- Engagements, décaissements, taux de décaissement et part des engagements par bailleur et par année
+    INSERT INTO public.agg_mobilisation_bailleur
+    WITH engag AS (
+        SELECT bailleur_id, EXTRACT(YEAR FROM date_engagement)::smallint AS annee, SUM(montant_usd) AS montant
+        FROM public.fact_engagement
+        GROUP BY 1, 2
+    ),
+    decais AS (
+        SELECT bailleur_id, EXTRACT(YEAR FROM date_decaissement)::smallint AS annee, SUM(montant_usd) AS montant
+        FROM public.fact_decaissement
+        GROUP BY 1, 2
+    )
+    SELECT annee, b.id, b.name, b.type,
+           COALESCE(engag.montant, 0),
+           COALESCE(decais.montant, 0),
+           100 * COALESCE(decais.montant, 0) / NULLIF(engag.montant, 0),
+           100 * COALESCE(engag.montant, 0) / NULLIF(SUM(COALESCE(engag.montant, 0)) OVER (PARTITION BY annee), 0)
+    FROM engag
+    FULL JOIN decais USING (bailleur_id, annee)
+    JOIN public.dim_bailleur b ON b.id = bailleur_id;
+
+    -- Budget, financement acquis et gap par domaine et par année, classés par gap décroissant
+    INSERT INTO public.agg_mobilisation_domaine
+    WITH engag AS (
+        SELECT domaine_id, EXTRACT(YEAR FROM date_engagement)::smallint AS annee, SUM(montant_usd) AS montant
+        FROM public.fact_engagement
+        WHERE domaine_id IS NOT NULL
+        GROUP BY 1, 2
+    )
+    SELECT bd.annee, d.id, d.name,
+           bd.budget_usd,
+           COALESCE(engag.montant, 0),
+           bd.budget_usd - COALESCE(engag.montant, 0),
+           100 * COALESCE(engag.montant, 0) / NULLIF(bd.budget_usd, 0),
+           RANK() OVER (PARTITION BY bd.annee ORDER BY bd.budget_usd - COALESCE(engag.montant, 0) DESC)
+    FROM public.fact_budget_domaine bd
+    JOIN public.dim_domaine d ON d.id = bd.domaine_id
+    LEFT JOIN engag ON engag.domaine_id = bd.domaine_id AND engag.annee = bd.annee;
+$$;
+
+-- Les agrégats participent à l'invalidation du cache (voir 001_cache_notify.sql)
+DO $$
+DECLARE
+    t text;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'dim_bailleur', 'fact_engagement', 'fact_decaissement', 'fact_budget_domaine',
+        'agg_mobilisation_mensuelle', 'agg_mobilisation_bailleur', 'agg_mobilisation_domaine'
+    ]
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON public.%I', t || '_notify_cache', t);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.%I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION public.notify_cache_invalidation()',
+            t || '_notify_cache', t
+        );
+    END LOOP;
+END;
+$$;
+
+INSERT INTO public.dim_bailleur (name, type) VALUES
+    ('UE', 'International'),
+    ('USAID', 'International'),
+    ('Banque Mondiale', 'International'),
+    ('Gouvernement Guinéen', 'National'),
+    ('Canada', 'International'),
+    ('Suède', 'International'),
+    ('Japon', 'International'),
+    ('UNICEF', 'UN'),
+    ('OMS', 'UN'),
+    ('Fonds Mondial', 'International')
+ON CONFLICT (name) DO NOTHING;
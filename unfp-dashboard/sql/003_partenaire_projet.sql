@@ -0,0 +1,60 @@
+-- Relation partenaire ↔ projet.
+-- Remplace la recherche par sous-chaîne du nom du partenaire dans
+-- dim_projet.bailleur : les correspondances sont calculées une fois par
+-- public.refresh_partenaire_projet() puis lues par index
+-- (utils/database.py : get_partner_projects).
+--
+-- Après chaque chargement de dim_partenaire ou dim_projet :
+--     SELECT public.refresh_partenaire_projet();
+
+-- Nom normalisé : minuscules, sans accents ni ponctuation, espaces uniques
+CREATE OR REPLACE FUNCTION public.normaliser_nom(nom text)
+RETURNS text
+LANGUAGE sql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+    SELECT btrim(regexp_replace(
+        translate(lower(nom),
+                  'àáâãäåçèéêëìíîïñòóôõöùúûüýÿœ',
+                  'aaaaaaceeeeiiiinooooouuuuyyo'),
+        '[^a-z0-9]+', ' ', 'g'
+    ));
+$$;
+
+CREATE TABLE IF NOT EXISTS public.partenaire_projet (
+    partenaire_id smallint NOT NULL REFERENCES public.dim_partenaire (id) ON DELETE CASCADE,
+    projet_id integer NOT NULL REFERENCES public.dim_projet (id) ON DELETE CASCADE,
+    -- 'auto' : établi par refresh_partenaire_projet() ; 'manuel' : saisi et jamais écrasé
+    source text NOT NULL DEFAULT 'auto' CHECK (source IN ('auto', 'manuel')),
+    PRIMARY KEY (partenaire_id, projet_id)
+);
+
+CREATE INDEX IF NOT EXISTS partenaire_projet_projet_idx ON public.partenaire_projet (projet_id, partenaire_id);
+
+-- Un bailleur peut en regrouper plusieurs (« UE / Canada », « UNFPA et OMS ») :
+-- chaque élément normalisé doit être égal au nom normalisé du partenaire
+CREATE OR REPLACE FUNCTION public.refresh_partenaire_projet()
+RETURNS void
+LANGUAGE sql
+AS $$
+    DELETE FROM public.partenaire_projet WHERE source = 'auto';
+
+    INSERT INTO public.partenaire_projet (partenaire_id, projet_id, source)
+    SELECT DISTINCT pt.id, b.projet_id, 'auto'
+    FROM (
+        SELECT p.id AS projet_id, public.normaliser_nom(element) AS nom
+        FROM public.dim_projet p,
+             regexp_split_to_table(p.bailleur, '\s*(?:[,;/&+]|\met\M)\s*') AS element
+    ) b
+    JOIN public.dim_partenaire pt ON public.normaliser_nom(pt.partenaire_name) = b.nom
+    WHERE b.nom <> ''
+    ON CONFLICT (partenaire_id, projet_id) DO NOTHING;
+$$;
+
+DROP TRIGGER IF EXISTS partenaire_projet_notify_cache ON public.partenaire_projet;
+CREATE TRIGGER partenaire_projet_notify_cache
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.partenaire_projet
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_cache_invalidation();
+
+SELECT public.refresh_partenaire_projet();
@@ -0,0 +1,105 @@
+-- Localisation des projets : un projet intervient dans une ou plusieurs
+-- préfectures, éventuellement précisées par une commune ou une structure.
+-- Remplace la jointure projet.id = fact_structure.id, qui appariait des
+-- lignes sans rapport, et alimente l'agrégat agg_projets_prefecture lu par
+-- la couche « Projets » de la cartographie.
+
+CREATE TABLE IF NOT EXISTS public.projet_localisation (
+    id bigserial PRIMARY KEY,
+    projet_id integer NOT NULL REFERENCES public.dim_projet (id) ON DELETE CASCADE,
+    structure_id bigint REFERENCES public.fact_structure (id) ON DELETE CASCADE,
+    commune_id integer REFERENCES public.dim_commune (id),
+    prefecture_id smallint NOT NULL REFERENCES public.dim_prefecture (id)
+);
+
+-- Une même localisation n'est enregistrée qu'une fois (les NULL comptent comme égaux)
+CREATE UNIQUE INDEX IF NOT EXISTS projet_localisation_unique_idx
+    ON public.projet_localisation (projet_id, prefecture_id, COALESCE(commune_id, 0), COALESCE(structure_id, 0));
+CREATE INDEX IF NOT EXISTS projet_localisation_prefecture_idx ON public.projet_localisation (prefecture_id, projet_id);
+CREATE INDEX IF NOT EXISTS projet_localisation_commune_idx ON public.projet_localisation (commune_id);
+CREATE INDEX IF NOT EXISTS projet_localisation_structure_idx ON public.projet_localisation (structure_id);
+
+-- Commune et préfecture sont déduites de la structure, puis de la commune :
+-- il suffit de renseigner le niveau le plus précis connu
+CREATE OR REPLACE FUNCTION public.completer_projet_localisation()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.structure_id IS NOT NULL THEN
+        SELECT commune_id INTO NEW.commune_id
+        FROM public.fact_structure WHERE id = NEW.structure_id;
+    END IF;
+    IF NEW.commune_id IS NOT NULL THEN
+        SELECT prefecture_id INTO NEW.prefecture_id
+        FROM public.dim_commune WHERE id = NEW.commune_id;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS projet_localisation_completer ON public.projet_localisation;
+CREATE TRIGGER projet_localisation_completer
+    BEFORE INSERT OR UPDATE ON public.projet_localisation
+    FOR EACH ROW EXECUTE FUNCTION public.completer_projet_localisation();
+
+-- Agrégat par préfecture : un projet présent dans plusieurs préfectures est
+-- compté (avec son budget complet) dans chacune d'elles
+CREATE TABLE IF NOT EXISTS public.agg_projets_prefecture (
+    prefecture_id smallint PRIMARY KEY REFERENCES public.dim_prefecture (id) ON DELETE CASCADE,
+    nombre_projets integer NOT NULL,
+    budget_total numeric(15,2) NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION public.refresh_projets_prefecture()
+RETURNS void
+LANGUAGE sql
+AS $$
+    TRUNCATE public.agg_projets_prefecture;
+
+    INSERT INTO public.agg_projets_prefecture (prefecture_id, nombre_projets, budget_total)
+    SELECT pl.prefecture_id, COUNT(*), SUM(p.montant_usd)
+    FROM (SELECT DISTINCT prefecture_id, projet_id FROM public.projet_localisation) pl
+    JOIN public.dim_projet p ON p.id = pl.projet_id
+    GROUP BY pl.prefecture_id;
+$$;
+
+-- L'agrégat (une ligne par préfecture) est recalculé à chaque modification
+-- des localisations ou des budgets, une fois par instruction
+CREATE OR REPLACE FUNCTION public.refresh_projets_prefecture_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM public.refresh_projets_prefecture();
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS projet_localisation_refresh_agg ON public.projet_localisation;
+CREATE TRIGGER projet_localisation_refresh_agg
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.projet_localisation
+    FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_projets_prefecture_trigger();
+
+DROP TRIGGER IF EXISTS dim_projet_refresh_agg ON public.dim_projet;
+CREATE TRIGGER dim_projet_refresh_agg
+    AFTER UPDATE OF montant_usd OR DELETE OR TRUNCATE ON public.dim_projet
+    FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_projets_prefecture_trigger();
+
+DO $$
+DECLARE
+    t text;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['projet_localisation', 'agg_projets_prefecture']
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON public.%I', t || '_notify_cache', t);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.%I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION public.notify_cache_invalidation()',
+            t || '_notify_cache', t
+        );
+    END LOOP;
+END;
+$$;
+
+SELECT public.refresh_projets_prefecture();
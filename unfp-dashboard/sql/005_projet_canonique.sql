@@ -0,0 +1,91 @@
+-- Table de projets unique : dim_projet.
+-- L'ancienne table public.projet (domaine en texte, joint par
+-- CAST(d.id AS TEXT)) est remplacée par une vue de compatibilité sur
+-- dim_projet ; le code du tableau de bord lit dim_projet directement et
+-- joint les domaines par clé entière.
+--
+-- Les deux tables ont leurs propres séquences (projet_id_seq et
+-- dim_projet_id_seq1) : un même id y désigne des projets sans rapport. Les
+-- projets sont donc appariés par clé naturelle (nom, bailleur, dates) ; ceux
+-- qui n'existent que dans l'ancienne table reçoivent un nouvel id de
+-- dim_projet, et projet_correspondance garde l'id d'origine de chacun pour
+-- retraduire les références externes.
+--
+-- La migration peut être rejouée : une fois public.projet devenue une vue,
+-- la reprise et le renommage sont ignorés.
+--
+-- Comparaison des plans avant/après : scripts/bench_projets_par_domaine.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.projet_correspondance (
+    ancien_id integer PRIMARY KEY,
+    dim_projet_id integer NOT NULL REFERENCES public.dim_projet (id) ON DELETE CASCADE
+);
+
+DO $$
+DECLARE
+    sequence_name text := pg_get_serial_sequence('public.dim_projet', 'id');
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_class WHERE oid = to_regclass('public.projet') AND relkind = 'r') THEN
+        RAISE NOTICE 'public.projet est déjà remplacée par la vue : reprise ignorée';
+        RETURN;
+    END IF;
+
+    -- Des lignes ont pu être insérées avec un id explicite : la séquence est
+    -- recalée avant d'attribuer de nouveaux ids
+    PERFORM setval(sequence_name, GREATEST((SELECT max(id) FROM public.dim_projet), 1));
+
+    -- Projets déjà présents dans dim_projet (même clé naturelle)
+    INSERT INTO public.projet_correspondance (ancien_id, dim_projet_id)
+    SELECT p.id, min(dp.id)
+    FROM public.projet p
+    JOIN public.dim_projet dp
+      ON dp.nom_projet IS NOT DISTINCT FROM p.nom_projet
+     AND dp.bailleur IS NOT DISTINCT FROM p.bailleur
+     AND dp.date_debut IS NOT DISTINCT FROM p.date_debut
+     AND dp.date_fin IS NOT DISTINCT FROM p.date_fin
+    GROUP BY p.id
+    ON CONFLICT (ancien_id) DO NOTHING;
+
+    -- Projets présents uniquement dans l'ancienne table : nouvel id de
+    -- dim_projet, domaine converti en clé entière lorsqu'il est numérique
+    CREATE TEMP TABLE projets_a_reprendre ON COMMIT DROP AS
+    SELECT p.*, nextval(sequence_name)::integer AS nouvel_id
+    FROM public.projet p
+    WHERE NOT EXISTS (SELECT 1 FROM public.projet_correspondance pc WHERE pc.ancien_id = p.id);
+
+    INSERT INTO public.dim_projet (
+        id, domaine_id, intitule_en_abrege, nom_projet, intitule, montant_usd,
+        date_debut, date_fin, bailleur, resultats_attendus, resultats_atteints
+    )
+    SELECT r.nouvel_id,
+           CASE WHEN btrim(r.domaine) ~ '^\d+$' THEN btrim(r.domaine)::integer END,
+           r.nom_projet, r.nom_projet, r.intitule, r.montant_usd,
+           r.date_debut, r.date_fin, r.bailleur, r.resultats_attendus, r.resultats_atteints
+    FROM projets_a_reprendre r;
+
+    INSERT INTO public.projet_correspondance (ancien_id, dim_projet_id)
+    SELECT id, nouvel_id FROM projets_a_reprendre;
+
+    -- L'ancienne table est conservée sous un autre nom le temps de la vérification
+    ALTER TABLE public.projet RENAME TO projet_archive;
+    ALTER TABLE public.projet_archive RENAME CONSTRAINT projet_pkey TO projet_archive_pkey;
+
+    -- Prochain id de dim_projet après les projets repris
+    PERFORM setval(sequence_name, GREATEST((SELECT max(id) FROM public.dim_projet), 1));
+END;
+$$;
+
+-- Forme historique, en lecture, pour les outils qui lisent encore public.projet
+CREATE OR REPLACE VIEW public.projet AS
+SELECT id, nom_projet, intitule, domaine_id::text AS domaine, montant_usd,
+       date_debut, date_fin, bailleur, resultats_attendus, resultats_atteints
+FROM public.dim_projet;
+
+CREATE INDEX IF NOT EXISTS dim_projet_domaine_idx ON public.dim_projet (domaine_id);
+CREATE INDEX IF NOT EXISTS dim_projet_date_debut_idx ON public.dim_projet (date_debut);
+
+ANALYZE public.dim_projet;
+
+COMMIT;
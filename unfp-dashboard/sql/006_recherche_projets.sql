@@ -0,0 +1,35 @@
+-- Recherche plein texte dans les projets (configuration « french »).
+-- La colonne dim_projet.recherche est tenue à jour par trigger et indexée
+-- en GIN ; utils/database.py : search_projects.
+--
+-- Pondération : A nom et intitulé abrégé, B intitulé et bailleur,
+-- C résultats attendus et atteints.
+
+ALTER TABLE public.dim_projet ADD COLUMN IF NOT EXISTS recherche tsvector;
+
+CREATE OR REPLACE FUNCTION public.dim_projet_recherche()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.recherche :=
+        setweight(to_tsvector('french', coalesce(NEW.nom_projet, '') || ' ' || coalesce(NEW.intitule_en_abrege, '')), 'A') ||
+        setweight(to_tsvector('french', coalesce(NEW.intitule, '') || ' ' || coalesce(NEW.bailleur, '')), 'B') ||
+        setweight(to_tsvector('french', coalesce(NEW.resultats_attendus, '') || ' ' || coalesce(NEW.resultats_atteints, '')), 'C');
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS dim_projet_recherche_maj ON public.dim_projet;
+CREATE TRIGGER dim_projet_recherche_maj
+    BEFORE INSERT OR UPDATE OF nom_projet, intitule_en_abrege, intitule, bailleur,
+                               resultats_attendus, resultats_atteints
+    ON public.dim_projet
+    FOR EACH ROW EXECUTE FUNCTION public.dim_projet_recherche();
+
+-- Calcul initial pour les projets existants (déclenche le trigger)
+UPDATE public.dim_projet SET nom_projet = nom_projet;
+
+CREATE INDEX IF NOT EXISTS dim_projet_recherche_idx ON public.dim_projet USING gin (recherche);
+
+ANALYZE public.dim_projet;
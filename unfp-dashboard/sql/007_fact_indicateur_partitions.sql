@@ -0,0 +1,110 @@
+-- Partitionnement de fact_indicateur par année (RANGE sur annee).
+-- Les requêtes filtrées sur une année ne lisent que la partition de cette
+-- année. Une partition est créée par année présente ; les chargements
+-- appellent public.ensure_fact_indicateur_partition(annee) avant d'insérer
+-- (scripts/load_indicateurs.py), ou préparent une table séparée puis
+-- l'attachent avec public.attach_fact_indicateur_partition(table, annee).
+--
+-- Les lignes sans année (annee NULL) sont rangées dans la partition 2025,
+-- l'année par défaut des chargements : annee est désormais obligatoire.
+--
+-- La migration peut être rejouée : une fois fact_indicateur partitionnée, la
+-- conversion est ignorée. L'ancienne table, recopiée dans la même
+-- transaction, est supprimée à la fin.
+--
+-- Mesure : scripts/bench_fact_indicateur_partitions.sql
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION public.ensure_fact_indicateur_partition(p_annee smallint)
+RETURNS text
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    partition_name text := 'fact_indicateur_' || p_annee;
+BEGIN
+    IF to_regclass('public.' || partition_name) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE public.%I PARTITION OF public.fact_indicateur FOR VALUES FROM (%s) TO (%s)',
+            partition_name, p_annee, p_annee + 1
+        );
+    END IF;
+    RETURN partition_name;
+END;
+$$;
+
+-- Attache une table chargée à part (mêmes colonnes) comme partition de l'année.
+-- La contrainte CHECK posée avant l'attachement évite un parcours de validation
+-- sous verrou ; ATTACH PARTITION ne déclenchant pas les triggers, le cache est
+-- notifié explicitement.
+CREATE OR REPLACE FUNCTION public.attach_fact_indicateur_partition(p_table regclass, p_annee smallint)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    EXECUTE format(
+        'ALTER TABLE %s ADD CONSTRAINT %I CHECK (annee IS NOT NULL AND annee >= %s AND annee < %s)',
+        p_table, 'annee_' || p_annee, p_annee, p_annee + 1
+    );
+    EXECUTE format(
+        'ALTER TABLE public.fact_indicateur ATTACH PARTITION %s FOR VALUES FROM (%s) TO (%s)',
+        p_table, p_annee, p_annee + 1
+    );
+    EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', p_table, 'annee_' || p_annee);
+    PERFORM pg_notify('unfpa_cache', 'fact_indicateur');
+END;
+$$;
+
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'public.fact_indicateur'::regclass) = 'p' THEN
+        RAISE NOTICE 'public.fact_indicateur est déjà partitionnée : conversion ignorée';
+        -- Copie laissée par une version antérieure de cette migration
+        DROP TABLE IF EXISTS public.fact_indicateur_ancien;
+        RETURN;
+    END IF;
+
+    ALTER TABLE public.fact_indicateur RENAME TO fact_indicateur_ancien;
+    ALTER TABLE public.fact_indicateur_ancien RENAME CONSTRAINT fact_indicateur_pkey TO fact_indicateur_ancien_pkey;
+    ALTER TABLE public.fact_indicateur_ancien RENAME CONSTRAINT fact_indicateur_prefecture_id_fkey TO fact_indicateur_ancien_prefecture_id_fkey;
+    DROP TRIGGER IF EXISTS fact_indicateur_notify_cache ON public.fact_indicateur_ancien;
+
+    -- La clé de partition fait partie de la clé primaire ; annee devient obligatoire
+    CREATE TABLE public.fact_indicateur (
+        id bigint NOT NULL DEFAULT nextval('public.fact_indicateur_id_seq'),
+        prefecture_id smallint REFERENCES public.dim_prefecture (id),
+        indicator_name text NOT NULL,
+        value text,
+        annee smallint NOT NULL DEFAULT 2025,
+        PRIMARY KEY (annee, id)
+    ) PARTITION BY RANGE (annee);
+
+    ALTER SEQUENCE public.fact_indicateur_id_seq OWNED BY public.fact_indicateur.id;
+
+    -- Index déclarés sur la table mère : créés sur chaque partition, actuelle ou future
+    CREATE INDEX fact_indicateur_prefecture_idx ON public.fact_indicateur (prefecture_id, indicator_name);
+    CREATE INDEX fact_indicateur_indicator_idx ON public.fact_indicateur (indicator_name);
+    -- Les lignes arrivent par ordre d'id croissant : un index BRIN suffit pour les plages d'id
+    CREATE INDEX fact_indicateur_id_brin ON public.fact_indicateur USING brin (id);
+
+    PERFORM public.ensure_fact_indicateur_partition(annee)
+    FROM (SELECT DISTINCT COALESCE(annee, 2025)::smallint AS annee FROM public.fact_indicateur_ancien) annees;
+
+    -- Année manquante : partition 2025 (voir l'en-tête)
+    INSERT INTO public.fact_indicateur (id, prefecture_id, indicator_name, value, annee)
+    SELECT id, prefecture_id, indicator_name, value, COALESCE(annee, 2025)
+    FROM public.fact_indicateur_ancien;
+
+    CREATE TRIGGER fact_indicateur_notify_cache
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.fact_indicateur
+        FOR EACH STATEMENT EXECUTE FUNCTION public.notify_cache_invalidation();
+
+    -- Recopiée ci-dessus dans la même transaction ; sans CASCADE, un objet
+    -- qui en dépendrait encore fait échouer la migration plutôt que disparaître
+    DROP TABLE public.fact_indicateur_ancien;
+END;
+$$;
+
+ANALYZE public.fact_indicateur;
+
+COMMIT;
@@ -0,0 +1,95 @@
+-- Journal des lignes modifiées dans les tables de faits volumineuses.
+-- Chaque insertion, mise à jour ou suppression y inscrit l'id de la ligne et
+-- la transaction qui l'a modifiée ; utils/database.py (get_incremental_frame)
+-- ne relit alors que les lignes modifiées depuis son dernier rafraîchissement
+-- au lieu de la table entière.
+--
+-- Le filigrane est le xmin de l'instantané pris avant la dernière lecture :
+-- toute transaction validée ensuite a un identifiant supérieur ou égal, même
+-- si elle a commencé avant. Un TRUNCATE est journalisé sans id et impose une
+-- relecture complète.
+
+CREATE TABLE IF NOT EXISTS public.journal_modifications (
+    id bigserial PRIMARY KEY,
+    table_name text NOT NULL,
+    ligne_id bigint,
+    operation char(1) NOT NULL CHECK (operation IN ('I', 'U', 'D', 'T')),
+    transaction xid8 NOT NULL DEFAULT pg_current_xact_id(),
+    modifie_le timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS journal_modifications_table_idx
+    ON public.journal_modifications (table_name, transaction);
+
+CREATE OR REPLACE FUNCTION public.journaliser_modification()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        INSERT INTO public.journal_modifications (table_name, operation) VALUES (TG_TABLE_NAME, 'T');
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO public.journal_modifications (table_name, ligne_id, operation)
+        SELECT TG_TABLE_NAME, id, 'D' FROM anciennes;
+    ELSIF TG_OP = 'UPDATE' THEN
+        -- Un changement d'id vaut suppression de l'ancien et insertion du nouveau
+        INSERT INTO public.journal_modifications (table_name, ligne_id, operation)
+        SELECT TG_TABLE_NAME, id, 'U' FROM (SELECT id FROM anciennes UNION SELECT id FROM nouvelles) ids;
+    ELSE
+        INSERT INTO public.journal_modifications (table_name, ligne_id, operation)
+        SELECT TG_TABLE_NAME, id, 'I' FROM nouvelles;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- Triggers par instruction avec tables de transition : un chargement massif
+-- ne fait qu'une insertion dans le journal
+DO $$
+DECLARE
+    t text;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['fact_indicateur', 'fact_structure']
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON public.%I', t || '_journal_ins', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON public.%I', t || '_journal_upd', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON public.%I', t || '_journal_del', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON public.%I', t || '_journal_trunc', t);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT ON public.%I REFERENCING NEW TABLE AS nouvelles '
+            'FOR EACH STATEMENT EXECUTE FUNCTION public.journaliser_modification()',
+            t || '_journal_ins', t
+        );
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER UPDATE ON public.%I REFERENCING OLD TABLE AS anciennes NEW TABLE AS nouvelles '
+            'FOR EACH STATEMENT EXECUTE FUNCTION public.journaliser_modification()',
+            t || '_journal_upd', t
+        );
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER DELETE ON public.%I REFERENCING OLD TABLE AS anciennes '
+            'FOR EACH STATEMENT EXECUTE FUNCTION public.journaliser_modification()',
+            t || '_journal_del', t
+        );
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER TRUNCATE ON public.%I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION public.journaliser_modification()',
+            t || '_journal_trunc', t
+        );
+    END LOOP;
+END;
+$$;
+
+-- Purge des entrées anciennes (à planifier, par exemple chaque nuit) ; le
+-- tableau de bord relit entièrement un résultat plus vieux que son TTL de
+-- cache, bien en deçà de la rétention
+CREATE OR REPLACE FUNCTION public.purger_journal_modifications(retention interval DEFAULT interval '7 days')
+RETURNS bigint
+LANGUAGE sql
+AS $$
+    WITH supprimees AS (
+        DELETE FROM public.journal_modifications
+        WHERE modifie_le < now() - retention
+        RETURNING 1
+    )
+    SELECT COUNT(*) FROM supprimees;
+$$;
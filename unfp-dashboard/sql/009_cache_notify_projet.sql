@@ -0,0 +1,13 @@
+-- public.projet n'est plus une table mais une vue sur dim_projet
+-- (sql/005_projet_canonique.sql) : ce sont les modifications de dim_projet
+-- qui invalident le cache. Le trigger de notification posé par
+-- sql/001_cache_notify.sql a suivi l'ancienne table lors de son renommage ;
+-- il est retiré de projet_archive, qui n'est plus lue par le tableau de bord.
+
+DO $$
+BEGIN
+    IF to_regclass('public.projet_archive') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS projet_notify_cache ON public.projet_archive;
+    END IF;
+END;
+$$;
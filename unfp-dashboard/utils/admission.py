@@ -0,0 +1,126 @@
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Classes de requêtes, de la plus prioritaire à la moins prioritaire :
+# priorité (plus petit = servi d'abord) et nombre maximal d'exécutions simultanées
+QUERY_CLASSES = {
+    "kpi": {"priority": 0, "max_concurrent": 6},
+    "page": {"priority": 1, "max_concurrent": 4},
+    "lourde": {"priority": 2, "max_concurrent": 2},
+    "export": {"priority": 3, "max_concurrent": 1},
+}
+# Nombre total d'exécutions simultanées, toutes classes confondues
+MAX_CONCURRENT = 8
+# Coût estimé par EXPLAIN au-delà duquel une requête est « lourde »
+HEAVY_QUERY_COST = 50_000
+# Attente au-delà de laquelle l'admission est journalisée (secondes)
+SLOW_ADMISSION = 1.0
+
+class _AdmissionController:
+    """File d'attente à priorités devant la base, plafonnée par classe"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.waiting = []
+        self.counter = itertools.count()
+        self.running = {name: 0 for name in QUERY_CLASSES}
+        self.metrics = {name: {"admises": 0, "attente_totale": 0.0, "attente_max": 0.0, "abandons": 0}
+                        for name in QUERY_CLASSES}
+
+    def _can_run(self, query_class):
+        """Vrai si la classe a une place libre et qu'il reste de la capacité globale"""
+        return (sum(self.running.values()) < MAX_CONCURRENT
+                and self.running[query_class] < QUERY_CLASSES[query_class]["max_concurrent"])
+
+    def _next_admissible(self):
+        """Demande en attente la plus prioritaire dont la classe peut démarrer"""
+        for ticket in sorted(self.waiting):
+            if self._can_run(ticket[2]):
+                return ticket
+        return None
+
+    def acquire(self, query_class, should_abort=None):
+        """Attend une place pour query_class ; retourne la durée d'attente"""
+        started = time.perf_counter()
+        # À priorité égale, les demandes sont servies dans l'ordre d'arrivée
+        ticket = (QUERY_CLASSES[query_class]["priority"], next(self.counter), query_class)
+        with self.condition:
+            self.waiting.append(ticket)
+            try:
+                while self._next_admissible() != ticket:
+                    self.condition.wait(timeout=0.1)
+                    if should_abort is not None and should_abort():
+                        self.metrics[query_class]["abandons"] += 1
+                        raise AdmissionAbandoned(query_class)
+            finally:
+                self.waiting.remove(ticket)
+                self.condition.notify_all()
+            self.running[query_class] += 1
+
+            waited = time.perf_counter() - started
+            metrics = self.metrics[query_class]
+            metrics["admises"] += 1
+            metrics["attente_totale"] += waited
+            metrics["attente_max"] = max(metrics["attente_max"], waited)
+        if waited > SLOW_ADMISSION:
+            logger.info("Requête %s admise après %.1f s d'attente", query_class, waited)
+        return waited
+
+    def release(self, query_class):
+        """Libère la place occupée par une requête de query_class"""
+        with self.condition:
+            self.running[query_class] -= 1
+            self.condition.notify_all()
+
+    def snapshot(self):
+        """Métriques par classe : en cours, en attente, admises et temps d'attente"""
+        with self.condition:
+            return [
+                {
+                    "classe": name,
+                    "en_cours": self.running[name],
+                    "en_attente": sum(1 for ticket in self.waiting if ticket[2] == name),
+                    "admises": metrics["admises"],
+                    "abandons": metrics["abandons"],
+                    "attente_moyenne": metrics["attente_totale"] / metrics["admises"] if metrics["admises"] else 0.0,
+                    "attente_max": metrics["attente_max"],
+                }
+                for name, metrics in self.metrics.items()
+            ]
+
+class AdmissionAbandoned(Exception):
+    """Le demandeur a renoncé pendant l'attente"""
+
+@st.cache_resource
+def _controller():
+    """Contrôleur d'admission partagé par toutes les sessions du processus"""
+    return _AdmissionController()
+
+@contextmanager
+def admitted(query_class, should_abort=None):
+    """Exécute le bloc une fois la requête admise dans sa classe
+
+    should_abort est consulté pendant l'attente : s'il devient vrai, la
+    demande quitte la file et AdmissionAbandoned est levée.
+    """
+    controller = _controller()
+    controller.acquire(query_class, should_abort)
+    try:
+        yield
+    finally:
+        controller.release(query_class)
+
+def classify_cost(cost):
+    """Classe d'une requête d'après son coût estimé par EXPLAIN"""
+    return "lourde" if cost >= HEAVY_QUERY_COST else "page"
+
+def admission_metrics():
+    """État de la file d'admission, par classe"""
+    return _controller().snapshot()
@@ -0,0 +1,34 @@
+import json
+import os
+
+import streamlit as st
+
+# Fichiers produits par scripts/build_assets.py, servis par Streamlit sous app/static/
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+MANIFEST_PATH = os.path.join(STATIC_DIR, "manifest.json")
+
+FALLBACK_BACKGROUND = "linear-gradient(135deg, #667eea 0%, #764ba2 100%)"
+
+@st.cache_resource
+def load_manifest():
+    """Charge le manifeste des images optimisées (vide si les images n'ont pas été préparées)"""
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+def asset_url(name):
+    """URL statique d'une image de assets/images, ou None si elle n'a pas été préparée"""
+    entry = load_manifest().get(name)
+    if entry is None:
+        return None
+    # Le paramètre v indique à Tornado de servir l'image avec un cache longue durée
+    return f"app/static/{entry['file']}?v={entry['hash']}"
+
+def background_css(*names):
+    """Valeur CSS `background` pour la première image disponible parmi names"""
+    for name in names:
+        url = asset_url(name)
+        if url:
+            return f'url("{url}")'
+    return FALLBACK_BACKGROUND
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.database import CACHE_TTL
+from utils.figures import dataframe_fingerprint
+
+# Niveaux de zoom (tuiles Web Mercator) pour lesquels l'agrégation est précalculée
+ZOOM_LEVELS = tuple(range(3, 15))
+# Taille d'une cellule de la grille à l'écran, en pixels
+CELL_PIXELS = 60
+# Nombre maximal de marqueurs renvoyés pour une vue
+MAX_MARKERS = 300
+
+def _project(lat, lon):
+    """Projette des coordonnées WGS84 en Web Mercator normalisé sur [0, 1]"""
+    x = (lon + 180.0) / 360.0
+    lat_rad = np.radians(np.clip(lat, -85.05112878, 85.05112878))
+    y = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0
+    return x, y
+
+def _unproject(x, y):
+    """Inverse de _project"""
+    lon = x * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * y))))
+    return lat, lon
+
+def _aggregate_level(x, y, lat, lon, weights, labels, zoom):
+    """Regroupe les points par cellule de grille pour un niveau de zoom"""
+    cells_per_side = 256 * 2 ** zoom / CELL_PIXELS
+    cell_x = np.floor(x * cells_per_side).astype(np.int64)
+    cell_y = np.floor(y * cells_per_side).astype(np.int64)
+    keys = cell_x * (int(cells_per_side) + 1) + cell_y
+
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    count = np.bincount(inverse)
+    level = pd.DataFrame({
+        "latitude": np.bincount(inverse, weights=lat) / count,
+        "longitude": np.bincount(inverse, weights=lon) / count,
+        "count": count,
+        "weight": np.bincount(inverse, weights=weights),
+    })
+    # Un marqueur isolé garde le libellé de son point, un groupe affiche son effectif
+    level["label"] = np.where(count == 1, labels[first], count.astype(str) + " éléments")
+    return level
+
+def build_cluster_pyramid(df, lat_col="latitude", lon_col="longitude", weight_col=None, label_col=None):
+    """Précalcule les marqueurs agrégés de chaque niveau de zoom"""
+    points = df.dropna(subset=[lat_col, lon_col])
+    lat = points[lat_col].to_numpy(dtype=float)
+    lon = points[lon_col].to_numpy(dtype=float)
+    weights = points[weight_col].to_numpy(dtype=float) if weight_col else np.ones(len(points))
+    labels = points[label_col].astype(str).to_numpy() if label_col else np.full(len(points), "", dtype=object)
+    x, y = _project(lat, lon)
+
+    return {zoom: _aggregate_level(x, y, lat, lon, weights, labels, zoom) for zoom in ZOOM_LEVELS}
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=16, show_spinner=False)
+def _cached_pyramid(fingerprint, lat_col, lon_col, weight_col, label_col, _df):
+    """Pyramide mise en cache par contenu des données ; _df est exclu de la clé"""
+    return build_cluster_pyramid(_df, lat_col, lon_col, weight_col, label_col)
+
+def cluster_pyramid(df, lat_col="latitude", lon_col="longitude", weight_col=None, label_col=None):
+    """build_cluster_pyramid, partagée entre les sessions tant que les données ne changent pas"""
+    return _cached_pyramid(dataframe_fingerprint(df), lat_col, lon_col, weight_col, label_col, df)
+
+def viewport_bounds(center_lat, center_lon, zoom, width=1200, height=700):
+    """Emprise (lat_min, lat_max, lon_min, lon_max) d'une carte de width x height pixels"""
+    world = 256 * 2 ** zoom
+    x, y = _project(np.array([center_lat]), np.array([center_lon]))
+    half_w, half_h = width / 2 / world, height / 2 / world
+    lat_max, lon_min = _unproject(x - half_w, y - half_h)
+    lat_min, lon_max = _unproject(x + half_w, y + half_h)
+    return float(lat_min[0]), float(lat_max[0]), float(lon_min[0]), float(lon_max[0])
+
+def clusters_in_viewport(pyramid, zoom, bounds, max_markers=MAX_MARKERS):
+    """Marqueurs agrégés visibles dans l'emprise, au plus max_markers
+
+    Si le niveau demandé produit trop de marqueurs, on remonte vers des
+    niveaux plus grossiers jusqu'à respecter la limite.
+    """
+    lat_min, lat_max, lon_min, lon_max = bounds
+    levels = sorted(level for level in pyramid if level <= max(zoom, min(pyramid)))
+    visible = pd.DataFrame(columns=["latitude", "longitude", "count", "weight", "label"])
+    for level in reversed(levels):
+        markers = pyramid[level]
+        inside = (
+            markers["latitude"].between(lat_min, lat_max)
+            & markers["longitude"].between(lon_min, lon_max)
+        )
+        visible = markers[inside]
+        if len(visible) <= max_markers:
+            break
+    return visible.nlargest(max_markers, "count") if len(visible) > max_markers else visible
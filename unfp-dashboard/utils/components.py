@@ -0,0 +1,20 @@
+import streamlit as st
+
+def lazy_tabs(views, key):
+    """Onglets rendus à la demande : seule la vue sélectionnée est calculée
+
+    views associe à chaque libellé une fonction sans argument qui dessine la
+    vue. Le sélecteur et la vue forment un fragment : changer d'onglet ou
+    interagir dans la vue ne relance pas le reste de la page.
+    """
+    labels = list(views)
+
+    @st.fragment
+    def _render():
+        selected = st.segmented_control(
+            "Vue", labels, default=labels[0], key=key, label_visibility="collapsed"
+        )
+        # Un second clic sur l'onglet actif le désélectionne : on revient au premier
+        views[selected or labels[0]]()
+
+    _render()
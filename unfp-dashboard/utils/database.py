@@ -1,44 +1,872 @@
+import logging
+import os
+import random
+import re
+import select
+import threading
+import time
+import weakref
+
 import psycopg2
+from psycopg2.errors import DuplicatePreparedStatement, FeatureNotSupported, InvalidSqlStatementName
+from psycopg2.extensions import QueryCanceledError
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 import pandas as pd
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.exceptions import StopException
+from utils.admission import MAX_CONCURRENT, AdmissionAbandoned, admitted, classify_cost
 from functools import lru_cache
 
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Les entrées du cache sont invalidées par table via LISTEN/NOTIFY
+# (voir sql/001_cache_notify.sql) : le TTL n'est plus qu'un filet de sécurité.
+CACHE_TTL = 6 * 3600
+NOTIFY_CHANNEL = "unfpa_cache"
+# Nombre maximal de résultats conservés : la recherche libre et la pagination
+# par clé créent une entrée par texte saisi et par page
+CACHE_MAX_ENTRIES = 2000
+# Version commune à toutes les tables, incrémentée quand des modifications
+# ont pu être manquées (reconnexion de l'écoute)
+ALL_TABLES = "*"
+
+_TABLE_PATTERN = re.compile(r"\bpublic\.(\w+)", re.IGNORECASE)
+
+# Connexions : un pool par serveur (primaire et réplicas en lecture). Au-delà
+# des requêtes admises (utils/admission.py), le pool garde des connexions pour
+# les lectures hors file : filigrane des deux résultats incrémentaux, liste
+# des tables de la copie DuckDB et vérification des réplicas
+RESERVED_CONNECTIONS = 3
+POOL_SIZE = MAX_CONCURRENT + RESERVED_CONNECTIONS
+CONNECT_TIMEOUT = 5
+# Les réplicas sont vérifiés à cet intervalle (secondes) et écartés au-delà de
+# MAX_REPLICA_LAG secondes de retard (modifiable par max_replica_lag dans les secrets)
+REPLICA_CHECK_INTERVAL = 10
+MAX_REPLICA_LAG = 30
+# Durée maximale d'une requête du tableau de bord (secondes), et intervalle
+# auquel les requêtes des runs interrompus sont recherchées pour être annulées
+QUERY_TIMEOUT = 30
+CANCEL_CHECK_INTERVAL = 0.1
+
+_PARAM_PATTERN = re.compile(r"(?<!%)%s")
+
+_READ_ONLY_PATTERN = re.compile(r"^\s*(SELECT|WITH|VALUES|TABLE)\b", re.IGNORECASE)
+_WRITE_PATTERN = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|FOR\s+UPDATE|FOR\s+SHARE|nextval|setval|refresh_\w+)\b", re.IGNORECASE)
+
+def _connection_params():
+    """Paramètres de connexion au primaire issus de st.secrets"""
+    return dict(
+        host=st.secrets["postgres"]["host"],
+        port=st.secrets["postgres"]["port"],
+        database=st.secrets["postgres"]["database"],
+        user=st.secrets["postgres"]["user"],
+        password=st.secrets["postgres"]["password"]
+    )
+
+def _replica_dsns():
+    """DSN des réplicas en lecture (clé replicas de [postgres], facultative)"""
+    return list(st.secrets["postgres"].get("replicas", []))
+
+def _prepared_statements_enabled():
+    """Vrai si les requêtes fréquentes sont préparées côté serveur (clé prepared_statements de [postgres])
+
+    À désactiver derrière un pooler en mode transaction (pgbouncer
+    pool_mode = transaction) : une instruction préparée n'y survit pas d'une
+    transaction à l'autre.
+    """
+    return bool(st.secrets["postgres"].get("prepared_statements", True))
+
+def offline_bundle():
+    """Paquet hors ligne servi à la place de PostgreSQL (clé bundle de [offline]), ou None
+
+    Construit par scripts/build_snapshot.py ; en mode hors ligne, aucune
+    connexion à PostgreSQL n'est ouverte.
+    """
+    bundle = st.secrets.get("offline", {}).get("bundle")
+    if bundle and not os.path.isabs(bundle):
+        bundle = os.path.join(APP_DIR, bundle)
+    return bundle
+
+def check_offline_bundle():
+    """Arrête la page avec une explication si le paquet hors ligne configuré est introuvable"""
+    bundle = offline_bundle()
+    if bundle is not None and not os.path.exists(bundle):
+        st.error(f"Paquet hors ligne introuvable : {bundle}. Le construire avec "
+                 "`python scripts/build_snapshot.py` (depuis unfp-dashboard/) "
+                 "ou corriger [offline] bundle dans .streamlit/secrets.toml.")
+        st.stop()
+
+def local_backend_enabled():
+    """Vrai si les lectures sont servies par DuckDB (copie de [duckdb] ou paquet hors ligne)"""
+    return offline_bundle() is not None or bool(st.secrets.get("duckdb", {}).get("enabled", False))
+
+def _max_replica_lag():
+    """Retard de réplication toléré, en secondes (clé max_replica_lag de [postgres])"""
+    return float(st.secrets["postgres"].get("max_replica_lag", MAX_REPLICA_LAG))
+
 @st.cache_resource
-def init_connection():
-    """Initialise la connexion à la base de données"""
+def _database_nodes():
+    """Serveurs connus : le primaire puis chaque réplica, avec leur état
+
+    healthy indique que le serveur répond ; lag est le retard de réplication
+    et replay_lsn la position WAL rejouée, mesurés par _check_replica
+    (toujours nuls pour le primaire).
+    """
+    nodes = [{"name": "primaire", "params": _connection_params(), "replica": False}]
+    nodes += [{"name": f"réplica {index}", "params": {"dsn": dsn}, "replica": True}
+              for index, dsn in enumerate(_replica_dsns(), start=1)]
+    for node in nodes:
+        node.update(pool=None, healthy=True, lag=0.0, replay_lsn=0, in_flight=0, error=None,
+                    prepared=_prepared_statements_enabled())
+    return nodes
+
+_nodes_lock = threading.Lock()
+
+def _node_pool(node):
+    """Pool de connexions du serveur, créé à la première utilisation"""
+    with _nodes_lock:
+        if node["pool"] is None:
+            node["pool"] = ThreadedConnectionPool(0, POOL_SIZE, connect_timeout=CONNECT_TIMEOUT, **node["params"])
+        return node["pool"]
+
+def _mark_unhealthy(node, error):
+    """Écarte un serveur du routage jusqu'à la prochaine vérification réussie"""
+    if node["healthy"]:
+        logger.warning("Serveur %s écarté: %s", node["name"], error)
+    node["healthy"] = False
+    node["error"] = str(error)
+
+def _mark_healthy(node):
+    """Réintègre un serveur dans le routage"""
+    if not node["healthy"]:
+        logger.info("Serveur %s de nouveau disponible", node["name"])
+    node["healthy"] = True
+    node["error"] = None
+
+def _parse_lsn(lsn):
+    """Position WAL (texte pg_lsn, « 16/B374D848 ») en entier comparable ; 0 si inconnue"""
+    if not lsn:
+        return 0
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+def _check_replica(node):
+    """Vérifie qu'un réplica répond et mesure son retard de réplication"""
+    conn = None
+    failed = False
     try:
-        conn = psycopg2.connect(
-            host=st.secrets["postgres"]["host"],
-            port=st.secrets["postgres"]["port"],
-            database=st.secrets["postgres"]["database"],
-            user=st.secrets["postgres"]["user"],
-            password=st.secrets["postgres"]["password"]
-        )
-        return conn
+        conn = _node_pool(node).getconn()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            # Sans écriture récente sur le primaire, le dernier rejeu peut être
+            # ancien sans retard réel : on compare d'abord les positions WAL
+            cur.execute("""
+                SELECT CASE WHEN NOT pg_is_in_recovery()
+                              OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                       END,
+                       pg_last_wal_replay_lsn()::text;
+            """)
+            lag, replay_lsn = cur.fetchone()
+            node["lag"] = float(lag)
+            node["replay_lsn"] = _parse_lsn(replay_lsn)
+        _mark_healthy(node)
     except Exception as e:
-        st.error(f"Erreur de connexion à la base de données: {e}")
+        failed = True
+        _mark_unhealthy(node, e)
+    finally:
+        if conn is not None:
+            _node_pool(node).putconn(conn, close=failed or bool(conn.closed))
+
+def _monitor_replicas():
+    """Vérifie périodiquement la santé et le retard de chaque réplica"""
+    while True:
+        for node in _database_nodes():
+            if node["replica"]:
+                _check_replica(node)
+        time.sleep(REPLICA_CHECK_INTERVAL)
+
+@st.cache_resource
+def start_replica_monitor():
+    """Démarre (une seule fois par processus) la surveillance des réplicas, s'il y en a"""
+    if not any(node["replica"] for node in _database_nodes()):
         return None
+    thread = threading.Thread(target=_monitor_replicas, name="unfpa-replica-monitor", daemon=True)
+    thread.start()
+    return thread
+
+def _candidate_nodes(read_only, min_lsn=0):
+    """Serveurs à essayer, dans l'ordre
+
+    Lecture : réplicas sains, le moins chargé d'abord, puis le primaire, puis
+    en dernier recours les réplicas en retard. Écriture : le primaire seul.
+    Un réplica qui n'a pas encore rejoué la position min_lsn (celle de la
+    dernière modification notifiée des tables lues) est écarté : sa réponse
+    serait mise en cache comme à jour.
+    """
+    nodes = _database_nodes()
+    primary = nodes[0]
+    if not read_only:
+        return [primary]
+    replicas = [node for node in nodes
+                if node["replica"] and node["healthy"] and node["replay_lsn"] >= min_lsn]
+    # Mélange puis tri stable : à charge égale, les réplicas sont tirés au hasard
+    random.shuffle(replicas)
+    max_lag = _max_replica_lag()
+    up_to_date = sorted((node for node in replicas if node["lag"] <= max_lag), key=lambda node: node["in_flight"])
+    lagging = sorted((node for node in replicas if node["lag"] > max_lag), key=lambda node: node["lag"])
+    return up_to_date + [primary] + lagging
+
+def is_read_only(query):
+    """Vrai si la requête est une lecture, routable vers un réplica"""
+    return bool(_READ_ONLY_PATTERN.match(query)) and not _WRITE_PATTERN.search(query)
+
+@st.cache_resource
+def _in_flight_queries():
+    """Requêtes en cours par session : {session_id: {jeton: requête}}"""
+    return {}
 
-@st.cache_data(ttl=600)
-def run_query(query, params=None):
-    """Exécute une requête SQL et retourne les résultats"""
-    conn = init_connection()
-    if conn is None:
+_in_flight_lock = threading.Lock()
+
+def _run_superseded(ctx):
+    """Vrai si le run de la session a été arrêté ou sera remplacé par une relance"""
+    # ScriptRequests n'expose pas d'accesseur public pour l'état en attente
+    requests = getattr(ctx, "script_requests", None)
+    state = getattr(requests, "_state", None)
+    if state is None or state.value == "CONTINUE":
+        return False
+    if state.value == "RERUN":
+        # Une relance de fragment (hors st.rerun(scope="fragment")) n'interrompt pas le run en cours
+        rerun = requests._rerun_data
+        return not (rerun.fragment_id_queue and not rerun.is_fragment_scoped_rerun)
+    return True
+
+def _register_query(conn):
+    """Enregistre la requête du run courant pour pouvoir l'annuler ; None hors d'un run"""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
         return None
-    
+    start_query_canceller()
+    entry = {"ctx": ctx, "conn": conn, "cancelled": False}
+    with _in_flight_lock:
+        _in_flight_queries().setdefault(ctx.session_id, {})[id(entry)] = entry
+    return entry
+
+def _unregister_query(entry):
+    """Retire une requête terminée du registre"""
+    if entry is None:
+        return
+    with _in_flight_lock:
+        queries = _in_flight_queries()
+        session = queries.get(entry["ctx"].session_id, {})
+        session.pop(id(entry), None)
+        if not session:
+            queries.pop(entry["ctx"].session_id, None)
+
+def _cancel_superseded_queries():
+    """Annule côté serveur les requêtes dont le run a été arrêté ou remplacé"""
+    while True:
+        # Les requêtes à annuler sont marquées sous le verrou, puis annulées
+        # après sa libération : l'annulation est un aller-retour réseau qui
+        # bloquerait l'enregistrement des autres requêtes
+        with _in_flight_lock:
+            targets = [entry for session in _in_flight_queries().values() for entry in session.values()
+                       if not entry["cancelled"] and _run_superseded(entry["ctx"])]
+            for entry in targets:
+                entry["cancelled"] = True
+        for entry in targets:
+            if entry["conn"].closed:
+                continue
+            try:
+                # Équivalent de pg_cancel_backend pour le processus serveur de cette connexion.
+                # Une requête terminée entre-temps n'est pas touchée : sa connexion,
+                # marquée annulée, est fermée au lieu de retourner au pool
+                entry["conn"].cancel()
+            except psycopg2.Error as e:
+                logger.warning("Annulation de requête impossible: %s", e)
+        time.sleep(CANCEL_CHECK_INTERVAL)
+
+@st.cache_resource
+def start_query_canceller():
+    """Démarre (une seule fois par processus) le thread d'annulation des requêtes abandonnées"""
+    thread = threading.Thread(target=_cancel_superseded_queries, name="unfpa-query-canceller", daemon=True)
+    thread.start()
+    return thread
+
+# Instructions déjà préparées sur chaque connexion des pools ; une connexion
+# fermée puis recréée repart d'un ensemble vide
+_prepared_by_connection = weakref.WeakKeyDictionary()
+# Dernier statement_timeout (ms) appliqué sur chaque connexion des pools
+_timeout_by_connection = weakref.WeakKeyDictionary()
+
+def _positional(query):
+    """Texte de la requête pour PREPARE : paramètres %s numérotés $1, $2…"""
+    counter = iter(range(1, 1000))
+    return _PARAM_PATTERN.sub(lambda _: f"${next(counter)}", query.strip().rstrip(";")).replace("%%", "%")
+
+def _execute_prepared(cur, node, name, query, params):
+    """Exécute la requête préparée name, en la préparant d'abord sur cette connexion si besoin
+
+    Si le serveur ne retrouve pas l'instruction (ou la connaît déjà sans que
+    la connexion le sache), un pooler en mode transaction s'intercale : la
+    préparation est abandonnée pour ce serveur et la requête part en texte.
+    Si le schéma d'une table lue a changé depuis la préparation (« cached plan
+    must not change result type »), l'instruction est préparée à nouveau.
+    """
+    prepared = _prepared_by_connection.setdefault(cur.connection, set())
+    statement = f"tdb_{name}"
+    args = tuple(params or ())
     try:
-        with conn.cursor() as cur:
-            cur.execute(query, params or ())
-            results = cur.fetchall()
-            columns = [desc[0] for desc in cur.description] if cur.description else []
+        if name not in prepared:
+            cur.execute(f"PREPARE {statement} AS {_positional(query)};")
+            prepared.add(name)
+        placeholders = f" ({', '.join(['%s'] * len(args))})" if args else ""
+        try:
+            cur.execute(f"EXECUTE {statement}{placeholders};", args)
+        except FeatureNotSupported:
+            cur.execute(f"DEALLOCATE {statement};")
+            prepared.discard(name)
+            cur.execute(f"PREPARE {statement} AS {_positional(query)};")
+            prepared.add(name)
+            cur.execute(f"EXECUTE {statement}{placeholders};", args)
+    except (DuplicatePreparedStatement, InvalidSqlStatementName) as e:
+        logger.warning("Instructions préparées désactivées sur %s: %s", node["name"], e)
+        node["prepared"] = False
+        prepared.clear()
+        cur.execute(query, params or ())
+
+def _execute(query, params, read_only=True, timeout=QUERY_TIMEOUT, prepared=None, min_lsn=0):
+    """Exécute la requête sur le premier serveur disponible, avec bascule
+
+    Seules les erreurs de connexion font passer au serveur suivant ; une
+    erreur de la requête elle-même est propagée. Si le run Streamlit qui
+    attend la requête est arrêté ou remplacé, la requête est annulée et le
+    run s'interrompt pour laisser place au suivant. prepared est le nom sous
+    lequel préparer la requête sur chaque connexion (voir PREPARED_QUERIES) ;
+    min_lsn est la position WAL qu'un réplica doit avoir rejouée.
+    """
+    start_replica_monitor()
+    last_error = None
+    for node in _candidate_nodes(read_only, min_lsn):
+        try:
+            conn = _node_pool(node).getconn()
+        except PoolError as e:
+            # Pool saturé : le serveur est sain mais occupé
+            last_error = e
+            continue
+        except psycopg2.OperationalError as e:
+            _mark_unhealthy(node, e)
+            last_error = e
+            continue
+
+        with _nodes_lock:
+            node["in_flight"] += 1
+        entry = _register_query(conn)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                # Le délai reste en place sur la connexion (autocommit) : il
+                # n'est renvoyé que s'il change
+                timeout_ms = int(timeout * 1000) if timeout else 0
+                if _timeout_by_connection.get(conn) != timeout_ms:
+                    cur.execute("SET statement_timeout = %s;", (timeout_ms,))
+                    _timeout_by_connection[conn] = timeout_ms
+                if prepared and node["prepared"]:
+                    _execute_prepared(cur, node, prepared, query, params)
+                else:
+                    cur.execute(query, params or ())
+                results = cur.fetchall() if cur.description else []
+                columns = [desc[0] for desc in cur.description] if cur.description else []
+            if not node["replica"]:
+                _mark_healthy(node)
             return results, columns
+        except QueryCanceledError:
+            if entry is not None and entry["cancelled"]:
+                # Le run est abandonné : rien à afficher ni à mettre en cache
+                raise StopException()
+            raise
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            if not conn.closed:
+                raise
+            _mark_unhealthy(node, e)
+            last_error = e
+        finally:
+            _unregister_query(entry)
+            with _nodes_lock:
+                node["in_flight"] -= 1
+            # Une annulation arrivée après la fin de la requête viserait la suivante :
+            # une connexion dont la requête a été annulée n'est pas réutilisée
+            cancelled = entry is not None and entry["cancelled"]
+            _node_pool(node).putconn(conn, close=cancelled or bool(conn.closed))
+    raise last_error or psycopg2.OperationalError("Aucun serveur PostgreSQL disponible")
+
+def _read_connection_params(tables=()):
+    """Paramètres de connexion du serveur à utiliser pour une lecture longue (exports) des tables"""
+    start_replica_monitor()
+    min_lsn = _required_lsn(tables)
+    return dict(_candidate_nodes(read_only=True, min_lsn=min_lsn)[0]["params"], connect_timeout=CONNECT_TIMEOUT)
+
+def database_status():
+    """État de chaque serveur : rôle, santé, retard et requêtes en cours"""
+    if offline_bundle() is not None:
+        return []
+    return [
+        {key: node[key] for key in ("name", "replica", "healthy", "lag", "in_flight", "error")}
+        for node in _database_nodes()
+    ]
+
+@st.cache_resource
+def _table_versions():
+    """Compteurs de version par table, incrémentés à chaque notification"""
+    return {}
+
+def query_tables(query):
+    """Retourne les tables du schéma public lues par une requête"""
+    return tuple(sorted({table.lower() for table in _TABLE_PATTERN.findall(query)}))
+
+@st.cache_resource
+def _table_lsns():
+    """Position WAL du primaire à la dernière notification de chaque table"""
+    return {}
+
+def _required_lsn(tables):
+    """Position WAL qu'un réplica doit avoir rejouée pour lire ces tables à jour"""
+    lsns = _table_lsns()
+    return max(lsns.get(table, 0) for table in (ALL_TABLES, *tables))
+
+def invalidate_table(table, lsn=0):
+    """Invalide les entrées du cache qui dépendent d'une table
+
+    lsn est la position WAL du primaire après la modification : les
+    lectures suivantes ne sont routées que vers les réplicas qui l'ont rejouée.
+    """
+    # La position est publiée avant la version : une lecture qui voit la
+    # nouvelle version voit aussi la position à attendre
+    if lsn:
+        _table_lsns()[table] = lsn
+    versions = _table_versions()
+    versions[table] = versions.get(table, 0) + 1
+
+def _invalidate_all(lsn=0):
+    """Invalide toutes les entrées, y compris celles des tables jamais notifiées"""
+    invalidate_table(ALL_TABLES, lsn)
+
+def _current_lsn(conn):
+    """Position WAL courante du primaire"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_current_wal_lsn()::text;")
+        return _parse_lsn(cur.fetchone()[0])
+
+def _versions_of(tables):
+    """Versions des tables lues, précédées de la version commune, pour les clés de cache"""
+    versions = _table_versions()
+    return {table: versions.get(table, 0) for table in (ALL_TABLES, *tables)}
+
+def _listen_for_changes():
+    """Écoute le canal de notification et invalide les tables modifiées"""
+    reconnecting = False
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(**_connection_params())
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {NOTIFY_CHANNEL};")
+            # Des modifications ont pu avoir lieu pendant une déconnexion
+            if reconnecting:
+                _invalidate_all(_current_lsn(conn))
+            reconnecting = True
+
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                if not conn.notifies:
+                    continue
+                # La notification est émise à la validation : la position
+                # courante est au moins celle de la modification
+                lsn = _current_lsn(conn)
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    invalidate_table(notify.payload.lower(), lsn)
+        except Exception as e:
+            reconnecting = True
+            logger.warning("Écoute des notifications interrompue: %s", e)
+            time.sleep(5)
+        finally:
+            if conn is not None:
+                conn.close()
+
+@st.cache_resource
+def start_cache_listener():
+    """Démarre (une seule fois par processus) le thread d'écoute des notifications"""
+    thread = threading.Thread(target=_listen_for_changes, name="unfpa-cache-listener", daemon=True)
+    thread.start()
+    return thread
+
+@st.cache_resource
+def _query_costs():
+    """Coût estimé par EXPLAIN, par texte de requête"""
+    return {}
+
+def _query_class(query, params):
+    """Classe d'admission d'une requête non enregistrée, d'après son coût estimé
+
+    Le coût est mesuré une fois par texte de requête, avec les premiers
+    paramètres rencontrés.
+    """
+    costs = _query_costs()
+    if query not in costs:
+        try:
+            # La mesure passe elle aussi par la file, en tête : elle occupe une connexion du pool
+            with admitted("kpi"):
+                results, _ = _execute("EXPLAIN (FORMAT JSON) " + query.strip().rstrip(";"), params,
+                                      read_only=is_read_only(query), timeout=5)
+            costs[query] = float(results[0][0][0]["Plan"]["Total Cost"])
+        except Exception as e:
+            logger.warning("Estimation du coût impossible: %s", e)
+            return "page"
+    return classify_cost(costs[query])
+
+def run_query(query, params=None, timeout=QUERY_TIMEOUT, query_class=None, prepared=None):
+    """Exécute une requête SQL et retourne les résultats
+
+    timeout limite la durée de la requête en secondes (None : sans limite).
+    query_class est la classe d'admission (utils/admission.py) ; à défaut,
+    elle est déduite du coût estimé de la requête. prepared est le nom sous
+    lequel la requête est préparée côté serveur.
+    Les erreurs ne sont pas mises en cache : la requête est retentée au run suivant.
+    """
+    check_offline_bundle()
+    if local_backend_enabled() and is_read_only(query):
+        local = _run_local(query, params)
+        if local is not None:
+            return local
+    if offline_bundle() is not None:
+        st.error("Ces données ne sont pas disponibles hors ligne.")
+        return None, []
+    start_cache_listener()
+    tables = query_tables(query)
+    table_versions = tuple(_versions_of(tables).items())
+    try:
+        return _run_query_cached(query, params, table_versions, timeout, query_class, prepared,
+                                 _required_lsn(tables))
+    except QueryCanceledError:
+        st.error(f"La requête a dépassé le délai de {timeout} s.")
+        return None, []
     except Exception as e:
         st.error(f"Erreur lors de l'exécution de la requête: {e}")
         return None, []
-    finally:
-        if conn:
-            #conn.close()
-            pass
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+def _run_query_cached(query, params, table_versions, timeout, query_class, prepared, _min_lsn):
+    """Exécute la requête une fois admise ; table_versions ne sert qu'à la clé du cache
+
+    _min_lsn (hors clé) écarte les réplicas qui n'ont pas rejoué la dernière
+    modification notifiée : le résultat est mis en cache sous la nouvelle version.
+    """
+    ctx = get_script_run_ctx(suppress_warning=True)
+    try:
+        # Seules les requêtes absentes du cache passent par la file d'admission
+        with admitted(query_class or _query_class(query, params),
+                      should_abort=lambda: ctx is not None and _run_superseded(ctx)):
+            return _execute(query, params, read_only=is_read_only(query), timeout=timeout, prepared=prepared,
+                            min_lsn=_min_lsn)
+    except AdmissionAbandoned:
+        # Le run a été remplacé pendant l'attente
+        raise StopException()
+
+def _run_local(query, params):
+    """Exécute une lecture sur la copie DuckDB (utils/duckdb_backend.py)
+
+    Retourne None si la copie ne contient pas toutes les tables lues ou si
+    DuckDB ne sait pas exécuter la requête (fonctions propres à PostgreSQL) :
+    elle part alors vers PostgreSQL.
+    """
+    # Import différé : DuckDB n'est chargé que si le mode est activé
+    from utils.duckdb_backend import local_tables, snapshot_version, start_snapshot_refresher
+
+    if offline_bundle() is None:
+        start_snapshot_refresher()
+    tables = query_tables(query)
+    if not tables or not set(tables) <= local_tables():
+        return None
+    try:
+        return _run_local_cached(query, params, snapshot_version())
+    except Exception as e:
+        logger.info("Requête transmise à PostgreSQL, DuckDB n'a pas pu l'exécuter: %s", e)
+        return None
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+def _run_local_cached(query, params, snapshot):
+    """Résultat DuckDB ; snapshot (version de la copie) ne sert qu'à la clé du cache"""
+    from utils.duckdb_backend import run_local_query
+
+    return run_local_query(query, params)
+
+def execute_write(query, params=None):
+    """Exécute une écriture sur le primaire, hors cache ; les erreurs sont propagées"""
+    return _execute(query, params, read_only=False, timeout=None)
+
+def ensure_indicator_partition(annee):
+    """Crée si besoin la partition de fact_indicateur de l'année (sql/007_fact_indicateur_partitions.sql)"""
+    results, _ = execute_write("SELECT public.ensure_fact_indicateur_partition(%s::smallint);", (int(annee),))
+    return results[0][0]
+
+# Requêtes des pages, nommées pour pouvoir être préchargées par utils/warmup.py
+DASHBOARD_QUERIES = {
+    "total_projets": "SELECT COUNT(*) FROM public.dim_projet;",
+    "budget_total": "SELECT SUM(montant_usd) FROM public.dim_projet;",
+    "total_partenaires": "SELECT COUNT(*) FROM public.dim_partenaire;",
+    "total_structures": "SELECT COUNT(*) FROM public.fact_structure;",
+    "projets_par_domaine": """
+        SELECT d.name, COUNT(p.id) as count
+        FROM public.dim_projet p
+        LEFT JOIN public.dim_domaine d ON p.domaine_id = d.id
+        GROUP BY d.name
+        ORDER BY count DESC;
+    """,
+    "budget_par_bailleur": """
+        SELECT bailleur, SUM(montant_usd) as budget_total
+        FROM public.dim_projet
+        GROUP BY bailleur
+        ORDER BY budget_total DESC;
+    """,
+    "evolution_projets": """
+        SELECT EXTRACT(YEAR FROM date_debut) as year, COUNT(*) as count, SUM(montant_usd) as budget
+        FROM public.dim_projet
+        WHERE date_debut IS NOT NULL
+        GROUP BY EXTRACT(YEAR FROM date_debut)
+        ORDER BY year;
+    """,
+    # Agrégat maintenu en base à partir de projet_localisation (sql/004_projet_localisation.sql)
+    "projets_par_prefecture": """
+        SELECT prefecture_id, nombre_projets as project_count
+        FROM public.agg_projets_prefecture;
+    """,
+    "structures_par_prefecture": """
+        SELECT commune.prefecture_id, COUNT(fact_structure.id) as structure_count
+        FROM public.fact_structure
+        JOIN public.dim_commune commune ON fact_structure.commune_id = commune.id
+        GROUP BY commune.prefecture_id;
+    """,
+    # Mobilisation des ressources : agrégats de sql/002_mobilisation_ressources.sql
+    "mobilisation_bailleurs": """
+        SELECT annee, bailleur, type, engagement::float8 as engagement,
+               decaissement::float8 as decaissement, taux_decaissement::float8 as taux_decaissement
+        FROM public.agg_mobilisation_bailleur
+        WHERE annee = (SELECT MAX(annee) FROM public.agg_mobilisation_bailleur)
+        ORDER BY engagement DESC;
+    """,
+    "mobilisation_domaines": """
+        SELECT annee, domaine, budget_total::float8 as budget_total,
+               finance_acquise::float8 as finance_acquise, gap::float8 as gap,
+               pourcentage_finance::float8 as pourcentage_finance, rang_gap
+        FROM public.agg_mobilisation_domaine
+        WHERE annee = (SELECT MAX(annee) FROM public.agg_mobilisation_domaine)
+        ORDER BY budget_total DESC;
+    """,
+    "mobilisation_mensuelle": """
+        SELECT mois, engagements::float8 as engagements, decaissements::float8 as decaissements,
+               engagements_cumules::float8 as engagements_cumules,
+               decaissements_cumules::float8 as decaissements_cumules
+        FROM public.agg_mobilisation_mensuelle
+        ORDER BY mois;
+    """,
+}
+
+# Classe d'admission des requêtes enregistrées (les autres sont classées par EXPLAIN)
+QUERY_CLASS_REGISTRY = {
+    "total_projets": "kpi",
+    "budget_total": "kpi",
+    "total_partenaires": "kpi",
+    "total_structures": "kpi",
+    "projets_par_domaine": "page",
+    "budget_par_bailleur": "page",
+    "evolution_projets": "page",
+    "projets_par_prefecture": "page",
+    "structures_par_prefecture": "page",
+    "mobilisation_bailleurs": "page",
+    "mobilisation_domaines": "page",
+    "mobilisation_mensuelle": "page",
+}
+
+# Requêtes les plus fréquentes, préparées une fois par connexion pour ne pas
+# être replanifiées à chaque exécution (mesure : scripts/bench_prepared_statements.py)
+PREPARED_QUERIES = (
+    "projets_par_domaine",
+    "budget_par_bailleur",
+    "evolution_projets",
+    "projets_par_prefecture",
+    "structures_par_prefecture",
+)
+
+# Requêtes de base des tableaux paginés (utils/tables.py), sans ORDER BY ni LIMIT
+TABLE_QUERIES = {
+    "projets": """
+        SELECT p.id, p.nom_projet, d.name as domaine_nom, p.bailleur, p.montant_usd,
+               p.date_debut, p.date_fin
+        FROM public.dim_projet p
+        LEFT JOIN public.dim_domaine d ON p.domaine_id = d.id
+    """,
+    "partenaires": """
+        SELECT pt.id, pt.partenaire_name, d.name as domaine_nom, pt.region_couverte,
+               pt.montant_2025, pt.taux_execution
+        FROM public.dim_partenaire pt
+        LEFT JOIN public.dim_domaine d ON pt.domaine_id = d.id
+    """,
+    "indicateurs": """
+        SELECT fi.id, fi.indicator_name, fi.value, fi.annee, dp.name as prefecture_name
+        FROM public.fact_indicateur fi
+        JOIN public.dim_prefecture dp ON fi.prefecture_id = dp.id
+    """,
+    "prefectures": """
+        SELECT id, name, latitude, longitude
+        FROM public.dim_prefecture
+    """,
+}
+
+# Résultats rafraîchis par delta à partir du journal des modifications
+# (sql/008_journal_modifications.sql) : seules les lignes de la table suivie
+# modifiées depuis la dernière lecture sont relues. "cle" est la colonne id
+# de la table suivie ; le tri est refait côté pandas après fusion.
+INCREMENTAL_FRAMES = {
+    "indicateurs": {
+        "table": "fact_indicateur",
+        "cle": "fi.id",
+        "query": """
+            SELECT fi.id, fi.indicator_name, fi.value, fi.annee,
+                   dp.name as prefecture_name, dp.id as prefecture_id
+            FROM public.fact_indicateur fi
+            JOIN public.dim_prefecture dp ON fi.prefecture_id = dp.id
+        """,
+        "tri": ("value", False),
+    },
+    "structures": {
+        "table": "fact_structure",
+        "cle": "fs.id",
+        "query": """
+            SELECT fs.id, fs.domaine_id, fs.commune_id, fs.org_name,
+                   d.name as domaine_nom, c.name as commune_name
+            FROM public.fact_structure fs
+            LEFT JOIN public.dim_domaine d ON fs.domaine_id = d.id
+            LEFT JOIN public.dim_commune c ON fs.commune_id = c.id
+        """,
+        "tri": ("org_name", True),
+    },
+}
+# Au-delà de cette part de lignes modifiées, une relecture complète coûte moins cher
+MAX_DELTA_RATIO = 0.2
+
+@st.cache_resource
+def _incremental_states():
+    """État des résultats rafraîchis par delta, partagé par toutes les sessions"""
+    return {name: {"lock": threading.Lock(), "frame": None} for name in INCREMENTAL_FRAMES}
+
+def _snapshot_xmin():
+    """Plus ancienne transaction encore en cours vue du primaire (filigrane)"""
+    results, _ = _execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text;", None, read_only=False)
+    return results[0][0]
+
+def _full_refresh(name, state):
+    """Relit entièrement un résultat et pose le filigrane"""
+    spec = INCREMENTAL_FRAMES[name]
+    # Filigrane pris avant la lecture : une modification concurrente sera relue au delta suivant
+    xmin = _snapshot_xmin()
+    with admitted("lourde"):
+        results, columns = _execute(spec["query"], None, read_only=False)
+    column, ascending = spec["tri"]
+    state["frame"] = pd.DataFrame(results, columns=columns).sort_values(
+        column, ascending=ascending, ignore_index=True)
+    state["xmin"] = xmin
+    logger.info("%s : relecture complète (%d lignes)", name, len(state["frame"]))
+
+def _delta_refresh(name, state):
+    """Fusionne dans le résultat les lignes modifiées depuis le filigrane
+
+    Retourne False si le delta ne peut pas s'appliquer (TRUNCATE ou trop de
+    lignes modifiées) : le résultat doit alors être relu entièrement.
+    """
+    spec = INCREMENTAL_FRAMES[name]
+    xmin = _snapshot_xmin()
+    with admitted("page"):
+        changes, _ = _execute("""
+            SELECT array_agg(DISTINCT ligne_id) FILTER (WHERE ligne_id IS NOT NULL),
+                   bool_or(operation = 'T')
+            FROM public.journal_modifications
+            WHERE table_name = %s AND transaction >= %s::xid8;
+        """, (spec["table"], state["xmin"]), read_only=False)
+        ids, truncated = changes[0]
+        ids = ids or []
+        frame = state["frame"]
+        if truncated or len(ids) > MAX_DELTA_RATIO * max(len(frame), 1):
+            return False
+        if ids:
+            results, columns = _execute(f"{spec['query']} WHERE {spec['cle']} = ANY(%s);", (ids,), read_only=False)
+            # Les lignes supprimées ne sont plus renvoyées : elles disparaissent du résultat
+            kept = frame[~frame["id"].isin(ids)]
+            changed = pd.DataFrame(results, columns=columns)
+            column, ascending = spec["tri"]
+            merged = pd.concat([kept, changed], ignore_index=True) if len(changed) else kept
+            state["frame"] = merged.sort_values(column, ascending=ascending, ignore_index=True)
+    state["xmin"] = xmin
+    logger.info("%s : %d lignes rafraîchies", name, len(ids))
+    return True
+
+def get_incremental_frame(name):
+    """Résultat de INCREMENTAL_FRAMES sous forme de DataFrame, rafraîchi par delta
+
+    Le résultat est relu quand une table qu'il lit est notifiée comme
+    modifiée : par delta si seule la table suivie a changé, entièrement si
+    une dimension jointe a changé, si des notifications ont pu être manquées
+    (ALL_TABLES) ou si le résultat a plus de CACHE_TTL.
+    """
+    spec = INCREMENTAL_FRAMES[name]
+    column, ascending = spec["tri"]
+    if local_backend_enabled():
+        # La copie DuckDB est locale : elle est relue entièrement
+        results, columns = run_query(spec["query"])
+        if results:
+            return pd.DataFrame(results, columns=columns).sort_values(column, ascending=ascending, ignore_index=True)
+        return pd.DataFrame()
+    start_cache_listener()
+    state = _incremental_states()[name]
+    with state["lock"]:
+        # Versions lues sous le verrou : une notification arrivée pendant la
+        # relecture d'un autre run n'est pas absorbée par ce résultat
+        current = _versions_of(query_tables(spec["query"]))
+        try:
+            if state["frame"] is None or time.monotonic() - state["loaded"] > CACHE_TTL:
+                _full_refresh(name, state)
+                state["loaded"] = time.monotonic()
+            elif current != state["versions"]:
+                dimensions_changed = any(current[table] != state["versions"][table]
+                                         for table in current if table != spec["table"])
+                if dimensions_changed or not _delta_refresh(name, state):
+                    _full_refresh(name, state)
+                    state["loaded"] = time.monotonic()
+            state["versions"] = current
+        except Exception as e:
+            st.error(f"Erreur lors de l'exécution de la requête: {e}")
+            # Le dernier résultat connu reste affiché ; la relecture sera retentée au run suivant
+            if state["frame"] is None:
+                return pd.DataFrame()
+        return state["frame"].copy()
+
+def run_named_query(name, params=None):
+    """Exécute une requête enregistrée dans DASHBOARD_QUERIES"""
+    return run_query(DASHBOARD_QUERIES[name], params, query_class=QUERY_CLASS_REGISTRY.get(name),
+                     prepared=name if name in PREPARED_QUERIES else None)
+
+def get_named_frame(name):
+    """Résultat d'une requête de DASHBOARD_QUERIES sous forme de DataFrame"""
+    results, columns = run_named_query(name)
+    if results:
+        return pd.DataFrame(results, columns=columns)
+    return pd.DataFrame()
 
 def get_domains():
     """Récupère la liste des domaines"""
@@ -104,19 +932,54 @@ def get_partners():
         return pd.DataFrame(results, columns=columns)
     return pd.DataFrame()
 
-def get_indicators():
-    """Récupère les indicateurs"""
+def search_projects(query, limit=20):
+    """Recherche plein texte dans les projets (sql/006_recherche_projets.sql)
+
+    query suit la syntaxe de websearch_to_tsquery (« "santé maternelle" -Conakry »).
+    Les résultats sont classés par pertinence ; l'extrait met les termes
+    trouvés en gras (Markdown).
+    """
+    if not query or not query.strip():
+        return pd.DataFrame()
+    # L'extrait n'est calculé que pour les lignes retenues après le tri
     results, columns = run_query("""
-        SELECT fi.id, fi.indicator_name, fi.value, fi.annee, 
-               dp.name as prefecture_name, dp.id as prefecture_id
-        FROM public.fact_indicateur fi
-        JOIN public.dim_prefecture dp ON fi.prefecture_id = dp.id
-        ORDER BY  fi.value DESC;
-    """)
+        SELECT r.id, r.nom_projet, d.name as domaine_nom, r.bailleur, r.montant_usd, r.rang,
+               ts_headline('french', concat_ws(' — ', r.intitule, r.resultats_attendus, r.resultats_atteints), r.q,
+                           'StartSel=**, StopSel=**, MaxFragments=2, MinWords=8, MaxWords=25') as extrait
+        FROM (
+            SELECT p.id, p.nom_projet, p.domaine_id, p.bailleur, p.montant_usd,
+                   p.intitule, p.resultats_attendus, p.resultats_atteints,
+                   q, ts_rank(p.recherche, q) as rang
+            FROM public.dim_projet p, websearch_to_tsquery('french', %s) q
+            WHERE p.recherche @@ q
+            ORDER BY rang DESC, p.nom_projet
+            LIMIT %s
+        ) r
+        LEFT JOIN public.dim_domaine d ON r.domaine_id = d.id
+        ORDER BY r.rang DESC, r.nom_projet;
+    """, (query.strip(), int(limit)))
+    if results:
+        return pd.DataFrame(results, columns=columns)
+    return pd.DataFrame()
+
+def get_partner_projects(partner_id):
+    """Récupère les projets associés à un partenaire (table partenaire_projet)"""
+    results, columns = run_query("""
+        SELECT p.id, p.nom_projet, d.name as domaine_nom, p.montant_usd, p.date_debut, p.date_fin
+        FROM public.partenaire_projet pp
+        JOIN public.dim_projet p ON pp.projet_id = p.id
+        LEFT JOIN public.dim_domaine d ON p.domaine_id = d.id
+        WHERE pp.partenaire_id = %s
+        ORDER BY p.nom_projet;
+    """, (int(partner_id),))
     if results:
         return pd.DataFrame(results, columns=columns)
     return pd.DataFrame()
 
+def get_indicators():
+    """Récupère les indicateurs"""
+    return get_incremental_frame("indicateurs")
+
 def get_planning():
     """Récupère les données de planning"""
     results, columns = run_query("""
@@ -130,18 +993,36 @@ def get_planning():
 
 def get_structures():
     """Récupère les structures"""
+    return get_incremental_frame("structures")
+
+def get_structure_locations():
+    """Récupère les structures avec leurs coordonnées (celles de leur préfecture)"""
     results, columns = run_query("""
-        SELECT fs.id, fs.domaine_id, fs.commune_id, fs.org_name,
-               d.name as domaine_nom, c.name as commune_name
+        SELECT fs.id, fs.org_name, d.name as domaine_nom, c.name as commune_name,
+               pr.name as prefecture_name, pr.latitude, pr.longitude
         FROM public.fact_structure fs
+        JOIN public.dim_commune c ON fs.commune_id = c.id
+        JOIN public.dim_prefecture pr ON c.prefecture_id = pr.id
         LEFT JOIN public.dim_domaine d ON fs.domaine_id = d.id
-        LEFT JOIN public.dim_commune c ON fs.commune_id = c.id
-        ORDER BY fs.org_name;
+        WHERE pr.latitude IS NOT NULL AND pr.longitude IS NOT NULL;
     """)
     if results:
         return pd.DataFrame(results, columns=columns)
     return pd.DataFrame()
 
+def get_project_locations():
+    """Récupère les localisations des projets avec leurs coordonnées (celles de la préfecture)"""
+    results, columns = run_query("""
+        SELECT pl.id, p.nom_projet, p.montant_usd, pr.name as prefecture_name,
+               pr.latitude, pr.longitude
+        FROM public.projet_localisation pl
+        JOIN public.dim_projet p ON pl.projet_id = p.id
+        JOIN public.dim_prefecture pr ON pl.prefecture_id = pr.id
+        WHERE pr.latitude IS NOT NULL AND pr.longitude IS NOT NULL;
+    """)
+    if results:
+        return pd.DataFrame(results, columns=columns)
+    return pd.DataFrame()
 
 def get_domain_stats():
     """Calcule les statistiques détaillées par domaine"""
@@ -0,0 +1,159 @@
+import hmac
+import logging
+import mimetypes
+import os
+import secrets
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+import streamlit as st
+from utils.reports import REPORT_DIR
+
+logger = logging.getLogger(__name__)
+
+# Serveur de téléchargement des fichiers générés (exports, rapports). Le
+# service statique de Streamlit ne sert en type réel que les images et les
+# PDF (les autres fichiers partent en text/plain avec nosniff) et refuse
+# les fichiers de plus de 200 Mo : ces fichiers sont servis par un petit
+# serveur HTTP lancé dans le processus, sur son propre port.
+#
+# Par défaut, le serveur n'écoute que la machine locale, sur un port libre
+# choisi par le système (8502 est celui que prend Streamlit quand 8501 est
+# occupé). Pour un accès depuis d'autres postes, le placer derrière le proxy
+# de l'application : fixer [downloads] port (et host) et déclarer l'URL
+# publique dans [downloads] url. Chaque URL commence par un jeton tiré au
+# démarrage du processus : seuls les liens affichés par l'application
+# ouvrent les fichiers.
+DOWNLOAD_PORT = 0
+DOWNLOAD_HOST = "127.0.0.1"
+# Taille des morceaux lus sur le disque et envoyés au navigateur
+CHUNK_SIZE = 256 * 1024
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Répertoires servis, par préfixe d'URL
+DOWNLOAD_ROOTS = {
+    "exports": os.path.join(APP_DIR, "data", "exports"),
+    "rapports": REPORT_DIR,
+}
+
+# Types absents de la table mimetypes de Python
+_CONTENT_TYPES = {
+    ".parquet": "application/vnd.apache.parquet",
+    ".gz": "application/gzip",
+}
+
+def _download_settings():
+    """Adresse, port d'écoute et URL publique (clés host, port et url de [downloads], facultatives)"""
+    settings = st.secrets.get("downloads", {})
+    return settings.get("host", DOWNLOAD_HOST), int(settings.get("port", DOWNLOAD_PORT)), settings.get("url")
+
+def _content_type(path):
+    """Type MIME d'un fichier ; un .csv.gz est servi compressé, tel quel"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in _CONTENT_TYPES:
+        return _CONTENT_TYPES[extension]
+    content_type, _ = mimetypes.guess_type(path)
+    if content_type and content_type.startswith("text/"):
+        content_type += "; charset=utf-8"
+    return content_type or "application/octet-stream"
+
+def _resolve(url_path, token):
+    """Fichier désigné par un chemin d'URL /<jeton>/<racine>/<fichier>, ou None
+
+    None si le jeton est faux ou si le fichier sort des racines.
+    """
+    given, _, rest = unquote(url_path).lstrip("/").partition("/")
+    if not hmac.compare_digest(given, token):
+        return None
+    root_name, _, relative = rest.partition("/")
+    root = DOWNLOAD_ROOTS.get(root_name)
+    if root is None or not relative:
+        return None
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, relative))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        return None
+    return path
+
+class _DownloadHandler(BaseHTTPRequestHandler):
+    """Sert les fichiers des racines par morceaux, avec leur vrai type"""
+
+    def _send_headers(self):
+        url = urlsplit(self.path)
+        path = _resolve(url.path, self.server.token)
+        if path is None:
+            self.send_error(404)
+            return None
+        self.send_response(200)
+        self.send_header("Content-Type", _content_type(path))
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.send_header("X-Content-Type-Options", "nosniff")
+        filename = parse_qs(url.query).get("nom")
+        if filename:
+            self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(filename[0])}")
+        self.end_headers()
+        return path
+
+    def do_HEAD(self):
+        self._send_headers()
+
+    def do_GET(self):
+        path = self._send_headers()
+        if path is None:
+            return
+        try:
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, self.wfile, CHUNK_SIZE)
+        except (BrokenPipeError, ConnectionResetError):
+            # Téléchargement interrompu par le navigateur
+            pass
+
+    def log_message(self, format, *args):
+        logger.debug("Téléchargement %s", format % args)
+
+@st.cache_resource
+def start_download_server():
+    """Démarre (une seule fois par processus) le serveur de téléchargement
+
+    Retourne None si le port est indisponible : l'échec est journalisé une
+    fois et les liens de téléchargement ne sont pas proposés.
+    """
+    host, port, _ = _download_settings()
+    try:
+        server = ThreadingHTTPServer((host, port), _DownloadHandler)
+    except OSError as e:
+        logger.error("Serveur de téléchargement indisponible sur %s:%d: %s", host, port, e)
+        return None
+    server.daemon_threads = True
+    server.token = secrets.token_urlsafe(16)
+    thread = threading.Thread(target=server.serve_forever, name="unfpa-downloads", daemon=True)
+    thread.start()
+    logger.info("Serveur de téléchargement à l'écoute sur %s:%d", host, server.server_port)
+    return server
+
+def download_url(root, relative_path, filename=None):
+    """URL de téléchargement d'un fichier de DOWNLOAD_ROOTS[root], ou None
+
+    Sans [downloads] url, l'adresse est celle de la page sur le port du
+    serveur de téléchargement ; une page servie en HTTPS exige [downloads]
+    url, ce serveur ne parlant que HTTP. None si le serveur n'a pas pu
+    démarrer ou si l'URL publique manque. filename, s'il est donné, est le
+    nom proposé à l'enregistrement.
+    """
+    server = start_download_server()
+    if server is None:
+        return None
+    _, _, base = _download_settings()
+    if not base:
+        headers = st.context.headers
+        if headers.get("X-Forwarded-Proto", "http") == "https":
+            logger.warning("Page servie en HTTPS : [downloads] url doit mener au serveur de téléchargement")
+            return None
+        host = headers.get("Host", "localhost").rsplit(":", 1)[0]
+        base = f"http://{host}:{server.server_port}"
+    url = f"{base.rstrip('/')}/{server.token}/{root}/{quote(relative_path.replace(os.sep, '/'))}"
+    if filename:
+        url += f"?nom={quote(filename)}"
+    return url
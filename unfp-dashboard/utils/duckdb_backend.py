@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import duckdb
+import psycopg2
+import streamlit as st
+from utils.admission import admitted
+from utils.database import _execute, _read_connection_params, offline_bundle
+from utils.exports import _export_parquet
+
+logger = logging.getLogger(__name__)
+
+# Copie locale de l'entrepôt : les tables sont exportées en Parquet dans
+# data/duckdb/<version>/ puis interrogées en cours de processus par DuckDB,
+# sous le même nom public.<table> que dans PostgreSQL. En mode hors ligne
+# ([offline] dans les secrets), c'est le paquet de scripts/build_snapshot.py,
+# une base DuckDB en un seul fichier, qui est interrogé.
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "duckdb")
+# Intervalle entre deux copies (secondes), modifiable par snapshot_interval dans [duckdb]
+SNAPSHOT_INTERVAL = 15 * 60
+# Nombre de copies conservées sur disque
+SNAPSHOTS_KEPT = 2
+
+_PARAM_PATTERN = re.compile(r"(?<!%)%s")
+
+def _snapshot_interval():
+    """Intervalle entre deux copies, en secondes"""
+    return float(st.secrets.get("duckdb", {}).get("snapshot_interval", SNAPSHOT_INTERVAL))
+
+def _snapshot_tables():
+    """Tables copiées et leurs colonnes exportables
+
+    Dimensions, faits, agrégats et tables de liaison (une table partitionnée
+    est copiée en entier) ; les colonnes sans équivalent Parquet (tsvector,
+    types d'extension) sont omises.
+    """
+    results, _ = _execute("""
+        SELECT cls.relname, array_agg(att.attname::text ORDER BY att.attnum)
+        FROM pg_class cls
+        JOIN pg_namespace ns ON ns.oid = cls.relnamespace
+        JOIN pg_attribute att ON att.attrelid = cls.oid AND att.attnum > 0 AND NOT att.attisdropped
+        JOIN pg_type typ ON typ.oid = att.atttypid
+        WHERE ns.nspname = 'public'
+          AND cls.relkind IN ('r', 'p') AND NOT cls.relispartition
+          AND (cls.relname ~ '^(dim|fact|agg)_' OR cls.relname IN ('partenaire_projet', 'projet_localisation'))
+          AND cls.relname !~ '_(ancien|archive)$'
+          AND typ.typnamespace = 'pg_catalog'::regnamespace
+          AND typ.typname NOT IN ('tsvector', 'bytea')
+        GROUP BY cls.relname
+        ORDER BY cls.relname;
+    """, None)
+    return results
+
+def _snapshot_versions():
+    """Copies complètes présentes sur disque, de la plus ancienne à la plus récente"""
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    return sorted(name for name in os.listdir(SNAPSHOT_DIR)
+                  if not name.endswith(".tmp") and os.path.isdir(os.path.join(SNAPSHOT_DIR, name)))
+
+def snapshot_version():
+    """Version de la copie la plus récente, ou None s'il n'y en a pas encore
+
+    En mode hors ligne, la version est la date du paquet (None s'il est
+    absent, voir check_offline_bundle).
+    """
+    bundle = offline_bundle()
+    if bundle is not None:
+        if not os.path.exists(bundle):
+            return None
+        return datetime.fromtimestamp(os.path.getmtime(bundle)).strftime("%Y%m%d%H%M%S")
+    versions = _snapshot_versions()
+    return versions[-1] if versions else None
+
+def take_snapshot():
+    """Exporte les tables en Parquet dans une nouvelle copie ; retourne sa version
+
+    La copie est écrite dans un répertoire temporaire puis renommée : une
+    copie visible est toujours complète. Toutes les tables sont lues dans
+    un même instantané (pg_export_snapshot), gardé ouvert par une connexion
+    de coordination : les faits et leurs dimensions sont cohérents entre eux.
+    """
+    version = datetime.now().strftime("%Y%m%d%H%M%S")
+    building = os.path.join(SNAPSHOT_DIR, f"{version}.tmp")
+    os.makedirs(building, exist_ok=True)
+    started = time.perf_counter()
+    coordinator = None
+    try:
+        tables = _snapshot_tables()
+        # L'instantané n'est importable que sur le serveur qui l'a exporté
+        params = _read_connection_params(tuple(table for table, _ in tables))
+        coordinator = psycopg2.connect(**params)
+        coordinator.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        with coordinator.cursor() as cur:
+            cur.execute("SELECT pg_export_snapshot();")
+            snapshot = (params, cur.fetchone()[0])
+        for table, columns in tables:
+            select = ", ".join(f'"{column}"' for column in columns)
+            with admitted("export"):
+                _export_parquet(f"SELECT {select} FROM public.{table}", None,
+                                os.path.join(building, f"{table}.parquet"), snapshot)
+        os.rename(building, os.path.join(SNAPSHOT_DIR, version))
+    except Exception:
+        shutil.rmtree(building, ignore_errors=True)
+        raise
+    finally:
+        if coordinator is not None:
+            coordinator.close()
+    for old in _snapshot_versions()[:-SNAPSHOTS_KEPT]:
+        shutil.rmtree(os.path.join(SNAPSHOT_DIR, old), ignore_errors=True)
+    logger.info("Copie DuckDB %s écrite en %.1f s", version, time.perf_counter() - started)
+    return version
+
+def _refresh_snapshots():
+    """Renouvelle la copie à intervalle régulier ; une copie ratée garde la précédente"""
+    while True:
+        try:
+            take_snapshot()
+        except Exception as e:
+            logger.warning("Copie DuckDB impossible, la précédente reste servie: %s", e)
+        time.sleep(_snapshot_interval())
+
+@st.cache_resource
+def start_snapshot_refresher():
+    """Démarre (une seule fois par processus) le thread de copie"""
+    thread = threading.Thread(target=_refresh_snapshots, name="unfpa-duckdb-snapshot", daemon=True)
+    thread.start()
+    return thread
+
+@st.cache_resource
+def _engine():
+    """Connexion DuckDB partagée et version de la copie qu'elle expose
+
+    users compte, par connexion, les requêtes en cours ; retired garde les
+    connexions remplacées par une copie plus récente jusqu'à la fin de leur
+    dernière requête.
+    """
+    return {"lock": threading.Lock(), "connection": None, "version": None, "tables": frozenset(),
+            "users": {}, "retired": {}}
+
+def _open(version):
+    """Connexion en mémoire exposant chaque fichier de la copie comme vue public.<table>"""
+    directory = os.path.join(SNAPSHOT_DIR, version)
+    conn = duckdb.connect()
+    conn.execute("CREATE SCHEMA public;")
+    tables = []
+    for name in sorted(os.listdir(directory)):
+        table, ext = os.path.splitext(name)
+        if ext == ".parquet":
+            path = os.path.join(directory, name).replace("'", "''")
+            conn.execute(f"CREATE VIEW public.{table} AS SELECT * FROM read_parquet('{path}');")
+            tables.append(table)
+    return conn, frozenset(tables)
+
+def _open_bundle(path):
+    """Connexion en lecture seule sur le paquet hors ligne"""
+    conn = duckdb.connect(path, read_only=True)
+    tables = conn.execute(
+        "SELECT table_name FROM information_schema.tables WHERE table_schema = 'public';"
+    ).fetchall()
+    return conn, frozenset(table for table, in tables)
+
+def local_tables():
+    """Tables disponibles dans la copie courante"""
+    return _current()[1]
+
+def _refresh(engine):
+    """Rouvre la connexion quand une nouvelle copie paraît (sous engine["lock"])
+
+    L'ancienne connexion est fermée, ce qui libère ses fichiers Parquet ;
+    ses curseurs cessant alors de fonctionner, la fermeture attend la fin
+    des requêtes qui l'utilisent encore.
+    """
+    bundle = offline_bundle()
+    version = snapshot_version()
+    if version is not None and version != engine["version"]:
+        previous = engine["connection"]
+        engine["connection"], engine["tables"] = _open_bundle(bundle) if bundle else _open(version)
+        engine["version"] = version
+        if previous is not None:
+            if engine["users"].get(id(previous)):
+                engine["retired"][id(previous)] = previous
+            else:
+                previous.close()
+
+def _current():
+    """Connexion sur la copie la plus récente, rouverte quand une nouvelle copie paraît"""
+    engine = _engine()
+    with engine["lock"]:
+        _refresh(engine)
+        return engine["connection"], engine["tables"]
+
+@contextmanager
+def _borrowed_connection():
+    """Connexion courante, gardée ouverte jusqu'à la fin de la requête même si une copie la remplace"""
+    engine = _engine()
+    with engine["lock"]:
+        _refresh(engine)
+        conn = engine["connection"]
+        if conn is not None:
+            engine["users"][id(conn)] = engine["users"].get(id(conn), 0) + 1
+    try:
+        yield conn
+    finally:
+        if conn is not None:
+            with engine["lock"]:
+                engine["users"][id(conn)] -= 1
+                if not engine["users"][id(conn)]:
+                    del engine["users"][id(conn)]
+                    retired = engine["retired"].pop(id(conn), None)
+                    if retired is not None:
+                        retired.close()
+
+def run_local_query(query, params=None):
+    """Exécute une requête du tableau de bord sur la copie ; même retour que run_query"""
+    with _borrowed_connection() as conn:
+        if conn is None:
+            raise RuntimeError("Aucune copie DuckDB disponible")
+        # Un curseur par appel : la connexion est partagée entre les threads des sessions
+        cur = conn.cursor()
+        try:
+            statement = _PARAM_PATTERN.sub("?", query).replace("%%", "%")
+            cur.execute(statement, list(params or ()))
+            results = cur.fetchall()
+            columns = [desc[0] for desc in cur.description] if cur.description else []
+            return results, columns
+        finally:
+            cur.close()
+
+def bundle_layer(name):
+    """Couche géographique simplifiée du paquet hors ligne, en GeoJSON (dict)"""
+    results, _ = run_local_query("SELECT geojson FROM public.bundle_couches WHERE couche = %s;", (name,))
+    if not results:
+        raise KeyError(f"Couche {name} absente du paquet hors ligne")
+    return json.loads(results[0][0])
@@ -0,0 +1,281 @@
+import csv
+import gzip
+import io
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+import streamlit as st
+from utils.admission import admitted
+from utils.database import _read_connection_params, query_tables
+from utils.downloads import DOWNLOAD_ROOTS, download_url
+
+# Les exports sont écrits dans data/exports/ et téléchargés via le serveur de
+# téléchargement (utils/downloads.py) : le fichier est lu depuis le disque par
+# morceaux, sans passer par la mémoire de la session ni par la limite de
+# taille du service statique de Streamlit.
+EXPORT_DIR = DOWNLOAD_ROOTS["exports"]
+# Durée de conservation des fichiers exportés, en secondes
+EXPORT_RETENTION = 3600
+EXPORT_WORKERS = 2
+XLSX_MAX_ROWS = 1_048_576
+
+EXPORT_FORMATS = {
+    "CSV (gzip)": "csv.gz",
+    "Parquet": "parquet",
+    "Excel": "xlsx",
+}
+
+# Types PostgreSQL (OID) reconnus lors de la conversion vers Parquet et Excel
+_INTEGER_TYPES = {20, 21, 23}
+_FLOAT_TYPES = {700, 701, 1700}
+_BOOLEAN_TYPES = {16}
+_DATE_TYPES = {1082}
+_TIMESTAMP_TYPES = {1114, 1184}
+
+def _connect(query, snapshot=None):
+    """Connexion de lecture pour query
+
+    snapshot, s'il est donné, est le couple (paramètres de connexion,
+    identifiant) d'un instantané exporté par pg_export_snapshot() : la
+    connexion lit alors les données telles qu'il les voit.
+    """
+    if snapshot is None:
+        return psycopg2.connect(**_read_connection_params(query_tables(query)))
+    params, snapshot_id = snapshot
+    conn = psycopg2.connect(**params)
+    try:
+        conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        with conn.cursor() as cur:
+            cur.execute("SET TRANSACTION SNAPSHOT %s;", (snapshot_id,))
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+def _copy_to(query, params, fileobj, snapshot=None):
+    """Écrit le résultat de la requête en CSV dans fileobj via COPY ... TO STDOUT"""
+    conn = _connect(query, snapshot)
+    try:
+        with conn.cursor() as cur:
+            statement = cur.mogrify(query.strip().rstrip(";"), params or None).decode()
+            cur.copy_expert(f"COPY ({statement}) TO STDOUT WITH (FORMAT csv, HEADER true)", fileobj)
+    finally:
+        conn.close()
+
+def _column_types(query, params, snapshot=None):
+    """Noms et OID des colonnes de la requête, sans lire de lignes"""
+    conn = _connect(query, snapshot)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT * FROM ({query.strip().rstrip(';')}) t LIMIT 0", params or None)
+            return [(desc.name, desc.type_code) for desc in cur.description]
+    finally:
+        conn.close()
+
+class _CopyStream:
+    """Flux CSV lisible alimenté par COPY dans un thread, à mémoire constante"""
+
+    def __init__(self, query, params, snapshot=None):
+        read_fd, write_fd = os.pipe()
+        self.reader = os.fdopen(read_fd, "rb")
+        self.error = None
+        self.abandoned = False
+        self.thread = threading.Thread(target=self._produce, args=(query, params, snapshot, write_fd),
+                                       daemon=True)
+        self.thread.start()
+
+    def _produce(self, query, params, snapshot, write_fd):
+        try:
+            with os.fdopen(write_fd, "wb") as writer:
+                _copy_to(query, params, writer, snapshot)
+        except Exception as e:
+            # Une fois le lecteur abandonné, l'échec de l'écriture (tube fermé)
+            # n'est que la conséquence de l'erreur du lecteur
+            if not self.abandoned:
+                self.error = e
+
+    def close(self, abandon=False):
+        """Ferme le flux et propage une éventuelle erreur de COPY
+
+        abandon indique que le lecteur a échoué : les erreurs de COPY
+        survenues ensuite sont ignorées pour laisser remonter la sienne.
+        """
+        self.abandoned = abandon
+        self.reader.close()
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+def _export_csv_gz(query, params, path):
+    """CSV compressé, écrit directement depuis le flux COPY"""
+    with gzip.open(path, "wb") as f:
+        _copy_to(query, params, f)
+
+def _export_parquet(query, params, path, snapshot=None):
+    """Parquet écrit par lots à partir du flux COPY (snapshot : voir _connect)"""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    def arrow_type(oid):
+        if oid in _INTEGER_TYPES:
+            return pa.int64()
+        if oid in _FLOAT_TYPES:
+            return pa.float64()
+        if oid in _BOOLEAN_TYPES:
+            return pa.bool_()
+        if oid in _DATE_TYPES:
+            return pa.date32()
+        if oid in _TIMESTAMP_TYPES:
+            return pa.timestamp("us")
+        return pa.string()
+
+    column_types = {name: arrow_type(oid) for name, oid in _column_types(query, params, snapshot)}
+    stream = _CopyStream(query, params, snapshot)
+    try:
+        reader = pa_csv.open_csv(
+            stream.reader,
+            # COPY écrit les booléens t et f
+            convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=True,
+                                                  true_values=["t"], false_values=["f"])
+        )
+        with pq.ParquetWriter(path, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+    except Exception:
+        stream.close(abandon=True)
+        raise
+    stream.close()
+
+def _export_xlsx(query, params, path):
+    """Classeur Excel écrit ligne à ligne (mode constant_memory de xlsxwriter)"""
+    import xlsxwriter
+
+    numeric = [oid in _INTEGER_TYPES or oid in _FLOAT_TYPES for _, oid in _column_types(query, params)]
+    stream = _CopyStream(query, params)
+    try:
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+        sheet = workbook.add_worksheet("Export")
+        rows = csv.reader(io.TextIOWrapper(stream.reader, encoding="utf-8", newline=""))
+        for index, row in enumerate(rows):
+            if index >= XLSX_MAX_ROWS:
+                raise ValueError(f"Plus de {XLSX_MAX_ROWS} lignes : utilisez le format CSV ou Parquet")
+            if index > 0:
+                row = [float(value) if is_numeric and value != "" else value
+                       for value, is_numeric in zip(row, numeric)]
+            sheet.write_row(index, 0, row)
+        workbook.close()
+    except Exception:
+        stream.close(abandon=True)
+        raise
+    stream.close()
+
+_WRITERS = {
+    "csv.gz": _export_csv_gz,
+    "parquet": _export_parquet,
+    "xlsx": _export_xlsx,
+}
+
+def _run_export(fmt, query, params, path):
+    """Écrit l'export une fois admis dans la classe « export » (la moins prioritaire)"""
+    with admitted("export"):
+        _WRITERS[fmt](query, params, path)
+
+@st.cache_resource
+def _export_executor():
+    """Pool de threads partagé qui exécute les exports en arrière-plan"""
+    return ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="unfpa-export")
+
+@st.cache_resource
+def _export_jobs():
+    """Exports soumis, par identifiant"""
+    return {}
+
+def _purge_old_exports():
+    """Supprime les fichiers exportés plus anciens que EXPORT_RETENTION"""
+    limit = time.time() - EXPORT_RETENTION
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if os.path.getmtime(path) < limit:
+                os.remove(path)
+        except FileNotFoundError:
+            # Déjà supprimé par une autre session
+            pass
+    jobs = _export_jobs()
+    for job_id in [job_id for job_id, job in list(jobs.items()) if job["submitted"] < limit]:
+        jobs.pop(job_id, None)
+
+def submit_export(query, params, fmt, filename):
+    """Lance un export en arrière-plan et retourne son identifiant"""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    _purge_old_exports()
+
+    job_id = uuid.uuid4().hex
+    path = os.path.join(EXPORT_DIR, f"{job_id}.{fmt}")
+    job = {"submitted": time.time(), "path": path, "filename": f"{filename}.{fmt}", "fmt": fmt}
+    job["future"] = _export_executor().submit(_run_export, fmt, query, params, path)
+    _export_jobs()[job_id] = job
+    return job_id
+
+def export_job(job_id):
+    """Retourne l'export correspondant à job_id, ou None s'il a expiré"""
+    return _export_jobs().get(job_id)
+
+def export_panel(query, params, filename, key):
+    """Sélection du format, lancement de l'export et lien de téléchargement"""
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        fmt = EXPORT_FORMATS[st.selectbox("Format d'export", list(EXPORT_FORMATS), key=f"{key}_format")]
+    with col2:
+        if st.button("Préparer l'export", key=f"{key}_submit"):
+            st.session_state[f"{key}_job"] = submit_export(query, params, fmt, filename)
+
+    job = export_job(st.session_state.get(f"{key}_job"))
+    if job is None:
+        return
+    if job["future"].done():
+        _export_result(job)
+    else:
+        _export_progress(job)
+
+@st.fragment(run_every=2)
+def _export_progress(job):
+    """Attente d'un export, vérifiée toutes les deux secondes sans relancer la page"""
+    if job["future"].done():
+        # La page est relancée une fois : le résultat s'affiche hors de ce fragment,
+        # qui cesse alors d'être rafraîchi
+        st.rerun()
+    st.info(f"Export de {job['filename']} en cours…")
+
+def _export_result(job):
+    """Lien de téléchargement d'un export terminé, ou son erreur"""
+    error = job["future"].exception()
+    if error is not None:
+        st.error(f"Erreur lors de l'export: {error}")
+        return
+    size = os.path.getsize(job["path"]) / 1024
+    url = download_url("exports", os.path.basename(job["path"]), job["filename"])
+    if url is None:
+        st.error("Export prêt, mais le serveur de téléchargement est indisponible "
+                 "(voir [downloads] dans .streamlit/secrets.toml)")
+        return
+    st.markdown(f'<a href="{url}">📥 Télécharger {job["filename"]}</a> ({size:,.0f} Ko)', unsafe_allow_html=True)
+
+@st.cache_data(show_spinner=False)
+def dataframe_to_xlsx(df):
+    """Classeur Excel d'un petit DataFrame déjà chargé en mémoire"""
+    import xlsxwriter
+
+    buffer = io.BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {"in_memory": True})
+    sheet = workbook.add_worksheet("Export")
+    sheet.write_row(0, 0, [str(column) for column in df.columns])
+    for index, row in enumerate(df.itertuples(index=False), start=1):
+        sheet.write_row(index, 0, row)
+    workbook.close()
+    return buffer.getvalue()
@@ -0,0 +1,71 @@
+import hashlib
+import json
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+from utils.database import CACHE_TTL
+
+# Nombre maximal de figures conservées, toutes sessions confondues
+FIGURE_CACHE_ENTRIES = 256
+
+# Figures nommées : (fonction plotly.express, options), partagées par les
+# pages et le préchauffage (utils/warmup.py) pour que les clés du cache coïncident
+PLOT_LAYOUT = {"plot_bgcolor": "rgba(255, 255, 255, 0.8)"}
+NAMED_FIGURES = {
+    "projets_par_domaine": ("bar", {
+        "x": "name", "y": "count",
+        "title": "Répartition des projets par domaine",
+        "labels": {"name": "Domaine", "count": "Nombre de projets"},
+        "layout": PLOT_LAYOUT,
+    }),
+    "budget_par_bailleur": ("pie", {
+        "values": "budget_total", "names": "bailleur",
+        "title": "Répartition du budget par bailleur",
+        "layout": PLOT_LAYOUT,
+    }),
+    "budget_par_domaine": ("bar", {
+        "x": "domaine_nom", "y": "budget_total",
+        "title": "Budget total par domaine",
+        "labels": {"domaine_nom": "Domaine", "budget_total": "Budget (USD)"},
+        "layout": PLOT_LAYOUT,
+    }),
+    "repartition_budget_domaine": ("pie", {
+        "values": "budget_total", "names": "domaine_nom",
+        "title": "Répartition du budget par domaine",
+        "layout": PLOT_LAYOUT,
+    }),
+}
+
+def dataframe_fingerprint(df):
+    """Empreinte du contenu d'un DataFrame (valeurs, index, colonnes et types)"""
+    digest = hashlib.sha1()
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    digest.update(repr(list(zip(df.columns, df.dtypes.astype(str)))).encode())
+    return digest.hexdigest()
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def _figure(kind, spec, fingerprint, _df):
+    """Construit la figure une fois ; _df est exclu de la clé du cache"""
+    options = json.loads(spec)
+    layout = options.pop("layout", None)
+    fig = getattr(px, kind)(_df, **options)
+    if layout:
+        fig.update_layout(**layout)
+    return fig
+
+def cached_figure(kind, df, layout=None, **options):
+    """Figure plotly.express mise en cache par (spécification, contenu des données)
+
+    kind est le nom de la fonction plotly.express (bar, pie, scatter, ...),
+    options ses arguments et layout les arguments de update_layout.
+    La figure retournée est partagée entre les sessions : elle ne doit pas
+    être modifiée (passer la mise en page par layout).
+    """
+    spec = json.dumps(dict(options, layout=layout), sort_keys=True)
+    return _figure(kind, spec, dataframe_fingerprint(df), df)
+
+def named_figure(name, df):
+    """Figure de NAMED_FIGURES construite sur df"""
+    kind, options = NAMED_FIGURES[name]
+    return cached_figure(kind, df, **options)
@@ -1,14 +1,57 @@
-import geopandas as gpd
 import pandas as pd
-import matplotlib.pyplot as plt
-import contextily as ctx
 from utils.database import *
 import streamlit as st
 import tempfile
 import os
 
+# geopandas, matplotlib et contextily sont importés dans les fonctions qui
+# les utilisent : les pages sans carte n'en paient pas le coût au démarrage.
+
+# Répertoire des shapefiles livrés avec l'application
+SHAPEFILE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "shapefiles")
+PREFECTURES_SHAPEFILE = os.path.join(SHAPEFILE_DIR, "GN_LIMITE_PREFECTURES.shp")
+REGIONS_SHAPEFILE = os.path.join(SHAPEFILE_DIR, "GN_REGIONS.shp")
+
+@st.cache_resource(show_spinner=False)
+def load_prefecture_boundaries():
+    """Charge (une fois par processus) les limites des préfectures en WGS84
+
+    En mode hors ligne, les limites simplifiées du paquet remplacent le shapefile.
+    """
+    import geopandas as gpd
+
+    if offline_bundle() is not None:
+        from utils.duckdb_backend import bundle_layer
+        return gpd.GeoDataFrame.from_features(bundle_layer("prefectures")["features"], crs="EPSG:4326")
+    gdf = gpd.read_file(PREFECTURES_SHAPEFILE).to_crs(epsg=4326)
+    gdf["N_PREFECTU"] = gdf["N_PREFECTU"].str.upper()
+    return gdf
+
+@st.cache_resource(show_spinner=False)
+def load_region_boundaries():
+    """Charge (une fois par processus) les limites des régions en WGS84"""
+    import geopandas as gpd
+
+    if offline_bundle() is not None:
+        from utils.duckdb_backend import bundle_layer
+        return gpd.GeoDataFrame.from_features(bundle_layer("regions")["features"], crs="EPSG:4326")
+    gdf = gpd.read_file(REGIONS_SHAPEFILE).to_crs(epsg=4326)
+    gdf["N_REGION"] = gdf["N_REGION"].str.upper()
+    return gdf
+
+@st.cache_resource(show_spinner=False)
+def prefecture_geojson():
+    """GeoJSON des préfectures, chaque entité identifiée par N_PREFECTU"""
+    if offline_bundle() is not None:
+        # Lu tel quel depuis le paquet : geopandas n'est pas chargé
+        from utils.duckdb_backend import bundle_layer
+        return bundle_layer("prefectures")
+    return load_prefecture_boundaries().__geo_interface__
+
 def load_guinea_shapefile():
     """Charge le shapefile de la Guinée avec les préfectures"""
+    import geopandas as gpd
+
     try:
         # Chemin vers votre shapefile - à adapter selon votre structure
         shapefile_path = "data/geospatial/gnb_adm2.shp"  # Niveau préfecture
@@ -26,18 +69,18 @@ def load_guinea_shapefile():
         return None
 
 def get_projects_with_geodata():
-    """Récupère les projets avec données géospatiales"""
+    """Récupère les projets avec données géospatiales (une ligne par localisation)"""
     query = """
         SELECT 
-            p.id, p.nom_projet, p.domaine, p.montant_usd, p.date_debut, p.date_fin,
+            p.id, p.nom_projet, p.domaine_id, p.montant_usd, p.date_debut, p.date_fin,
             p.bailleur, d.name as domaine_nom,
             c.name as commune_nom, pr.name as prefecture_nom,
             pr.latitude, pr.longitude
-        FROM public.projet p
-        LEFT JOIN public.dim_domaine d ON p.domaine = CAST(d.id AS TEXT)
-        LEFT JOIN public.fact_structure fs ON p.id = fs.id
-        LEFT JOIN public.dim_commune c ON fs.commune_id = c.id
-        LEFT JOIN public.dim_prefecture pr ON c.prefecture_id = pr.id
+        FROM public.projet_localisation pl
+        JOIN public.dim_projet p ON pl.projet_id = p.id
+        JOIN public.dim_prefecture pr ON pl.prefecture_id = pr.id
+        LEFT JOIN public.dim_commune c ON pl.commune_id = c.id
+        LEFT JOIN public.dim_domaine d ON p.domaine_id = d.id
         WHERE pr.latitude IS NOT NULL AND pr.longitude IS NOT NULL;
     """
     results, columns = run_query(query)
@@ -45,6 +88,8 @@ def get_projects_with_geodata():
 
 def create_geospatial_dataframe():
     """Crée un GeoDataFrame avec les projets"""
+    import geopandas as gpd
+
     # Charger les données des projets
     df_projects = get_projects_with_geodata()
     
@@ -59,6 +104,9 @@ def create_geospatial_dataframe():
 
 def plot_projects_on_map(gdf, metric='count', domain_filter=None):
     """Crée une carte des projets"""
+    import matplotlib.pyplot as plt
+    import contextily as ctx
+
     fig, ax = plt.subplots(figsize=(12, 10))
     
     # Filtrer par domaine si spécifié
@@ -0,0 +1,81 @@
+import io
+import logging
+
+import plotly.io as pio
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Mode allégé pour les connexions lentes (3G en régions) : figures rendues
+# côté serveur en petites images mises en cache, tableaux tronqués et
+# paginés, décor (image de fond, CSS, logo) supprimé.
+LITE_PARAM = "lite"
+# Valeurs de l'en-tête ECT (Network Information) considérées comme lentes
+SLOW_CONNECTIONS = {"slow-2g", "2g", "3g"}
+# Taille des figures rendues côté serveur, en pixels, et nombre de couleurs de la palette PNG
+LITE_IMAGE_WIDTH = 640
+LITE_IMAGE_HEIGHT = 380
+LITE_IMAGE_COLORS = 64
+# Lignes par page des tableaux
+LITE_PAGE_SIZE = 15
+# Budget par page en mode allégé : octets envoyés au navigateur, images
+# comprises (mesure : scripts/bench_payload.py)
+PAGE_PAYLOAD_BUDGET = 200 * 1024
+# Nombre maximal d'images conservées, toutes sessions confondues
+IMAGE_CACHE_ENTRIES = 256
+
+def lite_mode():
+    """Vrai si la session est en mode allégé
+
+    ?lite=1 ou ?lite=0 dans l'URL force le choix ; sinon le mode est activé
+    quand le navigateur demande une économie de données (Save-Data) ou
+    signale une connexion lente (ECT). Le choix vaut pour toute la session.
+    """
+    value = st.query_params.get(LITE_PARAM)
+    if value is not None:
+        st.session_state["lite_mode"] = value.lower() in ("1", "true", "oui")
+    elif "lite_mode" not in st.session_state:
+        headers = st.context.headers
+        st.session_state["lite_mode"] = (headers.get("Save-Data", "").lower() == "on"
+                                         or headers.get("ECT", "").lower() in SLOW_CONNECTIONS)
+    return st.session_state["lite_mode"]
+
+@st.cache_data(max_entries=IMAGE_CACHE_ENTRIES, show_spinner=False)
+def _figure_png(figure_json):
+    """PNG en palette réduite d'une figure plotly, rendu par kaleido"""
+    from PIL import Image
+
+    fig = pio.from_json(figure_json)
+    png = fig.to_image(format="png", width=LITE_IMAGE_WIDTH, height=LITE_IMAGE_HEIGHT, scale=1)
+    image = Image.open(io.BytesIO(png)).convert("RGB").quantize(colors=LITE_IMAGE_COLORS)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+def show_chart(fig):
+    """Affiche une figure plotly : interactive, ou image statique en mode allégé"""
+    if not lite_mode():
+        st.plotly_chart(fig, use_container_width=True)
+        return
+    try:
+        st.image(_figure_png(fig.to_json()), use_container_width=True)
+    except Exception as e:
+        # Cartes à tuiles, kaleido absent : la figure est omise plutôt que transmise en entier
+        logger.warning("Rendu statique impossible: %s", e)
+        st.caption("Graphique non disponible en mode allégé.")
+
+def show_table(df, key, **options):
+    """Affiche un DataFrame ; en mode allégé, par pages de LITE_PAGE_SIZE lignes"""
+    if not lite_mode() or len(df) <= LITE_PAGE_SIZE:
+        st.dataframe(df, **options)
+        return
+    options.pop("height", None)
+    page_count = -(-len(df) // LITE_PAGE_SIZE)
+    page = st.number_input(f"Page (sur {page_count})", min_value=1, max_value=page_count, key=f"{key}_page") - 1
+    start = page * LITE_PAGE_SIZE
+    st.dataframe(df.iloc[start:start + LITE_PAGE_SIZE], **options)
+    st.caption(f"Lignes {start + 1}–{min(start + LITE_PAGE_SIZE, len(df))} sur {len(df)}")
+
+def table_page_size(default):
+    """Taille de page des tableaux paginés par la base (utils/tables.py)"""
+    return LITE_PAGE_SIZE if lite_mode() else default
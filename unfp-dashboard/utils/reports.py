@@ -0,0 +1,345 @@
+import base64
+import hashlib
+import html
+import io
+import json
+import os
+import re
+import time
+import unicodedata
+
+import pandas as pd
+
+# Rapports statiques par préfecture et par région, produits par
+# scripts/build_reports.py dans data/rapports/ et servis par le serveur de
+# téléchargement (utils/downloads.py), qui leur donne leur vrai type : le
+# service statique de Streamlit enverrait les pages HTML en text/plain.
+# Les fonctions de rendu ne lisent pas la base :
+# elles reçoivent un dictionnaire sérialisable et tournent dans des processus
+# séparés.
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_DIR = os.path.join(APP_DIR, "data", "rapports")
+MANIFEST_PATH = os.path.join(REPORT_DIR, "manifest.json")
+PREFECTURE_SHAPES_DIR = os.path.join(APP_DIR, "data", "shapefiles", "GN_PREFECTURES")
+REGION_SHAPES_DIR = os.path.join(APP_DIR, "data", "shapefiles", "GN_REGIONS")
+# À incrémenter quand la mise en page change : tous les rapports sont alors refaits
+REPORT_VERSION = 1
+# Lignes de structures listées dans un rapport
+MAX_STRUCTURES = 30
+# Fichiers d'un shapefile lus par geopandas (géométries, index, attributs,
+# projection, encodage)
+SHAPEFILE_EXTENSIONS = (".shp", ".shx", ".dbf", ".prj", ".cpg")
+
+PREFECTURES_QUERY = """
+    SELECT p.id, p.name, r.name as region_name
+    FROM public.dim_prefecture p
+    LEFT JOIN public.dim_region r ON p.region_id = r.id
+    ORDER BY p.name;
+"""
+PROJETS_QUERY = """
+    SELECT DISTINCT pl.prefecture_id, p.id as projet_id, p.nom_projet, d.name as domaine_nom,
+           p.montant_usd::float8 as montant_usd, p.bailleur
+    FROM public.projet_localisation pl
+    JOIN public.dim_projet p ON pl.projet_id = p.id
+    LEFT JOIN public.dim_domaine d ON p.domaine_id = d.id;
+"""
+STRUCTURES_QUERY = """
+    SELECT c.prefecture_id, c.name as commune_name, fs.org_name, d.name as domaine_nom
+    FROM public.fact_structure fs
+    JOIN public.dim_commune c ON fs.commune_id = c.id
+    LEFT JOIN public.dim_domaine d ON fs.domaine_id = d.id;
+"""
+INDICATEURS_QUERY = """
+    SELECT prefecture_id, indicator_name, annee, value
+    FROM public.fact_indicateur;
+"""
+
+def normalize_name(name):
+    """Nom sans accents ni séparateurs, en majuscules (rapprochement base / shapefiles)"""
+    ascii_name = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode()
+    return re.sub(r"[^A-Z0-9]", "", ascii_name.upper())
+
+def _shapefiles(directory):
+    """Shapefiles d'un répertoire par nom normalisé (préfixe numérique « 1_ » ignoré)"""
+    if not os.path.isdir(directory):
+        return {}
+    return {
+        normalize_name(re.sub(r"^\d+_", "", os.path.splitext(name)[0])): os.path.join(directory, name)
+        for name in os.listdir(directory) if name.endswith(".shp")
+    }
+
+def _frame(query):
+    """Résultat d'une requête ; une erreur de lecture interrompt la génération"""
+    from utils.database import run_query
+
+    results, columns = run_query(query)
+    if results is None:
+        raise RuntimeError("Lecture de la base impossible")
+    return pd.DataFrame(results, columns=columns)
+
+def _records(df, columns):
+    """Lignes d'un DataFrame en dictionnaires JSON (NaN remplacés par None)"""
+    return json.loads(df[columns].to_json(orient="records", force_ascii=False))
+
+def _job(kind, name, region, projets, structures, indicateurs, shapefile):
+    """Entrées d'un rapport : tout ce que le rendu affiche, et rien d'autre"""
+    projets = projets.drop_duplicates("projet_id")
+    return {
+        "type": kind,
+        "slug": f"{kind}-{normalize_name(name).lower()}",
+        "titre": f"{'Préfecture' if kind == 'prefecture' else 'Région'} de {str(name).title()}",
+        "region": region,
+        "kpis": {
+            "projets": int(len(projets)),
+            "budget": float(projets["montant_usd"].fillna(0).sum()),
+            "structures": int(len(structures)),
+            "indicateurs": int(indicateurs["indicator_name"].nunique()),
+        },
+        "projets": _records(projets.sort_values("montant_usd", ascending=False),
+                            ["nom_projet", "domaine_nom", "bailleur", "montant_usd"]),
+        "structures": _records(structures.sort_values(["commune_name", "org_name"]),
+                               ["commune_name", "org_name", "domaine_nom"]),
+        "indicateurs": _records(indicateurs.sort_values(["indicator_name", "annee"]),
+                                ["indicator_name", "annee", "value"]),
+        "shapefile": shapefile,
+    }
+
+def load_report_jobs():
+    """Entrées de tous les rapports : une lecture de la base pour l'ensemble"""
+    prefectures = _frame(PREFECTURES_QUERY)
+    projets = _frame(PROJETS_QUERY)
+    structures = _frame(STRUCTURES_QUERY)
+    indicateurs = _frame(INDICATEURS_QUERY)
+    prefecture_shapes = _shapefiles(PREFECTURE_SHAPES_DIR)
+    region_shapes = _shapefiles(REGION_SHAPES_DIR)
+
+    jobs = []
+    for prefecture in prefectures.itertuples():
+        jobs.append(_job(
+            "prefecture", prefecture.name, prefecture.region_name,
+            projets[projets["prefecture_id"] == prefecture.id],
+            structures[structures["prefecture_id"] == prefecture.id],
+            indicateurs[indicateurs["prefecture_id"] == prefecture.id],
+            prefecture_shapes.get(normalize_name(prefecture.name)),
+        ))
+    for region, members in prefectures.dropna(subset=["region_name"]).groupby("region_name"):
+        ids = set(members["id"])
+        jobs.append(_job(
+            "region", region, region,
+            projets[projets["prefecture_id"].isin(ids)],
+            structures[structures["prefecture_id"].isin(ids)],
+            indicateurs[indicateurs["prefecture_id"].isin(ids)],
+            region_shapes.get(normalize_name(region)),
+        ))
+    return jobs
+
+def input_digest(job):
+    """Empreinte des entrées d'un rapport, limites géographiques comprises"""
+    digest = hashlib.sha256(f"v{REPORT_VERSION}".encode())
+    digest.update(json.dumps(job, sort_keys=True, default=str).encode())
+    if job["shapefile"]:
+        stem = os.path.splitext(job["shapefile"])[0]
+        for extension in SHAPEFILE_EXTENSIONS:
+            path = stem + extension
+            if os.path.exists(path):
+                digest.update(extension.encode())
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+def _indicator_series(job):
+    """Indicateurs numériques par année (valeurs non numériques écartées)"""
+    df = pd.DataFrame(job["indicateurs"], columns=["indicator_name", "annee", "value"])
+    df["value"] = pd.to_numeric(df["value"], errors="coerce")
+    return df.dropna(subset=["value", "annee"]).groupby(["indicator_name", "annee"], as_index=False)["value"].sum()
+
+def _map_figure(job):
+    """Carte du territoire (limites du shapefile) avec le nombre de structures"""
+    import geopandas as gpd
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(6, 6))
+    if job["shapefile"]:
+        gdf = gpd.read_file(job["shapefile"]).to_crs(epsg=4326)
+        gdf.plot(ax=ax, color="#cfe3f5", edgecolor="#1f77b4", linewidth=0.6)
+        point = gdf.union_all().representative_point()
+        ax.annotate(f"{job['kpis']['structures']} structures", (point.x, point.y),
+                    ha="center", fontsize=11, color="#333")
+    else:
+        ax.text(0.5, 0.5, "Limites non disponibles", ha="center", va="center", transform=ax.transAxes)
+    ax.set_title(job["titre"], fontsize=13)
+    ax.set_axis_off()
+    return fig
+
+def _trend_figure(series):
+    """Évolution des indicateurs numériques par année"""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8, 4.5))
+    if series.empty:
+        ax.text(0.5, 0.5, "Aucun indicateur numérique", ha="center", va="center", transform=ax.transAxes)
+        ax.set_axis_off()
+    else:
+        for name, rows in series.groupby("indicator_name"):
+            ax.plot(rows["annee"], rows["value"], marker="o", label=name[:50])
+        ax.set_xlabel("Année")
+        ax.legend(fontsize=7, loc="upper left", bbox_to_anchor=(1, 1))
+        ax.xaxis.get_major_locator().set_params(integer=True)
+    ax.set_title("Évolution des indicateurs", fontsize=12)
+    fig.tight_layout()
+    return fig
+
+def _png(fig):
+    """Image PNG d'une figure matplotlib, en base64"""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=110, bbox_inches="tight")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+def _html_table(rows, columns):
+    """Tableau HTML de quelques lignes"""
+    head = "".join(f"<th>{html.escape(label)}</th>" for _, label in columns)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{html.escape('' if row[key] is None else str(row[key]))}</td>"
+                         for key, _ in columns) + "</tr>"
+        for row in rows
+    )
+    return f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>"
+
+def _html_report(job, map_png, series):
+    """Page HTML autonome ; la figure interactive utilise plotly.min.js partagé"""
+    import plotly.express as px
+
+    kpis = job["kpis"]
+    cards = "".join(
+        f'<div class="kpi"><span>{label}</span><strong>{value}</strong></div>'
+        for label, value in (
+            ("Projets", kpis["projets"]),
+            ("Budget (USD)", f"{kpis['budget']:,.0f}".replace(",", " ")),
+            ("Structures", kpis["structures"]),
+            ("Indicateurs", kpis["indicateurs"]),
+        )
+    )
+    trend = ""
+    if not series.empty:
+        fig = px.line(series, x="annee", y="value", color="indicator_name", markers=True,
+                      labels={"annee": "Année", "value": "Valeur", "indicator_name": "Indicateur"})
+        trend = fig.to_html(full_html=False, include_plotlyjs=False)
+    structures = _html_table(job["structures"][:MAX_STRUCTURES],
+                             [("commune_name", "Commune"), ("org_name", "Structure"), ("domaine_nom", "Domaine")])
+    projets = _html_table(job["projets"], [("nom_projet", "Projet"), ("domaine_nom", "Domaine"),
+                                           ("bailleur", "Bailleur"), ("montant_usd", "Montant (USD)")])
+    return f"""<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{html.escape(job['titre'])} — UNFPA Guinée</title>
+<script src="plotly.min.js"></script>
+<style>
+body {{ font-family: sans-serif; margin: 0 auto; max-width: 960px; padding: 12px; color: #333; }}
+h1 {{ color: #1f77b4; font-size: 1.5em; }}
+.kpis {{ display: flex; flex-wrap: wrap; gap: 8px; }}
+.kpi {{ flex: 1 1 140px; background: #f0f6fc; border-radius: 6px; padding: 10px; }}
+.kpi span {{ display: block; font-size: 0.85em; color: #555; }}
+.kpi strong {{ font-size: 1.4em; }}
+img {{ max-width: 100%; }}
+table {{ border-collapse: collapse; width: 100%; font-size: 0.85em; }}
+th, td {{ border-bottom: 1px solid #ddd; padding: 4px; text-align: left; }}
+</style>
+</head>
+<body>
+<h1>{html.escape(job['titre'])}</h1>
+<p>Région : {html.escape(str(job['region'] or '—'))} · <a href="{job['slug']}.pdf">Version PDF</a></p>
+<div class="kpis">{cards}</div>
+<h2>Carte</h2>
+<img src="data:image/png;base64,{map_png}" alt="Carte">
+<h2>Évolution des indicateurs</h2>
+{trend or '<p>Aucun indicateur numérique.</p>'}
+<h2>Structures</h2>
+{structures}
+<h2>Projets</h2>
+{projets}
+<p><small>Généré le {time.strftime('%d/%m/%Y %H:%M')}</small></p>
+</body>
+</html>
+"""
+
+def _pdf_report(job, map_fig, trend_fig, path):
+    """PDF de deux pages : indicateurs clés et carte, puis évolution et structures"""
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    kpis = job["kpis"]
+    with PdfPages(path) as pdf:
+        map_fig.set_size_inches(8.27, 11.69)
+        map_fig.subplots_adjust(top=0.75)
+        map_fig.text(0.08, 0.93, job["titre"], fontsize=18, color="#1f77b4")
+        map_fig.text(0.08, 0.86,
+                     f"Projets : {kpis['projets']}    Budget : {kpis['budget']:,.0f} USD\n"
+                     f"Structures : {kpis['structures']}    Indicateurs : {kpis['indicateurs']}",
+                     fontsize=11)
+        pdf.savefig(map_fig)
+
+        trend_fig.set_size_inches(8.27, 11.69)
+        trend_fig.subplots_adjust(bottom=0.55, right=0.6)
+        lines = [f"{row['commune_name']} — {row['org_name']}" for row in job["structures"][:MAX_STRUCTURES]]
+        trend_fig.text(0.08, 0.45, "Structures\n" + "\n".join(lines), fontsize=8, va="top")
+        pdf.savefig(trend_fig)
+    plt.close(map_fig)
+    plt.close(trend_fig)
+
+def render_report(job, output_dir=REPORT_DIR):
+    """Écrit <slug>.html et <slug>.pdf ; retourne (slug, durée en secondes)
+
+    Exécutée dans un processus du pool : job ne contient que des types JSON.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+
+    started = time.perf_counter()
+    series = _indicator_series(job)
+    map_fig = _map_figure(job)
+    trend_fig = _trend_figure(series)
+    page = _html_report(job, _png(map_fig), series)
+    with open(os.path.join(output_dir, f"{job['slug']}.html"), "w", encoding="utf-8") as f:
+        f.write(page)
+    _pdf_report(job, map_fig, trend_fig, os.path.join(output_dir, f"{job['slug']}.pdf"))
+    return job["slug"], time.perf_counter() - started
+
+def write_index(jobs, output_dir=REPORT_DIR):
+    """Page d'accueil des rapports : préfectures et régions, avec liens HTML et PDF"""
+    items = {"region": [], "prefecture": []}
+    for job in sorted(jobs, key=lambda job: job["titre"]):
+        items[job["type"]].append(
+            f'<li><a href="{job["slug"]}.html">{html.escape(job["titre"])}</a> '
+            f'(<a href="{job["slug"]}.pdf">PDF</a>)</li>'
+        )
+    page = f"""<!DOCTYPE html>
+<html lang="fr">
+<head><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Rapports UNFPA Guinée</title>
+<style>body {{ font-family: sans-serif; max-width: 720px; margin: 0 auto; padding: 12px; }} h1 {{ color: #1f77b4; }}</style>
+</head>
+<body>
+<h1>Rapports UNFPA Guinée</h1>
+<h2>Régions</h2><ul>{''.join(items['region'])}</ul>
+<h2>Préfectures</h2><ul>{''.join(items['prefecture'])}</ul>
+</body>
+</html>
+"""
+    with open(os.path.join(output_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(page)
+
+def report_index_url():
+    """URL de la page d'accueil des rapports
+
+    None s'ils n'ont pas été générés ou si le serveur de téléchargement est
+    indisponible. L'URL porte le jeton du serveur : les liens relatifs de la
+    page d'accueil vers chaque rapport le conservent.
+    """
+    from utils.downloads import download_url
+
+    if os.path.exists(os.path.join(REPORT_DIR, "index.html")):
+        return download_url("rapports", "index.html")
+    return None
@@ -0,0 +1,113 @@
+import pandas as pd
+import streamlit as st
+from utils.database import run_query
+from utils.lite import table_page_size
+
+# Nombre de lignes envoyées au navigateur par page
+PAGE_SIZE = 50
+
+def _quote(column):
+    """Identifiant SQL entre guillemets (les colonnes proviennent d'une liste fixée par la page)"""
+    return '"' + column.replace('"', '""') + '"'
+
+def _python_value(value):
+    """Convertit un scalaire NumPy (issu d'un DataFrame) en type Python adaptable par psycopg2"""
+    return value.item() if hasattr(value, "item") else value
+
+def _escape_like(text):
+    """Échappe les jokers de LIKE (%, _) et le caractère d'échappement"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _where(search, search_columns, filters):
+    """Clause WHERE et paramètres pour la recherche et les filtres d'égalité"""
+    clauses, params = [], []
+    for column, value in (filters or {}).items():
+        clauses.append(f"{_quote(column)} = %s")
+        params.append(_python_value(value))
+    if search:
+        # % et _ saisis sont cherchés tels quels, pas comme jokers
+        clauses.append("(" + " OR ".join(f"CAST({_quote(c)} AS TEXT) ILIKE %s ESCAPE '\\'" for c in search_columns) + ")")
+        params.extend([f"%{_escape_like(search)}%"] * len(search_columns))
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+def filtered_query(base_query, filters=None):
+    """Requête de base restreinte aux filtres d'égalité, et ses paramètres"""
+    filters = {column: value for column, value in (filters or {}).items() if value is not None}
+    where, params = _where(None, (), filters)
+    return f"SELECT * FROM ({base_query.strip().rstrip(';')}) t{where}", params
+
+def count_rows(base_query, search=None, search_columns=(), filters=None):
+    """Nombre de lignes correspondant à la recherche et aux filtres"""
+    where, params = _where(search, search_columns, filters)
+    results, _ = run_query(f"SELECT COUNT(*) FROM ({base_query.strip().rstrip(';')}) t{where};", params)
+    return results[0][0] if results else 0
+
+def fetch_page(base_query, columns, order_by, descending=False, search=None, search_columns=(),
+               filters=None, page=0, page_size=PAGE_SIZE, key_column="id", after=None):
+    """Une page de résultats triée et paginée côté serveur
+
+    Si le tri porte sur key_column et que la dernière clé de la page
+    précédente est connue (after), la page est lue par pagination par clé
+    (WHERE clé > dernière clé) plutôt que par OFFSET.
+    """
+    where, params = _where(search, search_columns, filters)
+    direction = "DESC" if descending else "ASC"
+    selected = list(dict.fromkeys([key_column, *columns]))
+    select_columns = ", ".join(_quote(c) for c in selected)
+    query = f"SELECT {select_columns} FROM ({base_query.strip().rstrip(';')}) t{where}"
+
+    if order_by == key_column and after is not None:
+        query += (" AND " if where else " WHERE ") + f"{_quote(key_column)} {'<' if descending else '>'} %s"
+        params.append(_python_value(after))
+        query += f" ORDER BY {_quote(key_column)} {direction} LIMIT %s;"
+        params.append(page_size)
+    else:
+        # La clé départage les égalités pour que l'ordre soit stable d'une page à l'autre
+        query += f" ORDER BY {_quote(order_by)} {direction} NULLS LAST, {_quote(key_column)} LIMIT %s OFFSET %s;"
+        params.extend([page_size, page * page_size])
+
+    results, result_columns = run_query(query, params)
+    return pd.DataFrame(results or [], columns=result_columns or selected)
+
+def paginated_table(base_query, columns, key, filters=None, search_columns=None, key_column="id",
+                    default_sort=None, page_size=PAGE_SIZE, height=400):
+    """Tableau paginé, trié et filtré par la base : seule la page affichée est transférée"""
+    search_columns = search_columns or columns
+    filters = {column: value for column, value in (filters or {}).items() if value is not None}
+    page_size = table_page_size(page_size)
+
+    col1, col2, col3 = st.columns([2, 1, 2])
+    with col1:
+        search = st.text_input("Rechercher", key=f"{key}_search")
+    with col2:
+        # Le tri par clé (par défaut) permet la pagination par clé, sans OFFSET
+        sort_options = list(dict.fromkeys([key_column, *columns]))
+        order_by = st.selectbox("Trier par", sort_options, index=sort_options.index(default_sort or key_column), key=f"{key}_sort")
+    with col3:
+        descending = st.radio("Ordre", ["Croissant", "Décroissant"], horizontal=True, key=f"{key}_order") == "Décroissant"
+
+    # Dernière clé de chaque page déjà lue, pour la pagination par clé ;
+    # tout changement de recherche, de tri, de filtre ou de taille de page ramène à la première page
+    state = (base_query, tuple(columns), search, order_by, descending, tuple(sorted(filters.items(), key=str)), page_size)
+    cursors = st.session_state.setdefault(f"{key}_cursors", {})
+    if cursors.get("state") != state:
+        cursors.clear()
+        cursors["state"] = state
+        st.session_state[f"{key}_page"] = 1
+
+    total = count_rows(base_query, search, search_columns, filters)
+    page_count = max(1, -(-total // page_size))
+    # Des lignes ont pu disparaître depuis le run précédent
+    if st.session_state.get(f"{key}_page", 1) > page_count:
+        st.session_state[f"{key}_page"] = page_count
+    page = st.number_input(f"Page (sur {page_count})", min_value=1, max_value=page_count, key=f"{key}_page") - 1
+
+    df = fetch_page(base_query, columns, order_by, descending, search, search_columns, filters,
+                    page, page_size, key_column, after=cursors.get(page - 1))
+    if not df.empty:
+        cursors[page] = df[key_column].iloc[-1]
+
+    st.dataframe(df[columns], use_container_width=True, height=height, hide_index=True)
+    first = page * page_size + 1 if total else 0
+    st.caption(f"Lignes {first}–{page * page_size + len(df)} sur {total}")
+    return df
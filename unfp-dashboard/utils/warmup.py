@@ -0,0 +1,107 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+import streamlit as st
+from utils.database import *
+
+logger = logging.getLogger(__name__)
+
+# Intervalle entre deux préchauffages, inférieur au TTL du cache des requêtes
+WARMUP_INTERVAL = 30 * 60
+
+# Figures préconstruites (utils/figures.py NAMED_FIGURES) et chargement de leurs données
+WARMUP_FIGURES = [
+    ("projets_par_domaine", lambda: get_named_frame("projets_par_domaine")),
+    ("budget_par_bailleur", lambda: get_named_frame("budget_par_bailleur")),
+    ("budget_par_domaine", get_domain_stats),
+    ("repartition_budget_domaine", get_domain_stats),
+]
+
+_last_report = {}
+
+def _warm_figure(name, load):
+    """Construit une figure nommée ; des données absentes sont une erreur de préchauffage"""
+    # Import différé : plotly.express n'est chargé que par le thread de préchauffage
+    from utils.figures import named_figure
+
+    df = load()
+    if df.empty:
+        raise RuntimeError("aucune donnée")
+    return named_figure(name, df)
+
+def _warmup_steps():
+    """Liste (nom, fonction) des étapes de préchauffage"""
+    # Import différé : la pile géospatiale n'est chargée que par le thread de préchauffage
+    from utils.geospatial import load_prefecture_boundaries, prefecture_geojson
+
+    steps = [(f"requête {name}", lambda name=name: run_named_query(name)) for name in DASHBOARD_QUERIES]
+    # Figures de l'Aperçu, construites sur les mêmes données que la page
+    steps += [(f"figure {name}", lambda name=name, load=load: _warm_figure(name, load))
+              for name, load in WARMUP_FIGURES]
+    steps += [
+        ("domaines", get_domains),
+        ("régions", get_regions),
+        ("préfectures", get_prefectures),
+        ("communes", get_communes),
+        ("projets", get_projects),
+        ("partenaires", get_partners),
+        ("indicateurs", get_indicators),
+        ("planning", get_planning),
+        ("structures", get_structures),
+        ("statistiques par domaine", get_domain_stats),
+        ("limites des préfectures", load_prefecture_boundaries),
+        ("GeoJSON des préfectures", prefecture_geojson),
+    ]
+    return steps
+
+def warm_caches():
+    """Précharge requêtes, dimensions et couches géographiques ; retourne le rapport"""
+    started = time.perf_counter()
+    timings = {}
+    errors = {}
+
+    for name, step in _warmup_steps():
+        step_started = time.perf_counter()
+        try:
+            # run_query signale ses erreurs par un résultat None plutôt que par une exception
+            result = step()
+            if result is None or (isinstance(result, tuple) and result[0] is None):
+                raise RuntimeError("la requête a échoué")
+            timings[name] = time.perf_counter() - step_started
+        except Exception as e:
+            errors[name] = str(e)
+            logger.warning("Préchauffage de '%s' impossible: %s", name, e)
+
+    report = {
+        "date": datetime.now(),
+        "duree": time.perf_counter() - started,
+        "etapes": timings,
+        "erreurs": errors,
+    }
+    _last_report.clear()
+    _last_report.update(report)
+    logger.info("Cache préchauffé en %.2f s (%d étapes, %d erreurs)",
+                report["duree"], len(timings), len(errors))
+    return report
+
+def get_warmup_report():
+    """Retourne le rapport du dernier préchauffage (vide s'il n'a pas encore eu lieu)"""
+    return dict(_last_report)
+
+def _warmup_loop():
+    """Préchauffe le cache au démarrage puis à intervalle régulier"""
+    while True:
+        try:
+            warm_caches()
+        except Exception as e:
+            logger.warning("Préchauffage interrompu: %s", e)
+        time.sleep(WARMUP_INTERVAL)
+
+@st.cache_resource
+def start_cache_warmer():
+    """Démarre (une seule fois par processus) le thread de préchauffage"""
+    thread = threading.Thread(target=_warmup_loop, name="unfpa-cache-warmer", daemon=True)
+    thread.start()
+    return thread